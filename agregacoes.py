@@ -0,0 +1,356 @@
+import numpy as np
+import pandas as pd
+
+from dados import FAIXAS_AREA, STATUS_ENSAIO
+
+# ── Cubo de agregação da página Áreas ────────────────────
+# Contagens e somas no grão mais fino usado pela página; gráficos e tabelas somam o cubo
+# em vez de reagrupar df_filtrado seção por seção.
+DIMENSOES_CUBO = (
+    "regional_nome", "estado_nome", "cidade_nome", "usuario_nome",
+    "cultura_nome", "categoria_material", "status_ensaio",
+)
+
+
+def _primeiras(chave):
+    """True na primeira linha de cada valor de `chave` (array de inteiros)."""
+    # factorize numera os valores na ordem em que aparecem: a linha é a primeira do seu
+    # valor exatamente quando o código passa do maior visto até ali
+    maior = np.maximum.accumulate(pd.factorize(chave)[0])
+    return np.diff(maior, prepend=-1) > 0
+
+
+def _codificar(df, colunas):
+    """Código inteiro por linha de cada coluna (mesma ideia do IndiceFiltros) e suas categorias.
+
+    Código 0 reservado para valor ausente — as categorias começam em 1.
+    """
+    codigos, categorias = [], []
+    for col in colunas:
+        cat = df[col].astype("category").cat
+        codigos.append(cat.codes.to_numpy().astype(np.int64) + 1)
+        categorias.append(cat.categories)
+    return codigos, categorias
+
+
+def _somar_celulas(codigos, categorias, nomes, medidas, sem_ausentes=False):
+    """Soma cada medida por combinação de códigos; medida None conta linhas, booleana conta os True.
+
+    Só as combinações presentes viram linha, em ordem de categorias. Com `sem_ausentes`,
+    combinações com algum valor ausente ficam de fora (como no groupby padrão).
+    """
+    tamanhos = tuple(len(c) + 1 for c in categorias)
+    chave = np.ravel_multi_index(codigos, tamanhos)
+    if sem_ausentes:
+        presentes = np.logical_and.reduce([c > 0 for c in codigos])
+        chave = chave[presentes]
+        medidas = {nome: None if pesos is None else pesos[presentes] for nome, pesos in medidas.items()}
+
+    celula, celulas = pd.factorize(chave, sort=True)
+    somas = {}
+    for nome, pesos in medidas.items():
+        soma = np.bincount(celula, weights=pesos, minlength=len(celulas))
+        somas[nome] = soma.astype(np.int64) if pesos is not None and pesos.dtype.kind in "bi" else soma
+
+    niveis = [
+        pd.Categorical.from_codes(cod - 1, categories=cats)
+        for cod, cats in zip(np.unravel_index(celulas, tamanhos), categorias)
+    ]
+    if len(niveis) == 1:
+        return pd.DataFrame(somas, index=pd.CategoricalIndex(niveis[0], name=nomes[0]))
+    return pd.DataFrame(somas, index=pd.MultiIndex.from_arrays(niveis, names=list(nomes)))
+
+
+def montar_cubo(df):
+    """Contagens e somas por combinação de DIMENSOES_CUBO, numa passada sobre o recorte.
+
+    nunique não soma entre células, então os produtores entram como marcador de
+    primeira ocorrência: somado por cidade/estado dá os produtores distintos da cidade,
+    somado no recorte todo dá os produtores distintos do recorte.
+    """
+    # Ausentes ficam no cubo: linha sem cidade ainda conta por regional
+    codigos, categorias = _codificar(df, DIMENSOES_CUBO)
+
+    # Ausentes viram -1: como no drop_duplicates dos KPIs, todos contam como um produtor só
+    produtor = pd.factorize(df["fazenda_produtor_uuid"])[0].astype(np.int64)
+    tem_produtor = produtor >= 0
+    primeiro_no_recorte = _primeiras(produtor)
+    cidade_estado = codigos[2] * (len(categorias[1]) + 1) + codigos[1]
+    primeiro_na_cidade = _primeiras(cidade_estado * (produtor.max(initial=0) + 2) + produtor + 1) & tem_produtor
+
+    area_soja  = np.nan_to_num(df["fazenda_area_plantada_soja"].to_numpy(np.float64))
+    area_milho = np.nan_to_num(df["fazenda_area_plantada_milho"].to_numpy(np.float64))
+
+    return _somar_celulas(codigos, categorias, DIMENSOES_CUBO, {
+        "qtd":                None,
+        "produtores_cidade":  primeiro_na_cidade,
+        "produtores":         primeiro_no_recorte,
+        "clientes":           primeiro_no_recorte & tem_produtor,
+        "pot_soja":           area_soja,
+        "pot_milho":          area_milho,
+        "pot_soja_produtor":  np.where(primeiro_no_recorte, area_soja, 0.0),
+        "pot_milho_produtor": np.where(primeiro_no_recorte, area_milho, 0.0),
+    })
+
+
+def somar(cubo, dimensoes, medida="qtd"):
+    """Soma de uma medida do cubo por `dimensoes` — só as combinações presentes no recorte."""
+    return cubo.groupby(level=list(dimensoes), observed=True)[medida].sum()
+
+
+def somar_status(cubo, dimensoes, medida="qtd"):
+    """`medida` por `dimensoes` com uma coluna por status, na ordem de STATUS_ENSAIO."""
+    return (
+        somar(cubo, [*dimensoes, "status_ensaio"], medida)
+        .unstack("status_ensaio", fill_value=0)
+        .reindex(columns=list(STATUS_ENSAIO), fill_value=0)
+    )
+
+
+# ── KPIs e tabelas da página Áreas (somas do cubo) ───────
+def kpis_areas(cubo):
+    """Números dos cards da página Áreas, na ordem em que o app.py os desempacota.
+
+    (total de áreas, clientes, com resultado, aguardando, não definido, % resultado, % aguardando,
+    % não definido, cobertura, potencial soja, potencial milho, produtores, média soja, média milho)
+    """
+    por_status     = somar(cubo, ["status_ensaio"])
+    total_areas    = int(cubo["qtd"].sum())
+    total_clientes = int(cubo["clientes"].sum())
+    com_resultado  = int(por_status.get("Com Resultado", 0))
+    aguardando     = int(por_status.get("Aguardando Colheita", 0))
+
+    pct_resultado  = round(com_resultado / total_areas * 100, 1) if total_areas > 0 else 0
+    pct_aguardando = round(aguardando    / total_areas * 100, 1) if total_areas > 0 else 0
+    nao_definido   = int(por_status.get("Não Definido", 0))
+    pct_nao_def    = round(nao_definido / total_areas * 100, 1) if total_areas > 0 else 0
+
+    # Potencial de área — soma por produtor único para evitar duplicidade
+    cobertura_gd   = round(total_areas / total_clientes, 1) if total_clientes > 0 else 0
+    pot_soja   = int(cubo["pot_soja_produtor"].sum())
+    pot_milho  = int(cubo["pot_milho_produtor"].sum())
+    n_prod     = int(cubo["produtores"].sum())
+    media_soja  = round(pot_soja  / n_prod, 1) if n_prod > 0 else 0
+    media_milho = round(pot_milho / n_prod, 1) if n_prod > 0 else 0
+    return (
+        total_areas, total_clientes, com_resultado, aguardando, nao_definido,
+        pct_resultado, pct_aguardando, pct_nao_def,
+        cobertura_gd, pot_soja, pot_milho, n_prod, media_soja, media_milho,
+    )
+
+
+def tabela_status(cubo, nivel, rotulo):
+    """Total e áreas por status de cada valor de `nivel` (coluna `rotulo`), com % Resultado, do maior ao menor."""
+    tabela = somar_status(cubo, [nivel])
+    tabela.insert(0, "Total", somar(cubo, [nivel]))
+    tabela = tabela.reset_index()
+    tabela["% Resultado"] = (tabela["Com Resultado"] / tabela["Total"] * 100).round(1)
+    tabela = tabela.sort_values("Total", ascending=False)
+    tabela.columns = [rotulo, "Total", "Com Resultado", "Aguardando", "Não Definido", "% Resultado"]
+    return tabela
+
+
+def tabela_rc(cubo, coluna, percentuais):
+    """Áreas por RC com uma coluna por valor de `coluna`, Total e "% valor" de cada um de `percentuais`."""
+    tabela = somar(cubo, ["usuario_nome", coluna]).reset_index(name="Qtd")
+    tabela = tabela.pivot(index="usuario_nome", columns=coluna, values="Qtd").fillna(0).astype(int)
+    tabela["Total"] = tabela.sum(axis=1)
+    for valor in percentuais:
+        tabela[f"% {valor}"] = (tabela.get(valor, 0) / tabela["Total"] * 100).round(1)
+    tabela = tabela.sort_values("Total", ascending=False).reset_index()
+    tabela.columns.name = None
+    return tabela.rename(columns={"usuario_nome": "RC"})
+
+
+def tabela_cidades(cubo):
+    """Tabela detalhada por cidade: produtores, áreas, com resultado, potenciais e % Resultado."""
+    grupos = cubo.groupby(level=["cidade_nome", "estado_nome"], observed=True)
+    cidade_tabela = pd.DataFrame({
+        "Áreas":         grupos["qtd"].sum(),
+        "Produtores":    grupos["produtores_cidade"].sum(),
+        "Com_Resultado": somar_status(cubo, ["cidade_nome", "estado_nome"])["Com Resultado"],
+        "Pot_Soja":      grupos["pot_soja"].sum(),
+        "Pot_Milho":     grupos["pot_milho"].sum(),
+    }).reset_index()
+
+    cidade_tabela["Pot_Total"] = cidade_tabela["Pot_Soja"] + cidade_tabela["Pot_Milho"]
+    cidade_tabela["% Resultado"] = (cidade_tabela["Com_Resultado"] / cidade_tabela["Áreas"] * 100).round(1)
+    cidade_tabela["Pot. Soja (ha)"] = cidade_tabela["Pot_Soja"].round(0).astype(int)
+    cidade_tabela["Pot. Milho (ha)"] = cidade_tabela["Pot_Milho"].round(0).astype(int)
+    cidade_tabela["Pot. Total (ha)"] = cidade_tabela["Pot_Total"].round(0).astype(int)
+    cidade_tabela = cidade_tabela.sort_values("Áreas", ascending=False)
+    cidade_tabela = cidade_tabela.rename(columns={"cidade_nome": "Cidade", "estado_nome": "Estado"})
+    cidade_tabela = cidade_tabela[["Cidade", "Estado", "Produtores", "Áreas", "Com_Resultado", "Pot. Soja (ha)", "Pot. Milho (ha)", "Pot. Total (ha)", "% Resultado"]]
+    return cidade_tabela.rename(columns={"Com_Resultado": "Com Resultado"})
+
+
+# ── Hierarquia Regional → Cidade → RC → Produtor ─────────
+# Modelo do drilldown da página Áreas: um groupby no grão regional × cidade × cultura ×
+# RC × produtor; totais, dominantes e produtores únicos saem de somas desse grão.
+NIVEIS_HIERARQUIA = ("regional_nome", "cidade_nome", "cultura_nome", "usuario_nome", "fazenda_produtor")
+
+
+def _dominante(serie):
+    """Valor do último nível com mais linhas em cada grupo dos níveis anteriores.
+
+    Empates ficam com o primeiro na ordem do índice (ordem das categorias / alfabética).
+    """
+    ordenada = serie.sort_values(ascending=False, kind="stable")
+    ordenada = ordenada[~ordenada.index.droplevel(-1).duplicated()]
+    return pd.DataFrame(
+        {"valor": ordenada.index.get_level_values(-1).astype(object), "qtd": ordenada.to_numpy()},
+        index=ordenada.index.droplevel(-1),
+    )
+
+
+def montar_hierarquia(df, n_cidades=10):
+    """Regionais (maior → menor) com as `n_cidades` maiores cidades de cada uma e seus indicadores."""
+    codigos, categorias = _codificar(df, NIVEIS_HIERARQUIA)
+    regional, cidade = codigos[0], codigos[1]
+
+    produtor = pd.factorize(df["fazenda_produtor_uuid"])[0].astype(np.int64)
+    regional_cidade = regional * (len(categorias[1]) + 1) + cidade
+    # Primeira linha de cada produtor na cidade — somado por cidade vira nunique
+    primeiro_na_cidade = _primeiras(regional_cidade * (produtor.max(initial=0) + 2) + produtor + 1) & (produtor >= 0)
+
+    base = _somar_celulas(codigos, categorias, NIVEIS_HIERARQUIA, {
+        "qtd":           None,
+        "com_resultado": df["status_ensaio"].eq("Com Resultado").to_numpy(),
+        "aguardando":    df["status_ensaio"].eq("Aguardando Colheita").to_numpy(),
+        "stine":         df["categoria_material"].eq("STINE").to_numpy(),
+        "produtores":    primeiro_na_cidade,
+    })
+    medidas = {col: base[col].to_numpy() for col in base.columns}
+
+    def rollup(niveis):
+        """Soma do grão base pelos níveis dados, sem combinações com ausentes."""
+        posicoes = [NIVEIS_HIERARQUIA.index(n) for n in niveis]
+        return _somar_celulas(
+            [base.index.codes[i].astype(np.int64) + 1 for i in posicoes],
+            [categorias[i] for i in posicoes], niveis, medidas, sem_ausentes=True,
+        )
+
+    regiao_cidade = list(NIVEIS_HIERARQUIA[:2])
+    cidades = rollup(regiao_cidade).sort_values("qtd", ascending=False, kind="stable")
+    cultura = _dominante(rollup([*regiao_cidade, "cultura_nome"])["qtd"])
+    rcs     = rollup([*regiao_cidade, "usuario_nome"])["qtd"]
+    rc      = _dominante(rcs)
+
+    # Produtor principal só do RC principal de cada cidade
+    produtores = rollup([*regiao_cidade, "usuario_nome", "fazenda_produtor"])["qtd"]
+    rc_principal = pd.MultiIndex.from_arrays(
+        [rc.index.get_level_values(0), rc.index.get_level_values(1), rc["valor"]]
+    )
+    produtores = produtores[produtores.index.droplevel(-1).isin(rc_principal)]
+    produtor_dom = _dominante(produtores).droplevel("usuario_nome")
+
+    cidades["cultura"]      = cultura["valor"]
+    cidades["rc"]           = rc["valor"]
+    cidades["n_rcs"]        = rcs.groupby(level=regiao_cidade, observed=True).size()
+    cidades["produtor"]     = produtor_dom["valor"]
+    cidades["produtor_qtd"] = produtor_dom["qtd"]
+    cidades = cidades.fillna({"cultura": "", "rc": "", "n_rcs": 0, "produtor": "", "produtor_qtd": 0})
+    cidades = cidades.astype({"n_rcs": np.int64, "produtor_qtd": np.int64})
+
+    regionais = rollup(["regional_nome"])
+    # Ordem de aparição como desempate, igual ao groupby(sort=False) de antes
+    regionais = regionais.reindex(df["regional_nome"].dropna().unique()).sort_values("qtd", ascending=False, kind="stable")
+
+    hierarquia = []
+    for reg_nome, reg in regionais.iterrows():
+        cids = cidades.xs(reg_nome, level="regional_nome")
+        hierarquia.append({
+            "nome":           reg_nome,
+            "qtd":            int(reg["qtd"]),
+            "com_resultado":  int(reg["com_resultado"]),
+            "stine":          int(reg["stine"]),
+            "cidades":        cids.head(n_cidades).reset_index().to_dict("records"),
+            "outras_cidades": max(len(cids) - n_cidades, 0),
+            "outras_qtd":     int(cids["qtd"].iloc[n_cidades:].sum()),
+        })
+    return hierarquia
+
+
+# ── Perfil de potencial (faixas de área) ─────────────────
+def perfil_faixas(df):
+    """Ensaios por faixa de área, soja e milho lado a lado — um value_counts por coluna de faixa.
+
+    Colunas: contagem por cultura, % da faixa no total da cultura (rótulos do gráfico) e
+    as colunas da tabela (Total, % Soja, % Milho), nas faixas em ordem crescente.
+    """
+    perfil = pd.DataFrame({
+        cultura: df[col].value_counts(sort=False).reindex(FAIXAS_AREA, fill_value=0).to_numpy()
+        for cultura, col in (("Soja", "faixa_area_soja"), ("Milho", "faixa_area_milho"))
+    }, index=pd.Index(FAIXAS_AREA, name="Perfil de Potencial"))
+
+    # Poucas faixas: round do Python em cada valor, como os rótulos sempre foram calculados
+    for cultura in ("Soja", "Milho"):
+        total = int(perfil[cultura].sum()) or 1
+        perfil[f"pct_{cultura.lower()}"] = [round(q / total * 100, 1) for q in perfil[cultura]]
+
+    perfil["Total"] = perfil["Soja"] + perfil["Milho"]
+    for cultura in ("Soja", "Milho"):
+        perfil[f"% {cultura}"] = [
+            round(q / t * 100, 1) if t > 0 else 0.0 for q, t in zip(perfil[cultura], perfil["Total"])
+        ]
+    return perfil
+
+
+# ── Séries semanais (marchas de plantio e colheita) ──────
+# Cor do ponto pelo % acumulado: fim (≥ 90%), progresso (≥ 50%), início
+FAIXAS_MARCHA = ((90, "#7ED321"), (50, "#D97706"))
+COR_MARCHA_INICIO = "#DC2626"
+
+
+def series_semanais(df, coluna_data, por=None):
+    """Áreas por semana de `coluna_data` com acumulado, % acumulado, tamanho e cor dos pontos.
+
+    A semana começa na segunda, como `to_period("W").start_time`. Com `por` (ex.: "ano_safra"),
+    sai uma curva por valor da coluna — cada uma acumulando até 100% — na mesma passada.
+    """
+    datas = df[coluna_data]
+    validas = datas.notna().to_numpy()
+    datas = datas[validas]
+    semana = datas.dt.normalize() - pd.to_timedelta(datas.dt.dayofweek, unit="D")
+
+    semanas = (
+        pd.DataFrame({"curva": df[por][validas] if por else 0, "semana": semana})
+        .groupby(["curva", "semana"], observed=True)
+        .size()
+        .reset_index(name="qtd_semana")
+    )
+    curva = semanas.groupby("curva", observed=True)["qtd_semana"]
+    semanas["acumulado"]    = curva.cumsum()
+    semanas["pct_acum"]     = (semanas["acumulado"] / curva.transform("sum") * 100).round(1)
+    semanas["semana_label"] = semanas["semana"].dt.strftime("%d/%b").str.lstrip("0")
+
+    # Pontos de 14 a 48 px pela quantidade da semana; curva com um valor só fica em 28
+    q_min = curva.transform("min")
+    amplitude = (curva.transform("max") - q_min).replace(0, np.nan)
+    semanas["dot_size"] = (14 + (semanas["qtd_semana"] - q_min) / amplitude * 34).fillna(28)
+    semanas["dot_cor"]  = np.select(
+        [semanas["pct_acum"] >= limite for limite, _ in FAIXAS_MARCHA],
+        [cor for _, cor in FAIXAS_MARCHA],
+        default=COR_MARCHA_INICIO,
+    )
+
+    if por is None:
+        return semanas.drop(columns="curva")
+    return semanas.rename(columns={"curva": por})
+
+
+# ── Estatísticas por grupo (gradiente de performance) ────
+def estatisticas_grupos(df, chaves, valor):
+    """n, média, desvio, mínimo, máximo, Q1 e Q3 de `valor` por `chaves`, sem lambdas por grupo.
+
+    Os quartis saem de um único `quantile([0.25, 0.75])` agrupado (interpolação linear, como
+    `Series.quantile`); o desvio de grupos com um ensaio só fica 0.
+    """
+    grupos = df.groupby(chaves, observed=True)[valor]
+    stats = grupos.agg(["count", "mean", "std", "min", "max"])
+    stats.columns = ["n", "media", "std", "minv", "maxv"]
+    quartis = grupos.quantile([0.25, 0.75]).unstack()
+    stats["q1"] = quartis[0.25]
+    stats["q3"] = quartis[0.75]
+    stats["std"] = stats["std"].fillna(0)
+    return stats.reset_index()
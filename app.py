@@ -1,32 +1,36 @@
 import streamlit as st
-import pandas as pd
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from supabase import create_client
-import plotly.express as px
-import plotly.graph_objects as go
-from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
-
-# ── Noindex: impede indexação pelo Google ────────────────
-def _injetar_noindex():
-    try:
-        index_path = Path(st.__file__).parent / "static" / "index.html"
-        html = index_path.read_text()
-        if 'name="robots"' not in html:
-            html = html.replace(
-                "<head>",
-                '<head><meta name="robots" content="noindex, nofollow">'
-            )
-            index_path.write_text(html)
-    except Exception:
-        pass
-
-_injetar_noindex()
+from grade import barra_percentual, grade
+from agregacoes import kpis_areas, montar_cubo, montar_hierarquia, perfil_faixas, somar, tabela_cidades, tabela_rc, tabela_status
+from dados import SincronizadorResultados, COLUNAS_TRATAMENTO, COLUNAS_DERIVADAS, validar_manifesto
+from cache_lru import CacheLRU
+from filtros import IndiceFiltros, aplicar_linhas, cascata, chave_selecao, recorte_final
+from performance import COLUNAS_PERFORMANCE
 
 # ── Configuração da página ───────────────────────────────
 st.set_page_config(layout="wide", page_title="Dashboard GD - Stine")
 
+# ── Noindex ──────────────────────────────────────────────
+# A tag entra no deploy, com `python -m scripts.injetar_noindex` depois do pip install. Onde não
+# há etapa de build (Streamlit Community Cloud), GD_NOINDEX_RUNTIME=1 liga a injeção pelo próprio
+# app, uma vez por processo; com o pacote do Streamlit somente leitura ela é pulada em silêncio.
+if os.getenv("GD_NOINDEX_RUNTIME") == "1":
+    @st.cache_resource(show_spinner=False)
+    def _garantir_noindex():
+        from scripts.injetar_noindex import index_streamlit, injetar_noindex
+
+        index = index_streamlit()
+        if not os.access(index, os.W_OK):
+            return False
+        try:
+            return injetar_noindex(index)
+        except OSError:
+            return False
+
+    _garantir_noindex()
+
 # ── Gate de acesso por token ─────────────────────────────
 try:
     _token_esperado = st.secrets["ACCESS_TOKEN"]
@@ -82,104 +86,46 @@ cores_cultura = {
 }
 
 # ── Funções de dados ─────────────────────────────────────
-@st.cache_data(ttl=600)
-def carregar_dados():
-    client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    response = client.table("view_gd_resultados_dashboard").select("*").execute()
-    df = pd.DataFrame(response.data)
-    return df
-
-def tratar_dados(df):
-    df["resultado_data_plantio_dt"]  = pd.to_datetime(df["resultado_data_plantio"],  errors="coerce")
-    df["resultado_data_colheita_dt"] = pd.to_datetime(df["resultado_data_colheita"], errors="coerce")
-
-    df["plantio_fmt"]  = df["resultado_data_plantio_dt"].dt.strftime("%d/%m/%Y")
-    df["colheita_fmt"] = df["resultado_data_colheita_dt"].dt.strftime("%d/%m/%Y")
-
-    metricas = [
-        "resultado_prod_scha",
-        "resultado_prod_scha_corrigido",
-        "resultado_area_ha",
-        "resultado_umidade_colheita",
-        "resultado_peso_mil_graos",
-        "resultado_porcentagem_avariados"
-    ]
-    for col in metricas:
-        df[col] = df[col].replace(0, pd.NA)
-
-    def _status_ensaio(row):
-        plantio  = pd.notna(row["resultado_data_plantio"])
-        colheita = pd.notna(row["resultado_data_colheita"])
-        prod     = pd.notna(row["resultado_prod_scha_corrigido"]) and row["resultado_prod_scha_corrigido"] > 0
-
-        if plantio and colheita and prod:
-            return "Com Resultado"
-        elif (plantio and colheita and not prod) or (plantio and not colheita and not prod):
-            return "Aguardando Colheita"
-        else:
-            return "Não Definido"
-
-    df["status_ensaio"] = df.apply(_status_ensaio, axis=1)
-
-    df["categoria_material"] = df["tratamentos_is_stine"].map({
-        1.0: "STINE",
-        0.0: "Concorrência"
-    }).fillna("Concorrência")
-
-    _pct = df.groupby(["fazenda_produtor", "cultura_nome"]).apply(
-        lambda x: (x["tratamentos_is_stine"] == 1.0).sum() / len(x)
-    ).reset_index(name="pct_stine")
-
-    def _classificar(pct):
-        if pct == 1.0:
-            return "100% STINE"
-        elif pct > 0.7:
-            return "Maioria STINE (>70%)"
-        elif pct >= 0.3:
-            return "Misto (30-70%)"
-        elif pct > 0:
-            return "Maioria Conc (<30%)"
-        else:
-            return "100% Concorrência"
-
-    _pct["classificacao_produtor"] = _pct["pct_stine"].apply(_classificar)
-
-    df = df.merge(
-        _pct[["fazenda_produtor", "cultura_nome", "classificacao_produtor"]],
-        on=["fazenda_produtor", "cultura_nome"],
-        how="left"
-    )
-
-    bins   = [0, 50, 200, 500, 2500, float("inf")]
-    labels = ["Até 50 ha", "50 a 200 ha", "200 a 500 ha", "500 a 2.500 ha", "Acima de 2.500 ha"]
-
-    df["faixa_area_milho"] = pd.cut(
-        df["fazenda_area_plantada_milho"],
-        bins=bins, labels=labels, right=True, include_lowest=True
-    )
-
-    df["faixa_area_soja"] = pd.cut(
-        df["fazenda_area_plantada_soja"],
-        bins=bins, labels=labels, right=True, include_lowest=True
-    )
+DIR_SNAPSHOT = Path(os.getenv("GD_SNAPSHOT_DIR", BASE_DIR / ".cache"))
+TTL_DADOS    = 600
 
-    def _ano_safra(dt):
-        if pd.isna(dt):
-            return "Sem data"
-        mes   = dt.month
-        ano   = dt.year
-        safra = ano if mes >= 7 else ano - 1
-        return f"{safra}/{str(safra + 1)[-2:]}"
+def _cliente_supabase():
+    # Importado só quando há carga do Supabase — servindo do snapshot, o SDK nem é carregado
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-    df["ano_safra"] = df["resultado_data_plantio_dt"].apply(_ano_safra)
+@st.cache_resource
+def _sincronizador():
+    return SincronizadorResultados(_cliente_supabase, diretorio_snapshot=DIR_SNAPSHOT)
 
-    df["safra_completa"] = df.apply(
-        lambda row: "Sem data" if row["ano_safra"] == "Sem data"
-        else row["resultado_epoca"] + " " + row["ano_safra"],
-        axis=1
-    )
-
-    return df
+# cache_resource devolve o mesmo objeto a todas as sessões, sem desserializar o frame a cada rerun
+@st.cache_resource(ttl=TTL_DADOS, max_entries=1, show_spinner=False)
+def carregar_dados():
+    return _sincronizador().sincronizar(ttl=TTL_DADOS)
+
+# Índice dos filtros montado uma vez por versão; o frame (_df) não entra no hash da chave
+@st.cache_resource(max_entries=2, show_spinner=False)
+def indice_filtros(versao, _df):
+    return IndiceFiltros(_df)
+
+# Linhas filtradas e agregados por (versão, seleção), compartilhados entre sessões
+@st.cache_resource
+def cache_recortes():
+    return CacheLRU()
+
+# Colunas lidas pela página de Áreas (sidebar, KPIs, gráficos e tabelas)
+COLUNAS_AREAS = (
+    "resultado_uuid", "fazenda_produtor", "fazenda_produtor_uuid", "cultura_nome",
+    "regional_nome", "estado_nome", "cidade_nome", "usuario_nome", "usuario_time",
+    "fazenda_area_plantada_soja", "fazenda_area_plantada_milho",
+    "status_ensaio", "categoria_material", "safra_completa", "faixa_area_soja", "faixa_area_milho",
+)
+
+validar_manifesto({
+    "tratar_dados":       COLUNAS_TRATAMENTO,
+    "página Áreas":       COLUNAS_AREAS,
+    "render_performance": COLUNAS_PERFORMANCE,
+}, derivadas=COLUNAS_DERIVADAS)
 
 # ── Função card KPI ──────────────────────────────────────
 def card(titulo, valor_principal, subtitulo, cor_borda):
@@ -215,7 +161,9 @@ def section_header(titulo):
     """
 
 # ── Visão Hierárquica Regional → Cidade → RC → Produtor ─
-def render_visao_hierarquica_regional(df):
+# Fragment: abrir ou fechar uma regional reroda só o drilldown
+@st.fragment
+def render_visao_hierarquica_regional(df, agregado):
     import html as _html
     total_geral = len(df)
     if total_geral == 0:
@@ -235,11 +183,9 @@ def render_visao_hierarquica_regional(df):
         else:
             return "🔴", "#fee2e2", "#991b1b"
 
-    def _cultura_badge(df_cid):
-        cnt = df_cid["cultura_nome"].value_counts()
-        if len(cnt) == 0:
+    def _cultura_badge(dom):
+        if not dom:
             return ""
-        dom = cnt.index[0]
         cor_c = "#005FAE" if dom == "Milho" else "#009D57"
         emoji = "🌽" if dom == "Milho" else "🌱"
         return (
@@ -248,6 +194,69 @@ def render_visao_hierarquica_regional(df):
             f'{emoji} {dom}</span>'
         )
 
+    def _html_regional(reg, cor, pct_reg, pct_res_reg, pct_stine_reg):
+        """Corpo de uma regional: cabeçalho, top 10 cidades e o resumo das demais."""
+        reg_nome_esc = _html.escape(str(reg["nome"]))
+        partes = [f"""
+            <div style="border:1px solid #e5e7eb; border-radius:8px; background:#fff;
+                        padding:12px 16px; margin:-4px 0 12px 0;">
+            <div style="display:flex; align-items:center; gap:10px; margin:0 0 12px 0;
+                        padding-bottom:10px; border-bottom:1px solid #f0f0f0; flex-wrap:wrap;">
+                <span style="width:12px; height:12px; border-radius:50%;
+                             background:{cor}; flex-shrink:0; display:inline-block;"></span>
+                <span style="font-size:15px; font-weight:700; color:#1a1a1a;">{reg_nome_esc}</span>
+                <div style="flex:1; background:#e9ecef; border-radius:4px; height:8px;
+                            overflow:hidden; min-width:60px;">
+                    <div style="width:{pct_reg}%; height:100%; background:{cor}; border-radius:4px;"></div>
+                </div>
+                <span style="font-size:12px; font-weight:700; color:#444; white-space:nowrap;">
+                    {reg["qtd"]} ensaios &nbsp;·&nbsp; {pct_reg}% do total &nbsp;·&nbsp;
+                    {pct_res_reg}% com resultado &nbsp;·&nbsp; {pct_stine_reg}% STINE
+                </span>
+            </div>
+            <div style="display:grid; grid-template-columns:0.25fr 1.6fr 0.7fr 0.85fr 0.9fr 0.85fr 1.3fr 1.5fr;
+                        column-gap:1rem; align-items:center;">
+        """]
+
+        for cid in reg["cidades"]:
+            qtd_cid  = cid["qtd"]
+            com_res  = cid["com_resultado"]
+            aguard   = cid["aguardando"]
+            pct_res  = round(com_res / qtd_cid * 100, 1) if qtd_cid > 0 else 0
+            icon, bg_sem, cor_sem = _semaforo(pct_res)
+
+            cult_badge = _cultura_badge(cid["cultura"])
+            n_prod    = cid["produtores"]
+            pct_stine = round(cid["stine"] / qtd_cid * 100, 1)
+            cor_stine = "#166534" if pct_stine >= 60 else ("#854d0e" if pct_stine >= 30 else "#991b1b")
+
+            rc_str     = _html.escape(str(cid["rc"]))
+            varios_tag = " +" if cid["n_rcs"] > 1 else ""
+
+            prod_raw  = str(cid["produtor"])
+            prod_n    = cid["produtor_qtd"]
+            prod_esc  = _html.escape(prod_raw)
+            prod_curto = _html.escape((prod_raw[:22] + "…") if len(prod_raw) > 22 else prod_raw)
+            cidade_esc = _html.escape(str(cid["cidade_nome"]))
+            prod_html = f'👤 {prod_curto} ({prod_n})' if prod_raw else ""
+
+            partes.append(
+                f'<div style="padding:5px 0;font-size:17px;text-align:center;">{icon}</div>'
+                f'<div style="padding:5px 0;font-weight:700;font-size:13px;color:#111;">📍 {cidade_esc}</div>'
+                f'<div style="padding:5px 0;">{cult_badge}</div>'
+                f'<div style="padding:5px 0;font-size:12px;color:#222;">👥 <b>{n_prod}</b> prod.</div>'
+                f'<div style="padding:5px 0;font-size:12px;color:#222;">✅ <b>{com_res}</b> &nbsp;⏳ <b>{aguard}</b> <span style="color:#555;font-size:13px;font-weight:600;">/{qtd_cid}</span></div>'
+                f'<div style="padding:5px 0;font-size:12px;font-weight:700;color:{cor_stine};">{pct_stine}% STINE</div>'
+                f'<div style="padding:5px 0;"><span style="background:#f0f4ff;color:#3b5bdb;font-size:11px;font-weight:600;padding:2px 7px;border-radius:10px;">👤 {rc_str}{varios_tag}</span></div>'
+                f'<div style="padding:5px 0;font-size:12px;color:#333;" title="{prod_esc}">{prod_html}</div>'
+            )
+        partes.append("</div>")
+
+        if reg["outras_qtd"] > 0:
+            partes.append(f'<div style="font-size:12px;color:#aaa;padding:4px 0;font-style:italic;">+ outras {reg["outras_cidades"]} cidades → {reg["outras_qtd"]} ensaios</div>')
+        partes.append("</div>")
+        return "".join(partes)
+
     # CSS expander
     st.markdown("""
         <style>
@@ -272,7 +281,7 @@ def render_visao_hierarquica_regional(df):
     st.markdown(f"""
         <div style="display:flex; align-items:center; gap:10px; margin-bottom:8px;">
             <span style="font-size:16px;">🗺️</span>
-            <span style="font-size:13px; color:#888;">Clique em uma regional para expandir</span>
+            <span style="font-size:13px; color:#888;">Ative uma regional para ver suas cidades</span>
             <span style="margin-left:auto; background:#1a1a1a; color:#fff;
                          font-size:12px; font-weight:700; padding:3px 12px; border-radius:20px;">
                 {total_geral} ensaios no total
@@ -280,7 +289,7 @@ def render_visao_hierarquica_regional(df):
         </div>
         <div style="background:#f8fafc; border:1px solid #e9ecef; border-radius:8px;
                     padding:10px 14px; margin-bottom:14px; font-size:12px; color:#555; line-height:2;">
-            <strong style="color:#333;">O que aparece ao expandir por cidade:</strong>
+            <strong style="color:#333;">O que aparece em cada cidade ao abrir uma regional:</strong>
             &nbsp; 🟢🟡🔴 <strong>Saúde</strong> (% com resultado) &nbsp;·&nbsp;
             📍 <strong>Cidade</strong> &nbsp;·&nbsp;
             🌱🌽 <strong>Cultura dominante</strong> &nbsp;·&nbsp;
@@ -301,101 +310,30 @@ def render_visao_hierarquica_regional(df):
         </div>
     """, unsafe_allow_html=True)
 
-    # Monta regionais
-    regionais = []
-    for reg_nome, df_reg in df.groupby("regional_nome", sort=False):
-        qtd_reg = len(df_reg)
-        pct_reg = round(qtd_reg / total_geral * 100, 1)
-        regionais.append((reg_nome, df_reg, qtd_reg, pct_reg))
-    regionais.sort(key=lambda x: x[2], reverse=True)
+    # Modelo e HTML de cada regional calculados uma vez por versão e filtros; o corpo só é
+    # montado e enviado quando a regional está aberta
+    hierarquia = agregado("hierarquia", lambda: montar_hierarquia(df))
 
-    for idx, (reg_nome, df_reg, qtd_reg, pct_reg) in enumerate(regionais):
+    for idx, reg in enumerate(hierarquia):
         cor = CORES[idx % len(CORES)]
+        reg_nome, qtd_reg = reg["nome"], reg["qtd"]
+        pct_reg = round(qtd_reg / total_geral * 100, 1)
 
-        # KPIs resumidos da regional para o label do expander
-        com_res_reg  = (df_reg["status_ensaio"] == "Com Resultado").sum()
-        pct_res_reg  = round(com_res_reg / qtd_reg * 100, 1) if qtd_reg > 0 else 0
+        # KPIs resumidos da regional para o rótulo
+        pct_res_reg  = round(reg["com_resultado"] / qtd_reg * 100, 1) if qtd_reg > 0 else 0
         icon_reg, _, _ = _semaforo(pct_res_reg)
-        pct_stine_reg = round((df_reg["categoria_material"] == "STINE").sum() / qtd_reg * 100, 1) if qtd_reg > 0 else 0
+        pct_stine_reg = round(reg["stine"] / qtd_reg * 100, 1) if qtd_reg > 0 else 0
 
-        with st.expander(
+        aberta = st.toggle(
             f"{icon_reg} {reg_nome}   —   {qtd_reg} ensaios ({pct_reg}%)   ·   "
             f"{pct_res_reg}% resultado   ·   {pct_stine_reg}% STINE",
-            expanded=False
-        ):
-            reg_nome_esc = _html.escape(str(reg_nome))
-            # Header interno da regional
-            st.markdown(f"""
-                <div style="display:flex; align-items:center; gap:10px; margin:-8px 0 12px 0;
-                            padding-bottom:10px; border-bottom:1px solid #f0f0f0; flex-wrap:wrap;">
-                    <span style="width:12px; height:12px; border-radius:50%;
-                                 background:{cor}; flex-shrink:0; display:inline-block;"></span>
-                    <span style="font-size:15px; font-weight:700; color:#1a1a1a;">{reg_nome_esc}</span>
-                    <div style="flex:1; background:#e9ecef; border-radius:4px; height:8px;
-                                overflow:hidden; min-width:60px;">
-                        <div style="width:{pct_reg}%; height:100%; background:{cor}; border-radius:4px;"></div>
-                    </div>
-                    <span style="font-size:12px; font-weight:700; color:#444; white-space:nowrap;">
-                        {qtd_reg} ensaios &nbsp;·&nbsp; {pct_reg}% do total &nbsp;·&nbsp;
-                        {pct_res_reg}% com resultado &nbsp;·&nbsp; {pct_stine_reg}% STINE
-                    </span>
-                </div>
-            """, unsafe_allow_html=True)
-
-            # Top 10 cidades
-            cidades_cnt = df_reg.groupby("cidade_nome").size().sort_values(ascending=False)
-            top10 = cidades_cnt.head(10)
-            outras_cnt = int(cidades_cnt.iloc[10:].sum()) if len(cidades_cnt) > 10 else 0
-
-            for cidade_nome, qtd_cid in top10.items():
-                df_cid = df_reg[df_reg["cidade_nome"] == cidade_nome]
-
-                com_res  = int((df_cid["status_ensaio"] == "Com Resultado").sum())
-                aguard   = int((df_cid["status_ensaio"] == "Aguardando Colheita").sum())
-                pct_res  = round(com_res / qtd_cid * 100, 1) if qtd_cid > 0 else 0
-                icon, bg_sem, cor_sem = _semaforo(pct_res)
-
-                cult_badge = _cultura_badge(df_cid)
-                n_prod    = int(df_cid["fazenda_produtor_uuid"].nunique())
-                pct_stine = round((df_cid["categoria_material"] == "STINE").sum() / qtd_cid * 100, 1)
-                cor_stine = "#166534" if pct_stine >= 60 else ("#854d0e" if pct_stine >= 30 else "#991b1b")
-
-                rc_dom   = df_cid["usuario_nome"].value_counts()
-                rc_raw   = rc_dom.index[0] if len(rc_dom) > 0 else ""
-                rc_str   = _html.escape(str(rc_raw))
-                varios    = len(rc_dom) > 1
-                varios_tag = " +" if varios else ""
-
-                df_rc    = df_cid[df_cid["usuario_nome"] == rc_raw]
-                prod_dom  = df_rc["fazenda_produtor"].value_counts()
-                prod_raw  = str(prod_dom.index[0]) if len(prod_dom) > 0 else ""
-                prod_n    = int(prod_dom.iloc[0]) if len(prod_dom) > 0 else 0
-                prod_esc  = _html.escape(prod_raw)
-                prod_curto = _html.escape((prod_raw[:22] + "…") if len(prod_raw) > 22 else prod_raw)
-                cidade_esc = _html.escape(str(cidade_nome))
-                prod_html = f'👤 {prod_curto} ({prod_n})' if prod_raw else ""
-
-                cols = st.columns([0.25, 1.6, 0.7, 0.85, 0.9, 0.85, 1.3, 1.5])
-                with cols[0]:
-                    st.markdown(f'<div style="padding:5px 0;font-size:17px;text-align:center;">{icon}</div>', unsafe_allow_html=True)
-                with cols[1]:
-                    st.markdown(f'<div style="padding:5px 0;font-weight:700;font-size:13px;color:#111;">📍 {cidade_esc}</div>', unsafe_allow_html=True)
-                with cols[2]:
-                    st.markdown(f'<div style="padding:5px 0;">{cult_badge}</div>', unsafe_allow_html=True)
-                with cols[3]:
-                    st.markdown(f'<div style="padding:5px 0;font-size:12px;color:#222;">👥 <b>{n_prod}</b> prod.</div>', unsafe_allow_html=True)
-                with cols[4]:
-                    st.markdown(f'<div style="padding:5px 0;font-size:12px;color:#222;">✅ <b>{com_res}</b> &nbsp;⏳ <b>{aguard}</b> <span style="color:#555;font-size:13px;font-weight:600;">/{qtd_cid}</span></div>', unsafe_allow_html=True)
-                with cols[5]:
-                    st.markdown(f'<div style="padding:5px 0;font-size:12px;font-weight:700;color:{cor_stine};">{pct_stine}% STINE</div>', unsafe_allow_html=True)
-                with cols[6]:
-                    st.markdown(f'<div style="padding:5px 0;"><span style="background:#f0f4ff;color:#3b5bdb;font-size:11px;font-weight:600;padding:2px 7px;border-radius:10px;">👤 {rc_str}{varios_tag}</span></div>', unsafe_allow_html=True)
-                with cols[7]:
-                    st.markdown(f'<div style="padding:5px 0;font-size:12px;color:#333;" title="{prod_esc}">{prod_html}</div>', unsafe_allow_html=True)
-
-            if outras_cnt > 0:
-                n_outras = len(cidades_cnt) - 10
-                st.markdown(f'<div style="font-size:12px;color:#aaa;padding:4px 0;font-style:italic;">+ outras {n_outras} cidades → {outras_cnt} ensaios</div>', unsafe_allow_html=True)
+            value=False, key=f"hier_{reg_nome}"
+        )
+        if aberta:
+            st.markdown(agregado(
+                f"hierarquia_html:{reg_nome}",
+                lambda: _html_regional(reg, cor, pct_reg, pct_res_reg, pct_stine_reg),
+            ), unsafe_allow_html=True)
 
 
 # ── CSS global ───────────────────────────────────────────
@@ -503,10 +441,30 @@ st.markdown("<div style='margin-bottom:16px;'></div>", unsafe_allow_html=True)
 
 # ── Carrega e trata dados ────────────────────────────────
 with st.spinner("Buscando dados atualizados..."):
-    df = carregar_dados()
-    df = tratar_dados(df)
+    versao_dados, df = carregar_dados()
+    indice = indice_filtros(versao_dados, df)
 
 # ── Sidebar ──────────────────────────────────────────────
+# Widget de cada nível da cascata: rótulo e chave (cultura e safra) ou prefixo das chaves dos checkboxes
+WIDGETS_FILTRO = {
+    "cultura_nome":   ("Cultura", "sel_cultura"),
+    "safra_completa": ("Safra", "sel_safra"),
+    "regional_nome":  ("Regional", "reg_"),
+    "estado_nome":    ("Estado", "est_"),
+    "cidade_nome":    ("Cidade", "cid_"),
+    "status_ensaio":  ("Status Ensaio", "sts_"),
+    "usuario_nome":   ("Usuário", "usr_"),
+    "usuario_time":   ("Time", "tim_"),
+}
+
+def _escolher_filtro(col, opcoes):
+    rotulo, chave = WIDGETS_FILTRO[col]
+    if col in ("cultura_nome", "safra_completa"):
+        valor = st.selectbox(rotulo, options=["Todos"] + opcoes, key=chave)
+        return [] if valor == "Todos" else [valor]
+    with st.expander(rotulo):
+        return [v for v in opcoes if st.checkbox(v, value=False, key=f"{chave}{v}")]
+
 with st.sidebar:
     # CSS botões da sidebar quadrados
     st.markdown("""
@@ -534,7 +492,8 @@ with st.sidebar:
     _, col_mid, _ = st.columns([0.5, 3, 0.5])
     with col_mid:
         if st.button("🔄 Atualizar dados", use_container_width=True):
-            st.cache_data.clear()
+            _sincronizador().sincronizar(forcar=True)
+            carregar_dados.clear()
             st.rerun()
 
     st.markdown("""
@@ -563,83 +522,29 @@ with st.sidebar:
             st.session_state["sel_cultura"] = "Todos"
             st.session_state["sel_safra"]   = "Todos"
             st.rerun()
-    culturas = ["Todos"] + sorted(df["cultura_nome"].unique().tolist())
-    sel_cultura = st.selectbox(
-        "Cultura",
-        options=culturas,
-        key="sel_cultura"
-    )
-
-    # Safra em cascata com cultura
-    df_temp = df.copy()
-    if sel_cultura != "Todos":
-        df_temp = df_temp[df_temp["cultura_nome"] == sel_cultura]
-
-    safras = ["Todos"] + sorted(df_temp["safra_completa"].unique().tolist())
-    sel_safra = st.selectbox(
-        "Safra",
-        options=safras,
-        key="sel_safra"
-    )
-
-    if sel_safra != "Todos":
-        df_temp = df_temp[df_temp["safra_completa"] == sel_safra]
-
-    # Regional
-    with st.expander("Regional"):
-        regionais = sorted(df_temp["regional_nome"].unique().tolist())
-        sel_regional = [r for r in regionais if st.checkbox(r, value=False, key=f"reg_{r}")]
-
-    df_temp2 = df_temp[df_temp["regional_nome"].isin(sel_regional)] if sel_regional else df_temp
-
-    # Estado
-    with st.expander("Estado"):
-        estados = sorted(df_temp2["estado_nome"].unique().tolist())
-        sel_estado = [e for e in estados if st.checkbox(e, value=False, key=f"est_{e}")]
 
-    df_temp3 = df_temp2[df_temp2["estado_nome"].isin(sel_estado)] if sel_estado else df_temp2
+    # Cada nível lista as opções das linhas que sobraram do anterior (filtros.CASCATA)
+    selecoes, linhas = cascata(indice, _escolher_filtro)
 
-    # Cidade
-    with st.expander("Cidade"):
-        cidades = sorted(df_temp3["cidade_nome"].unique().tolist())
-        sel_cidade = [c for c in cidades if st.checkbox(c, value=False, key=f"cid_{c}")]
-
-    df_temp4 = df_temp3[df_temp3["cidade_nome"].isin(sel_cidade)] if sel_cidade else df_temp3
-
-    # Status Ensaio
-    with st.expander("Status Ensaio"):
-        status = sorted(df_temp4["status_ensaio"].unique().tolist())
-        sel_status = [s for s in status if st.checkbox(s, value=False, key=f"sts_{s}")]
-
-    # Usuário
-    with st.expander("Usuário"):
-        usuarios = sorted(df_temp4["usuario_nome"].unique().tolist())
-        sel_usuario = [u for u in usuarios if st.checkbox(u, value=False, key=f"usr_{u}")]
-
-    df_temp5 = df_temp4[df_temp4["usuario_nome"].isin(sel_usuario)] if sel_usuario else df_temp4
-
-    # Time
-    with st.expander("Time"):
-        times = sorted(df_temp5["usuario_time"].unique().tolist())
-        sel_time = [t for t in times if st.checkbox(t, value=False, key=f"tim_{t}")]
+sel_cultura  = selecoes["cultura_nome"][0] if selecoes["cultura_nome"] else "Todos"
+sel_regional = selecoes["regional_nome"]
 
 # ── Aplica filtros ───────────────────────────────────────
-df_filtrado = df.copy()
+recortes = cache_recortes()
+chave_recorte = (versao_dados, chave_selecao(selecoes))
 
-if sel_cultura != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["cultura_nome"] == sel_cultura]
+def agregado(nome, calcular, ttl=None, segundo_plano=False):
+    """Resultado `nome` do recorte atual — calculado uma vez por versão e seleção, para todas as sessões.
 
-if sel_safra != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["safra_completa"] == sel_safra]
+    Com `segundo_plano=True` devolve um Future e o cálculo roda numa thread de fundo.
+    """
+    if segundo_plano:
+        return recortes.em_segundo_plano((*chave_recorte, nome), calcular, ttl)
+    return recortes.obter((*chave_recorte, nome), calcular, ttl)
 
-df_filtrado = df_filtrado[
-    (df_filtrado["regional_nome"].isin(sel_regional) if sel_regional else pd.Series(True, index=df_filtrado.index)) &
-    (df_filtrado["estado_nome"].isin(sel_estado) if sel_estado else pd.Series(True, index=df_filtrado.index)) &
-    (df_filtrado["cidade_nome"].isin(sel_cidade) if sel_cidade else pd.Series(True, index=df_filtrado.index)) &
-    (df_filtrado["status_ensaio"].isin(sel_status) if sel_status else pd.Series(True, index=df_filtrado.index)) &
-    (df_filtrado["usuario_nome"].isin(sel_usuario) if sel_usuario else pd.Series(True, index=df_filtrado.index)) &
-    (df_filtrado["usuario_time"].isin(sel_time) if sel_time else pd.Series(True, index=df_filtrado.index))
-]
+# Status e time não restringem as opções de outros níveis; entram só no recorte final
+linhas = agregado("linhas", lambda: recorte_final(indice, linhas, selecoes))
+df_filtrado = aplicar_linhas(df, linhas)
 
 # ── Filtro ativo ─────────────────────────────────────────
 filtro_ativo = len(sel_regional) > 0
@@ -650,24 +555,15 @@ filtro_ativo = len(sel_regional) > 0
 if st.session_state["pagina"] == "areas":
 
      # ── KPIs ─────────────────────────────────────────────────
-    total_areas    = df_filtrado["resultado_uuid"].nunique()
-    total_clientes = df_filtrado["fazenda_produtor_uuid"].nunique()
-    com_resultado  = df_filtrado[df_filtrado["status_ensaio"] == "Com Resultado"].shape[0]
-    aguardando     = df_filtrado[df_filtrado["status_ensaio"] == "Aguardando Colheita"].shape[0]
-
-    pct_resultado  = round(com_resultado / total_areas * 100, 1) if total_areas > 0 else 0
-    pct_aguardando = round(aguardando    / total_areas * 100, 1) if total_areas > 0 else 0
-    nao_definido   = df_filtrado[df_filtrado["status_ensaio"] == "Não Definido"].shape[0]
-    pct_nao_def    = round(nao_definido / total_areas * 100, 1) if total_areas > 0 else 0
-
-    # Potencial de área — soma por produtor único para evitar duplicidade
-    produtores_unicos = df_filtrado.drop_duplicates(subset="fazenda_produtor_uuid")
-    cobertura_gd   = round(total_areas / total_clientes, 1) if total_clientes > 0 else 0
-    pot_soja   = int(produtores_unicos["fazenda_area_plantada_soja"].fillna(0).sum())
-    pot_milho  = int(produtores_unicos["fazenda_area_plantada_milho"].fillna(0).sum())
-    n_prod     = len(produtores_unicos)
-    media_soja  = round(pot_soja  / n_prod, 1) if n_prod > 0 else 0
-    media_milho = round(pot_milho / n_prod, 1) if n_prod > 0 else 0
+    # Recortes iguais (mesma versão e filtros) reaproveitam os números entre sessões.
+    # As seções da página somam o cubo em vez de reagrupar df_filtrado — o cubo é compartilhado, não alterar.
+    cubo = agregado("cubo", lambda: montar_cubo(df_filtrado))
+
+    (
+        total_areas, total_clientes, com_resultado, aguardando, nao_definido,
+        pct_resultado, pct_aguardando, pct_nao_def,
+        cobertura_gd, pot_soja, pot_milho, n_prod, media_soja, media_milho,
+    ) = agregado("kpis_areas", lambda: kpis_areas(cubo))
 
 
     # Título infográfico acima dos cards
@@ -765,6 +661,9 @@ if st.session_state["pagina"] == "areas":
             "#7C3AED"
         ), unsafe_allow_html=True)
 
+    # Plotly só depois dos KPIs: na primeira execução do processo os cards aparecem antes do import
+    import plotly.express as px
+    import plotly.graph_objects as go
 
     st.markdown("""
         <div style="margin: 24px 0 4px 0;">
@@ -776,7 +675,7 @@ if st.session_state["pagina"] == "areas":
     col1, col2 = st.columns(2)
 
     with col1:
-        status_count = df_filtrado["status_ensaio"].value_counts().reset_index()
+        status_count = somar(cubo, ["status_ensaio"]).sort_values(ascending=False).reset_index()
         status_count.columns = ["status", "qtd"]
         total = status_count["qtd"].sum()
 
@@ -808,7 +707,7 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_status, use_container_width=True)
 
     with col2:
-        cultura_count = df_filtrado["cultura_nome"].value_counts().reset_index()
+        cultura_count = somar(cubo, ["cultura_nome"]).sort_values(ascending=False).reset_index()
         cultura_count.columns = ["cultura", "qtd"]
         total_cult = cultura_count["qtd"].sum()
 
@@ -887,7 +786,7 @@ if st.session_state["pagina"] == "areas":
     col3, col4 = st.columns(2)
 
     with col3:
-        reg = df_filtrado.groupby(["regional_nome", "status_ensaio"]).size().reset_index(name="qtd")
+        reg = somar(cubo, ["regional_nome", "status_ensaio"]).reset_index(name="qtd")
         reg["rotulo"] = reg["qtd"].apply(lambda x: str(x) if x >= 20 else "")
         fig_reg = px.bar(
             reg, x="qtd", y="regional_nome", color="status_ensaio",
@@ -907,7 +806,7 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_reg, use_container_width=True)
 
     with col4:
-        est = df_filtrado.groupby(["estado_nome", "status_ensaio"]).size().reset_index(name="qtd")
+        est = somar(cubo, ["estado_nome", "status_ensaio"]).reset_index(name="qtd")
         est["rotulo"] = est["qtd"].apply(lambda x: str(x) if x >= 20 else "")
         fig_est = px.bar(
             est, x="qtd", y="estado_nome", color="status_ensaio",
@@ -927,76 +826,29 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_est, use_container_width=True)
 
     # ── Tabelas resumo ────────────────────────────────────────
-    pct_renderer = JsCode("""
-        class ProgressRenderer {
-            init(params) {
-                this.eGui = document.createElement('div');
-                this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                var pct = params.value || 0;
-                var bar = document.createElement('div');
-                bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#009D57; opacity:0.25; border-radius:2px;';
-                var label = document.createElement('span');
-                label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                label.innerText = pct.toFixed(1) + '%';
-                this.eGui.appendChild(bar);
-                this.eGui.appendChild(label);
-            }
-            getGui() { return this.eGui; }
-        }
-    """)
-
     tab_col1, tab_col2 = st.columns(2)
 
     with tab_col1:
-        reg_tabela = df_filtrado.groupby("regional_nome").agg(
-            Total=("resultado_uuid", "count"),
-            Com_Resultado=("status_ensaio", lambda x: (x == "Com Resultado").sum()),
-            Aguardando=("status_ensaio", lambda x: (x == "Aguardando Colheita").sum()),
-            Nao_Definido=("status_ensaio", lambda x: (x == "Não Definido").sum()),
-        ).reset_index()
-        reg_tabela["% Resultado"] = (reg_tabela["Com_Resultado"] / reg_tabela["Total"] * 100).round(1)
-        reg_tabela = reg_tabela.sort_values("Total", ascending=False)
-        reg_tabela.columns = ["Regional", "Total", "Com Resultado", "Aguardando", "Não Definido", "% Resultado"]
-
-        gb_reg = GridOptionsBuilder.from_dataframe(reg_tabela)
-        gb_reg.configure_default_column(resizable=True, sortable=True, filter=True)
-        gb_reg.configure_column("Com Resultado", headerClass="header-com-resultado")
-        gb_reg.configure_column("Aguardando", headerClass="header-aguardando")
-        gb_reg.configure_column("Não Definido", headerClass="header-nao-definido")
-        gb_reg.configure_column("% Resultado", type=["numericColumn"], cellRenderer=pct_renderer)
+        reg_tabela = agregado("reg_tabela", lambda: tabela_status(cubo, "regional_nome", "Regional"))
 
+        colunas_status = {
+            "Com Resultado": dict(headerClass="header-com-resultado"),
+            "Aguardando":    dict(headerClass="header-aguardando"),
+            "Não Definido":  dict(headerClass="header-nao-definido"),
+            "% Resultado":   dict(type=["numericColumn"], cellRenderer=barra_percentual("#009D57")),
+        }
         custom_css = {
             ".header-com-resultado": {"background-color": "rgba(126,211,33,0.25) !important", "color": "#4a7a00 !important", "font-weight": "700 !important"},
             ".header-aguardando": {"background-color": "rgba(74,144,217,0.25) !important", "color": "#1a4d8a !important", "font-weight": "700 !important"},
             ".header-nao-definido": {"background-color": "rgba(158,158,158,0.25) !important", "color": "#444 !important", "font-weight": "700 !important"},
         }
 
-        AgGrid(reg_tabela, gridOptions=gb_reg.build(),
-               fit_columns_on_grid_load=True, height=320,
-               allow_unsafe_jscode=True, theme="alpine",
-               custom_css=custom_css)
+        grade(reg_tabela, "reg_tabela", colunas_status, altura=320, custom_css=custom_css)
 
     with tab_col2:
-        est_tabela = df_filtrado.groupby("estado_nome").agg(
-            Total=("resultado_uuid", "count"),
-            Com_Resultado=("status_ensaio", lambda x: (x == "Com Resultado").sum()),
-            Aguardando=("status_ensaio", lambda x: (x == "Aguardando Colheita").sum()),
-            Nao_Definido=("status_ensaio", lambda x: (x == "Não Definido").sum()),
-        ).reset_index()
-        est_tabela["% Resultado"] = (est_tabela["Com_Resultado"] / est_tabela["Total"] * 100).round(1)
-        est_tabela = est_tabela.sort_values("Total", ascending=False)
-        est_tabela.columns = ["Estado", "Total", "Com Resultado", "Aguardando", "Não Definido", "% Resultado"]
-
-        gb_est = GridOptionsBuilder.from_dataframe(est_tabela)
-        gb_est.configure_default_column(resizable=True, sortable=True, filter=True)
-        gb_est.configure_column("Com Resultado", headerClass="header-com-resultado")
-        gb_est.configure_column("Aguardando", headerClass="header-aguardando")
-        gb_est.configure_column("Não Definido", headerClass="header-nao-definido")
-        gb_est.configure_column("% Resultado", type=["numericColumn"], cellRenderer=pct_renderer)
-        AgGrid(est_tabela, gridOptions=gb_est.build(),
-               fit_columns_on_grid_load=True, height=320,
-               allow_unsafe_jscode=True, theme="alpine",
-               custom_css=custom_css)
+        est_tabela = agregado("est_tabela", lambda: tabela_status(cubo, "estado_nome", "Estado"))
+
+        grade(est_tabela, "est_tabela", colunas_status, altura=320, custom_css=custom_css)
 
     # Linha 4 — Áreas por RC
     if filtro_ativo:
@@ -1008,7 +860,7 @@ if st.session_state["pagina"] == "areas":
             </div>
         """, unsafe_allow_html=True)
 
-        rc = df_filtrado.groupby("usuario_nome").size().reset_index(name="qtd")
+        rc = somar(cubo, ["usuario_nome"]).reset_index(name="qtd")
         rc = rc.sort_values("qtd", ascending=True)
         rc["rotulo"] = rc["qtd"].apply(lambda x: f"{x} áreas" if x >= 10 else "")
 
@@ -1033,9 +885,9 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_rc, use_container_width=True)
 
         # ── Soja vs Milho por RC ─────────────────────────────
-        cult_rc = df_filtrado.groupby(["usuario_nome", "cultura_nome"]).size().reset_index(name="qtd")
+        cult_rc = somar(cubo, ["usuario_nome", "cultura_nome"]).reset_index(name="qtd")
         cult_rc["rotulo"] = cult_rc["qtd"].apply(lambda x: str(x) if x >= 10 else "")
-        cult_order = cult_rc.groupby("usuario_nome")["qtd"].sum().sort_values(ascending=True).index.tolist()
+        cult_order = cult_rc.groupby("usuario_nome", observed=True)["qtd"].sum().sort_values(ascending=True).index.tolist()
 
         fig_cult_rc = px.bar(
             cult_rc, x="qtd", y="usuario_nome", color="cultura_nome",
@@ -1063,50 +915,7 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_cult_rc, use_container_width=True)
 
         # ── Tabela Soja vs Milho por RC ─────────────────────
-        cult_tabela = df_filtrado.groupby(["usuario_nome", "cultura_nome"]).size().reset_index(name="Qtd")
-        cult_tabela = cult_tabela.pivot(index="usuario_nome", columns="cultura_nome", values="Qtd").fillna(0).astype(int)
-        cult_tabela["Total"] = cult_tabela.sum(axis=1)
-        cult_tabela["% Soja"] = (cult_tabela.get("Soja", 0) / cult_tabela["Total"] * 100).round(1)
-        cult_tabela["% Milho"] = (cult_tabela.get("Milho", 0) / cult_tabela["Total"] * 100).round(1)
-        cult_tabela = cult_tabela.sort_values("Total", ascending=False).reset_index()
-        cult_tabela.columns.name = None
-        cult_tabela = cult_tabela.rename(columns={"usuario_nome": "RC"})
-
-        pct_soja_renderer = JsCode("""
-            class ProgressSojaRenderer {
-                init(params) {
-                    this.eGui = document.createElement('div');
-                    this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                    var pct = params.value || 0;
-                    var bar = document.createElement('div');
-                    bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#009D57; opacity:0.25; border-radius:2px;';
-                    var label = document.createElement('span');
-                    label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                    label.innerText = pct.toFixed(1) + '%';
-                    this.eGui.appendChild(bar);
-                    this.eGui.appendChild(label);
-                }
-                getGui() { return this.eGui; }
-            }
-        """)
-
-        pct_milho_renderer = JsCode("""
-            class ProgressMilhoRenderer {
-                init(params) {
-                    this.eGui = document.createElement('div');
-                    this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                    var pct = params.value || 0;
-                    var bar = document.createElement('div');
-                    bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#005FAE; opacity:0.25; border-radius:2px;';
-                    var label = document.createElement('span');
-                    label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                    label.innerText = pct.toFixed(1) + '%';
-                    this.eGui.appendChild(bar);
-                    this.eGui.appendChild(label);
-                }
-                getGui() { return this.eGui; }
-            }
-        """)
+        cult_tabela = tabela_rc(cubo, "cultura_nome", ("Soja", "Milho"))
 
         cult_css = {
             ".header-soja": {"background-color": "rgba(0,157,87,0.25) !important", "color": "#004d2a !important", "font-weight": "700 !important"},
@@ -1115,19 +924,12 @@ if st.session_state["pagina"] == "areas":
             ".header-pct-milho": {"background-color": "rgba(0,95,174,0.12) !important", "color": "#00336b !important", "font-weight": "700 !important"},
         }
 
-        gb_cult = GridOptionsBuilder.from_dataframe(cult_tabela)
-        gb_cult.configure_default_column(resizable=True, sortable=True, filter=True)
-        if "Soja" in cult_tabela.columns:
-            gb_cult.configure_column("Soja", headerClass="header-soja")
-        if "Milho" in cult_tabela.columns:
-            gb_cult.configure_column("Milho", headerClass="header-milho")
-        gb_cult.configure_column("% Soja", type=["numericColumn"], cellRenderer=pct_soja_renderer, headerClass="header-pct-soja")
-        gb_cult.configure_column("% Milho", type=["numericColumn"], cellRenderer=pct_milho_renderer, headerClass="header-pct-milho")
-        gb_cult.configure_column("% Milho", type=["numericColumn"], cellRenderer=pct_milho_renderer)
-        AgGrid(cult_tabela, gridOptions=gb_cult.build(),
-               fit_columns_on_grid_load=True, height=350,
-               allow_unsafe_jscode=True, theme="alpine",
-               custom_css=cult_css)
+        grade(cult_tabela, "cult_tabela", {
+            "Soja":    dict(headerClass="header-soja"),
+            "Milho":   dict(headerClass="header-milho"),
+            "% Soja":  dict(type=["numericColumn"], cellRenderer=barra_percentual("#009D57"), headerClass="header-pct-soja"),
+            "% Milho": dict(type=["numericColumn"], cellRenderer=barra_percentual("#005FAE"), headerClass="header-pct-milho"),
+        }, altura=350, custom_css=cult_css)
     else:
         st.markdown("""
             <div style='padding: 24px 0px; margin-top: 8px;'>
@@ -1140,9 +942,9 @@ if st.session_state["pagina"] == "areas":
     # Linha 5 — Mix de Materiais por RC
     if filtro_ativo:
 
-        mix = df_filtrado.groupby(["usuario_nome", "categoria_material"]).size().reset_index(name="qtd")
+        mix = somar(cubo, ["usuario_nome", "categoria_material"]).reset_index(name="qtd")
         mix["rotulo"] = mix["qtd"].apply(lambda x: str(x) if x >= 15 else "")
-        mix_order = mix.groupby("usuario_nome")["qtd"].sum().sort_values(ascending=True).index.tolist()
+        mix_order = mix.groupby("usuario_nome", observed=True)["qtd"].sum().sort_values(ascending=True).index.tolist()
 
         fig_mix = px.bar(
             mix, x="qtd", y="usuario_nome", color="categoria_material",
@@ -1170,49 +972,7 @@ if st.session_state["pagina"] == "areas":
         st.plotly_chart(fig_mix, use_container_width=True)
 
         # ── Tabela Mix de Materiais por RC ──────────────────
-        mix_tabela = df_filtrado.groupby(["usuario_nome", "categoria_material"]).size().reset_index(name="Qtd")
-        mix_tabela = mix_tabela.pivot(index="usuario_nome", columns="categoria_material", values="Qtd").fillna(0).astype(int)
-        mix_tabela["Total"] = mix_tabela.sum(axis=1)
-        mix_tabela["% STINE"] = (mix_tabela.get("STINE", 0) / mix_tabela["Total"] * 100).round(1)
-        mix_tabela["% Concorrência"] = (mix_tabela.get("Concorrência", 0) / mix_tabela["Total"] * 100).round(1)
-        mix_tabela = mix_tabela.sort_values("Total", ascending=False).reset_index()
-        mix_tabela.columns.name = None
-        mix_tabela = mix_tabela.rename(columns={"usuario_nome": "RC"})
-
-        pct_stine_renderer = JsCode("""
-            class PctStineRenderer {
-                init(params) {
-                    this.eGui = document.createElement('div');
-                    this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                    var pct = params.value || 0;
-                    var bar = document.createElement('div');
-                    bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#7ED321; opacity:0.3; border-radius:2px;';
-                    var label = document.createElement('span');
-                    label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                    label.innerText = pct.toFixed(1) + '%';
-                    this.eGui.appendChild(bar);
-                    this.eGui.appendChild(label);
-                }
-                getGui() { return this.eGui; }
-            }
-        """)
-        pct_concorrencia_renderer = JsCode("""
-            class PctConcorrenciaRenderer {
-                init(params) {
-                    this.eGui = document.createElement('div');
-                    this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                    var pct = params.value || 0;
-                    var bar = document.createElement('div');
-                    bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#4A90D9; opacity:0.3; border-radius:2px;';
-                    var label = document.createElement('span');
-                    label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                    label.innerText = pct.toFixed(1) + '%';
-                    this.eGui.appendChild(bar);
-                    this.eGui.appendChild(label);
-                }
-                getGui() { return this.eGui; }
-            }
-        """)
+        mix_tabela = tabela_rc(cubo, "categoria_material", ("STINE", "Concorrência"))
 
         mix_css = {
             ".header-stine": {"background-color": "rgba(126,211,33,0.25) !important", "color": "#4a7a00 !important", "font-weight": "700 !important"},
@@ -1221,18 +981,12 @@ if st.session_state["pagina"] == "areas":
             ".header-pct-conc": {"background-color": "rgba(74,144,217,0.12) !important", "color": "#1a4d8a !important", "font-weight": "700 !important"},
         }
 
-        gb_mix = GridOptionsBuilder.from_dataframe(mix_tabela)
-        gb_mix.configure_default_column(resizable=True, sortable=True, filter=True)
-        if "STINE" in mix_tabela.columns:
-            gb_mix.configure_column("STINE", headerClass="header-stine")
-        if "Concorrência" in mix_tabela.columns:
-            gb_mix.configure_column("Concorrência", headerClass="header-concorrencia")
-        gb_mix.configure_column("% STINE", type=["numericColumn"], cellRenderer=pct_stine_renderer, headerClass="header-pct-stine")
-        gb_mix.configure_column("% Concorrência", type=["numericColumn"], cellRenderer=pct_concorrencia_renderer, headerClass="header-pct-conc")
-        AgGrid(mix_tabela, gridOptions=gb_mix.build(),
-               fit_columns_on_grid_load=True, height=350,
-               allow_unsafe_jscode=True, theme="alpine",
-               custom_css=mix_css)
+        grade(mix_tabela, "mix_tabela", {
+            "STINE":          dict(headerClass="header-stine"),
+            "Concorrência":   dict(headerClass="header-concorrencia"),
+            "% STINE":        dict(type=["numericColumn"], cellRenderer=barra_percentual("#7ED321", 0.3), headerClass="header-pct-stine"),
+            "% Concorrência": dict(type=["numericColumn"], cellRenderer=barra_percentual("#4A90D9", 0.3), headerClass="header-pct-conc"),
+        }, altura=350, custom_css=mix_css)
     else:
         st.markdown("""
             <div style='padding: 24px 0px; margin-top: 8px;'>
@@ -1283,15 +1037,15 @@ if st.session_state["pagina"] == "areas":
         </div>
     """, unsafe_allow_html=True)
 
+    por_cidade = somar(cubo, ["cidade_nome"])
     top_cidades = (
-        df_filtrado.groupby("cidade_nome")
-        .size()
+        por_cidade
         .reset_index(name="qtd")
         .sort_values("qtd", ascending=False)
         .head(6)
     )
-    outras = df_filtrado.shape[0] - top_cidades["qtd"].sum()
-    n_outras_cidades = df_filtrado["cidade_nome"].nunique() - len(top_cidades)
+    outras = cubo["qtd"].sum() - top_cidades["qtd"].sum()
+    n_outras_cidades = len(por_cidade) - len(top_cidades)
 
     colunas_cid = st.columns(7)
     for i, (_, row) in enumerate(top_cidades.iterrows()):
@@ -1307,41 +1061,7 @@ if st.session_state["pagina"] == "areas":
     # ── Tabela detalhada por cidade ───────────────────────────
     st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
-    cidade_tabela = df_filtrado.groupby(["cidade_nome", "estado_nome"]).agg(
-        Áreas=("resultado_uuid", "count"),
-        Produtores=("fazenda_produtor_uuid", "nunique"),
-        Com_Resultado=("status_ensaio", lambda x: (x == "Com Resultado").sum()),
-        Pot_Soja=("fazenda_area_plantada_soja", "sum"),
-        Pot_Milho=("fazenda_area_plantada_milho", "sum"),
-    ).reset_index()
-
-    cidade_tabela["Pot_Total"] = cidade_tabela["Pot_Soja"] + cidade_tabela["Pot_Milho"]
-    cidade_tabela["% Resultado"] = (cidade_tabela["Com_Resultado"] / cidade_tabela["Áreas"] * 100).round(1)
-    cidade_tabela["Pot. Soja (ha)"] = cidade_tabela["Pot_Soja"].round(0).astype(int)
-    cidade_tabela["Pot. Milho (ha)"] = cidade_tabela["Pot_Milho"].round(0).astype(int)
-    cidade_tabela["Pot. Total (ha)"] = cidade_tabela["Pot_Total"].round(0).astype(int)
-    cidade_tabela = cidade_tabela.sort_values("Áreas", ascending=False)
-    cidade_tabela = cidade_tabela.rename(columns={"cidade_nome": "Cidade", "estado_nome": "Estado"})
-    cidade_tabela = cidade_tabela[["Cidade", "Estado", "Produtores", "Áreas", "Com_Resultado", "Pot. Soja (ha)", "Pot. Milho (ha)", "Pot. Total (ha)", "% Resultado"]]
-    cidade_tabela = cidade_tabela.rename(columns={"Com_Resultado": "Com Resultado"})
-
-    pct_cidade_renderer = JsCode("""
-        class PctCidadeRenderer {
-            init(params) {
-                this.eGui = document.createElement('div');
-                this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                var pct = params.value || 0;
-                var bar = document.createElement('div');
-                bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#009D57; opacity:0.25; border-radius:2px;';
-                var label = document.createElement('span');
-                label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                label.innerText = pct.toFixed(1) + '%';
-                this.eGui.appendChild(bar);
-                this.eGui.appendChild(label);
-            }
-            getGui() { return this.eGui; }
-        }
-    """)
+    cidade_tabela = agregado("cidade_tabela", lambda: tabela_cidades(cubo))
 
     cidade_css = {
         ".header-pot-soja": {"background-color": "rgba(0,157,87,0.2) !important", "color": "#004d2a !important", "font-weight": "700 !important"},
@@ -1349,20 +1069,13 @@ if st.session_state["pagina"] == "areas":
         ".header-com-resultado": {"background-color": "rgba(126,211,33,0.25) !important", "color": "#3a6200 !important", "font-weight": "700 !important"},
     }
 
-    gb_cidade = GridOptionsBuilder.from_dataframe(cidade_tabela)
-    gb_cidade.configure_default_column(resizable=True, sortable=True, filter=True)
-    gb_cidade.configure_column("Com Resultado", headerClass="header-com-resultado")
-    gb_cidade.configure_column("Pot. Soja (ha)", headerClass="header-pot-soja",
-        valueFormatter="value.toLocaleString('pt-BR')")
-    gb_cidade.configure_column("Pot. Milho (ha)", headerClass="header-pot-milho",
-        valueFormatter="value.toLocaleString('pt-BR')")
-    gb_cidade.configure_column("Pot. Total (ha)",
-        valueFormatter="value.toLocaleString('pt-BR')")
-    gb_cidade.configure_column("% Resultado", type=["numericColumn"], cellRenderer=pct_cidade_renderer)
-    AgGrid(cidade_tabela, gridOptions=gb_cidade.build(),
-           fit_columns_on_grid_load=True, height=520,
-           allow_unsafe_jscode=True, theme="alpine",
-           custom_css=cidade_css)
+    grade(cidade_tabela, "cidade_tabela", {
+        "Com Resultado":   dict(headerClass="header-com-resultado"),
+        "Pot. Soja (ha)":  dict(headerClass="header-pot-soja", valueFormatter="value.toLocaleString('pt-BR')"),
+        "Pot. Milho (ha)": dict(headerClass="header-pot-milho", valueFormatter="value.toLocaleString('pt-BR')"),
+        "Pot. Total (ha)": dict(valueFormatter="value.toLocaleString('pt-BR')"),
+        "% Resultado":     dict(type=["numericColumn"], cellRenderer=barra_percentual("#009D57")),
+    }, altura=520, custom_css=cidade_css)
 
 
     # ── Visão Hierárquica Regional → Cidade ──────────────────
@@ -1370,10 +1083,10 @@ if st.session_state["pagina"] == "areas":
         <div style="margin: 32px 0 16px 0;">
             <p style="margin: 0 0 6px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Drilldown por Regional</p>
             <h2 style="margin: 0 0 8px 0; font-size: 26px; font-weight: 800; color: #1a1a1a; line-height: 1.2;">Visão hierárquica das áreas</h2>
-            <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Navegue pela estrutura regional e entenda onde estão concentrados os ensaios. Expanda cada regional para ver as principais cidades, o RC responsável e o produtor com maior volume de ensaios.</p>
+            <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Navegue pela estrutura regional e entenda onde estão concentrados os ensaios. Abra cada regional para ver as principais cidades, o RC responsável e o produtor com maior volume de ensaios.</p>
         </div>
     """, unsafe_allow_html=True)
-    render_visao_hierarquica_regional(df_filtrado)
+    render_visao_hierarquica_regional(df_filtrado, agregado)
 
     # ── Bloco 2: Faixa de Área ───────────────────────────────
     st.markdown("""
@@ -1387,22 +1100,15 @@ if st.session_state["pagina"] == "areas":
     if sel_cultura in ("Soja", "Milho"):
         col_faixa = "faixa_area_soja" if sel_cultura == "Soja" else "faixa_area_milho"
 
-    faixas_ordem = [
-        "Até 50 ha",
-        "50 a 200 ha",
-        "200 a 500 ha",
-        "500 a 2.500 ha",
-        "Acima de 2.500 ha",
-    ]
-
-    soja_qtd  = [df_filtrado[df_filtrado["faixa_area_soja"]  == f].shape[0] for f in faixas_ordem]
-    milho_qtd = [df_filtrado[df_filtrado["faixa_area_milho"] == f].shape[0] for f in faixas_ordem]
+    # Gráfico, tabela e indicadores saem do mesmo perfil — compartilhado, não alterar
+    perfil = agregado("perfil_faixas", lambda: perfil_faixas(df_filtrado))
+    faixas_ordem = perfil.index.tolist()
 
-    total_soja  = sum(soja_qtd)  or 1
-    total_milho = sum(milho_qtd) or 1
+    soja_qtd  = perfil["Soja"].tolist()
+    milho_qtd = perfil["Milho"].tolist()
 
-    soja_rotulo  = [f"{q} ({round(q/total_soja*100,1)}%)"  for q in soja_qtd]
-    milho_rotulo = [f"{q} ({round(q/total_milho*100,1)}%)" for q in milho_qtd]
+    soja_rotulo  = [f"{q} ({p}%)" for q, p in zip(soja_qtd,  perfil["pct_soja"])]
+    milho_rotulo = [f"{q} ({p}%)" for q, p in zip(milho_qtd, perfil["pct_milho"])]
 
     fig_faixa = go.Figure()
 
@@ -1464,33 +1170,20 @@ if st.session_state["pagina"] == "areas":
     st.plotly_chart(fig_faixa, use_container_width=True)
 
     # ── Tabela por Perfil de Potencial ────────────────────────
-    faixa_rows = []
-    for f in faixas_ordem:
-        s = df_filtrado[df_filtrado["faixa_area_soja"] == f].shape[0]
-        m = df_filtrado[df_filtrado["faixa_area_milho"] == f].shape[0]
-        total = s + m
-        faixa_rows.append({
-            "Perfil de Potencial": f,
-            "Soja": s,
-            "Milho": m,
-            "Total": total,
-            "% Soja": round(s / total * 100, 1) if total > 0 else 0.0,
-            "% Milho": round(m / total * 100, 1) if total > 0 else 0.0,
-        })
-    faixa_tabela = pd.DataFrame(faixa_rows)
+    faixa_tabela = perfil[["Soja", "Milho", "Total", "% Soja", "% Milho"]].reset_index()
 
     # ── Indicador: % ensaios em faixas de alto potencial ─────
     faixas_alto = ["500 a 2.500 ha", "Acima de 2.500 ha"]
-    ensaios_alto_soja  = df_filtrado[df_filtrado["faixa_area_soja"].isin(faixas_alto)].shape[0]
-    ensaios_alto_milho = df_filtrado[df_filtrado["faixa_area_milho"].isin(faixas_alto)].shape[0]
-    total_soja_faixa   = df_filtrado["faixa_area_soja"].notna().sum()
-    total_milho_faixa  = df_filtrado["faixa_area_milho"].notna().sum()
+    ensaios_alto_soja  = int(perfil.loc[faixas_alto, "Soja"].sum())
+    ensaios_alto_milho = int(perfil.loc[faixas_alto, "Milho"].sum())
+    total_soja_faixa   = int(perfil["Soja"].sum())
+    total_milho_faixa  = int(perfil["Milho"].sum())
     pct_alto_soja  = round(ensaios_alto_soja  / total_soja_faixa  * 100, 1) if total_soja_faixa  > 0 else 0
     pct_alto_milho = round(ensaios_alto_milho / total_milho_faixa * 100, 1) if total_milho_faixa > 0 else 0
 
     # Faixa dominante — mesma lógica da tabela (contagem de ensaios por faixa)
-    soja_por_faixa  = {f: df_filtrado[df_filtrado["faixa_area_soja"]  == f].shape[0] for f in faixas_ordem}
-    milho_por_faixa = {f: df_filtrado[df_filtrado["faixa_area_milho"] == f].shape[0] for f in faixas_ordem}
+    soja_por_faixa  = dict(zip(faixas_ordem, soja_qtd))
+    milho_por_faixa = dict(zip(faixas_ordem, milho_qtd))
     faixa_dom_soja  = max(soja_por_faixa,  key=soja_por_faixa.get)  if any(soja_por_faixa.values())  else "—"
     faixa_dom_milho = max(milho_por_faixa, key=milho_por_faixa.get) if any(milho_por_faixa.values()) else "—"
     n_dom_soja  = soja_por_faixa[faixa_dom_soja]   if faixa_dom_soja  != "—" else 0
@@ -1520,41 +1213,6 @@ if st.session_state["pagina"] == "areas":
         </div>
     """, unsafe_allow_html=True)
 
-    pct_faixa_soja = JsCode("""
-        class PctFaixaSoja {
-            init(params) {
-                this.eGui = document.createElement('div');
-                this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                var pct = params.value || 0;
-                var bar = document.createElement('div');
-                bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#009D57; opacity:0.25; border-radius:2px;';
-                var label = document.createElement('span');
-                label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                label.innerText = pct.toFixed(1) + '%';
-                this.eGui.appendChild(bar);
-                this.eGui.appendChild(label);
-            }
-            getGui() { return this.eGui; }
-        }
-    """)
-    pct_faixa_milho = JsCode("""
-        class PctFaixaMilho {
-            init(params) {
-                this.eGui = document.createElement('div');
-                this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
-                var pct = params.value || 0;
-                var bar = document.createElement('div');
-                bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:#005FAE; opacity:0.25; border-radius:2px;';
-                var label = document.createElement('span');
-                label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
-                label.innerText = pct.toFixed(1) + '%';
-                this.eGui.appendChild(bar);
-                this.eGui.appendChild(label);
-            }
-            getGui() { return this.eGui; }
-        }
-    """)
-
     faixa_css = {
         ".header-soja-faixa": {"background-color": "rgba(0,157,87,0.25) !important", "color": "#004d2a !important", "font-weight": "700 !important"},
         ".header-milho-faixa": {"background-color": "rgba(0,95,174,0.2) !important", "color": "#00336b !important", "font-weight": "700 !important"},
@@ -1562,16 +1220,12 @@ if st.session_state["pagina"] == "areas":
         ".header-pct-milho-faixa": {"background-color": "rgba(0,95,174,0.12) !important", "color": "#00336b !important", "font-weight": "700 !important"},
     }
 
-    gb_faixa = GridOptionsBuilder.from_dataframe(faixa_tabela)
-    gb_faixa.configure_default_column(resizable=True, sortable=True)
-    gb_faixa.configure_column("Soja", headerClass="header-soja-faixa")
-    gb_faixa.configure_column("Milho", headerClass="header-milho-faixa")
-    gb_faixa.configure_column("% Soja", type=["numericColumn"], cellRenderer=pct_faixa_soja, headerClass="header-pct-soja-faixa")
-    gb_faixa.configure_column("% Milho", type=["numericColumn"], cellRenderer=pct_faixa_milho, headerClass="header-pct-milho-faixa")
-    AgGrid(faixa_tabela, gridOptions=gb_faixa.build(),
-           fit_columns_on_grid_load=True, height=360,
-           allow_unsafe_jscode=True, theme="alpine",
-           custom_css=faixa_css)
+    grade(faixa_tabela, "faixa_tabela", {
+        "Soja":    dict(headerClass="header-soja-faixa"),
+        "Milho":   dict(headerClass="header-milho-faixa"),
+        "% Soja":  dict(type=["numericColumn"], cellRenderer=barra_percentual("#009D57"), headerClass="header-pct-soja-faixa"),
+        "% Milho": dict(type=["numericColumn"], cellRenderer=barra_percentual("#005FAE"), headerClass="header-pct-milho-faixa"),
+    }, altura=360, custom_css=faixa_css)
 
 
 # ═══════════════════════════════════════════════════════════
@@ -1579,4 +1233,21 @@ if st.session_state["pagina"] == "areas":
 # ═══════════════════════════════════════════════════════════
 elif st.session_state["pagina"] == "performance":
     from performance import render_performance
-    render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, COR_MILHO, filtro_ativo, sel_cultura, render_visao_hierarquica_regional)
\ No newline at end of file
+    render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, COR_MILHO, filtro_ativo, sel_cultura, render_visao_hierarquica_regional, agregado, chave_recorte)
+
+
+# ── Desempenho (sidebar) ─────────────────────────────────
+# Fica no fim do script para já contar as consultas deste rerun
+with st.sidebar.expander("⚙️ Desempenho"):
+    _stats = recortes.estatisticas()
+    st.caption(
+        f"Cache de recortes: {_stats['itens']} itens · {_stats['bytes'] / 2**20:.1f} MB  \n".replace(".", ",") +
+        f"Hits {_stats['hits']} · misses {_stats['misses']} · evictions {_stats['evictions']} · expirados {_stats['expirados']} "
+        f"({_stats['taxa_hit']:.0%} hit)"
+    )
+    _memoria = _sincronizador().memoria
+    if _memoria:
+        st.caption(
+            f"Base: {len(df):,} linhas · {_memoria['depois'] / 2**20:.0f} MB em memória "
+            f"({(_memoria['antes'] - _memoria['depois']) / 2**20:.0f} MB economizados pelo esquema)".replace(",", ".")
+        )
@@ -0,0 +1,4 @@
+"""Benchmarks do pipeline do dashboard sobre dados sintéticos.
+
+Rodar a partir da raiz do repositório, ex.: python -m benchmarks.bench_rerun
+"""
@@ -0,0 +1,98 @@
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from agregacoes import montar_cubo, somar, somar_status
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+
+# ── Página Áreas: um groupby por seção vs cubo + somas ───
+# Cada lado devolve os mesmos números que a página mostra (KPIs, gráficos e tabelas).
+
+
+def secoes_legadas(df):
+    """Agregações como eram no app.py, cada uma sobre df_filtrado."""
+    unicos = df.drop_duplicates(subset="fazenda_produtor_uuid")
+    cidades = df.groupby(["cidade_nome", "estado_nome"], observed=True).agg(
+        Areas=("resultado_uuid", "count"),
+        Produtores=("fazenda_produtor_uuid", "nunique"),
+        Com_Resultado=("status_ensaio", lambda x: (x == "Com Resultado").sum()),
+        Pot_Soja=("fazenda_area_plantada_soja", "sum"),
+    )
+    return {
+        "clientes":  df["fazenda_produtor_uuid"].nunique(),
+        "pot_soja":  int(unicos["fazenda_area_plantada_soja"].fillna(0).sum()),
+        "status":    df["status_ensaio"].value_counts().loc[lambda c: c > 0].sort_index(),
+        "reg":       df.groupby(["regional_nome", "status_ensaio"], observed=True).size(),
+        "est":       df.groupby(["estado_nome", "status_ensaio"], observed=True).size(),
+        "rc":        df.groupby("usuario_nome", observed=True).size(),
+        "cult_rc":   df.groupby(["usuario_nome", "cultura_nome"], observed=True).size(),
+        "mix":       df.groupby(["usuario_nome", "categoria_material"], observed=True).size(),
+        "cidades":   cidades,
+        "top":       df.groupby("cidade_nome", observed=True).size().nlargest(6),
+    }
+
+
+def secoes_cubo(df):
+    cubo = montar_cubo(df)
+    grupos = cubo.groupby(level=["cidade_nome", "estado_nome"], observed=True)
+    cidades = pd.DataFrame({
+        "Areas":         grupos["qtd"].sum(),
+        "Produtores":    grupos["produtores_cidade"].sum(),
+        "Com_Resultado": somar_status(cubo, ["cidade_nome", "estado_nome"])["Com Resultado"],
+        "Pot_Soja":      grupos["pot_soja"].sum(),
+    })
+    return {
+        "clientes":  cubo["clientes"].sum(),
+        "pot_soja":  int(cubo["pot_soja_produtor"].sum()),
+        "status":    somar(cubo, ["status_ensaio"]).sort_index(),
+        "reg":       somar(cubo, ["regional_nome", "status_ensaio"]),
+        "est":       somar(cubo, ["estado_nome", "status_ensaio"]),
+        "rc":        somar(cubo, ["usuario_nome"]),
+        "cult_rc":   somar(cubo, ["usuario_nome", "cultura_nome"]),
+        "mix":       somar(cubo, ["usuario_nome", "categoria_material"]),
+        "cidades":   cidades,
+        "top":       somar(cubo, ["cidade_nome"]).nlargest(6),
+    }
+
+
+def conferir(a, b):
+    for nome in a:
+        x, y = a[nome], b[nome]
+        if isinstance(x, (pd.Series, pd.DataFrame)):
+            (pd.testing.assert_frame_equal if isinstance(x, pd.DataFrame) else pd.testing.assert_series_equal)(
+                x, y, check_names=False, check_dtype=False, check_exact=False,
+            )
+        elif x != y:
+            raise AssertionError(f"{nome}: {x} != {y}")
+
+
+def _mediana(fn, df, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(df)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'células':>9} {'por seção (ms)':>15} {'cubo (ms)':>10} {'ganho':>7}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+        conferir(secoes_legadas(df), secoes_cubo(df))
+
+        antes  = _mediana(secoes_legadas, df)
+        depois = _mediana(secoes_cubo, df)
+        print(f"{n:>10,} {len(montar_cubo(df)):>9,} {antes * 1000:>15.1f} {depois * 1000:>10.1f} {antes / depois:>6.1f}x")
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sintetico import gerar_resultados
+from dados import GRUPO_PRODUTOR, _ano_safra, _classificar_produtor, _safra_completa, _status_ensaio, tratar_dados
+
+# ── Paridade e tempo: status / ano_safra / safra_completa / classificação ──
+# Versão linha a linha mantida aqui só como referência — é o que tratar_dados fazia com df.apply.
+
+
+def _status_legado(row):
+    plantio  = pd.notna(row["resultado_data_plantio"])
+    colheita = pd.notna(row["resultado_data_colheita"])
+    prod     = pd.notna(row["resultado_prod_scha_corrigido"]) and row["resultado_prod_scha_corrigido"] > 0
+
+    if plantio and colheita and prod:
+        return "Com Resultado"
+    elif (plantio and colheita and not prod) or (plantio and not colheita and not prod):
+        return "Aguardando Colheita"
+    else:
+        return "Não Definido"
+
+
+def _ano_safra_legado(dt):
+    if pd.isna(dt):
+        return "Sem data"
+    mes   = dt.month
+    ano   = dt.year
+    safra = ano if mes >= 7 else ano - 1
+    return f"{safra}/{str(safra + 1)[-2:]}"
+
+
+def _classificar_legado(pct):
+    if pct == 1.0:
+        return "100% STINE"
+    elif pct > 0.7:
+        return "Maioria STINE (>70%)"
+    elif pct >= 0.3:
+        return "Misto (30-70%)"
+    elif pct > 0:
+        return "Maioria Conc (<30%)"
+    else:
+        return "100% Concorrência"
+
+
+def _classificacao_legado(df):
+    _pct = df.groupby(GRUPO_PRODUTOR)["tratamentos_is_stine"].apply(
+        lambda x: (x == 1.0).sum() / len(x)
+    ).reset_index(name="pct_stine")
+    _pct["classificacao_produtor"] = _pct["pct_stine"].apply(_classificar_legado)
+    return df[GRUPO_PRODUTOR].merge(_pct, on=GRUPO_PRODUTOR, how="left")["classificacao_produtor"]
+
+
+def _legado(df):
+    status = df.apply(_status_legado, axis=1)
+    ano_safra = df["resultado_data_plantio_dt"].apply(_ano_safra_legado)
+    completa = pd.concat([df["resultado_epoca"], ano_safra], axis=1, keys=["epoca", "ano"]).apply(
+        lambda row: "Sem data" if row["ano"] == "Sem data" else row["epoca"] + " " + row["ano"],
+        axis=1
+    )
+    return status, ano_safra, completa, _classificacao_legado(df)
+
+
+def _vetorizado(df):
+    ano_safra = _ano_safra(df["resultado_data_plantio_dt"])
+    pct = df["tratamentos_is_stine"].eq(1.0).groupby([df[c] for c in GRUPO_PRODUTOR]).transform("mean")
+    return (
+        pd.Series(_status_ensaio(df), index=df.index),
+        ano_safra,
+        _safra_completa(df["resultado_epoca"], ano_safra),
+        pd.Series(_classificar_produtor(pct.to_numpy()), index=df.index),
+    )
+
+
+def _casos_limite():
+    """Combinações que o gerador quase não produz: colheita sem plantio, data inválida, virada de junho/julho,
+    produtor misto, produtor só com concorrência e linha sem produtor."""
+    return pd.DataFrame({
+        "resultado_data_plantio":        ["2023-06-30", "2023-07-01", None, "data-ruim", "1999-12-31", "2024-01-15", "2024-09-01"],
+        "resultado_data_colheita":       ["2023-10-01", None, "2023-12-01", "2024-02-01", None, "2024-05-01", None],
+        "resultado_epoca":               ["Safra", "Safrinha", "Safra", "Safra", "Safrinha", "Safra", "Safra"],
+        "resultado_prod_scha_corrigido": [55.0, pd.NA, 60.0, 0.0, -1.0, np.nan, np.nan],
+        "tratamentos_is_stine":          [1.0, 0.0, 1.0, 0.0, np.nan, 0.0, 1.0],
+        "fazenda_produtor":              ["A", "A", "B", "C", "C", "C", None],
+        "cultura_nome":                  ["Soja", "Soja", "Milho", "Soja", "Soja", "Milho", "Soja"],
+    })
+
+
+def _preparar(df):
+    df = df.copy()
+    df["resultado_data_plantio_dt"] = pd.to_datetime(df["resultado_data_plantio"], errors="coerce", format="mixed")
+    df["resultado_prod_scha_corrigido"] = df["resultado_prod_scha_corrigido"].replace(0, pd.NA)
+    return df
+
+
+def conferir(df):
+    nomes = ("status_ensaio", "ano_safra", "safra_completa", "classificacao_produtor")
+    for nome, antes, depois in zip(nomes, _legado(df), _vetorizado(df)):
+        antes, depois = antes.astype(object).to_numpy(), depois.astype(object).to_numpy()
+        diferentes = ((antes != depois) & ~(pd.isna(antes) & pd.isna(depois))).sum()
+        if diferentes:
+            raise AssertionError(f"{nome}: {diferentes} linhas diferentes da versão linha a linha")
+
+
+def _cronometrar(fn):
+    inicio = time.perf_counter()
+    fn()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    conferir(_preparar(_casos_limite()))
+
+    print(f"{'linhas':>10} {'linha a linha (s)':>18} {'vetorizado (s)':>15} {'ganho':>8}")
+    for n in args.tamanhos:
+        df = _preparar(gerar_resultados(n))
+        conferir(df)
+        antes  = _cronometrar(lambda: _legado(df))
+        depois = _cronometrar(lambda: _vetorizado(df))
+        print(f"{n:>10,} {antes:>18.3f} {depois:>15.3f} {antes / depois:>7.0f}x")
+
+    # Ponta a ponta: o frame tratado continua batendo com a referência
+    conferir(tratar_dados(gerar_resultados(5_000)))
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
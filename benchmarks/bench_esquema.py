@@ -0,0 +1,51 @@
+import argparse
+import statistics
+import time
+
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+
+# ── Memória e filtros: frame tratado em object vs esquema compacto ──
+# Mede o que o app faz a cada rerun: isin da sidebar e groupby(...).size() dos gráficos.
+
+
+def _mediana(fn, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def _operacoes(df):
+    cidades = df["cidade_nome"].dropna().unique()[:40].tolist()
+    return {
+        "isin cidade":            lambda: df["cidade_nome"].isin(cidades),
+        "regional × status":      lambda: df.groupby(["regional_nome", "status_ensaio"], observed=True).size(),
+        "RC × material":          lambda: df.groupby(["usuario_nome", "categoria_material"], observed=True).size(),
+        "value_counts status":    lambda: df["status_ensaio"].value_counts(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for n in args.tamanhos:
+        tratado = tratar_dados(gerar_resultados(n))
+        antes_ops = {nome: _mediana(fn) for nome, fn in _operacoes(tratado).items()}
+
+        compacto, antes, depois = aplicar_esquema(tratado.copy())
+        depois_ops = {nome: _mediana(fn) for nome, fn in _operacoes(compacto).items()}
+
+        print(f"\n{n:,} linhas — memória {antes / 2**20:,.1f} MB → {depois / 2**20:,.1f} MB "
+              f"({(1 - depois / antes) * 100:.0f}% a menos)")
+        print(f"  {'operação':<22} {'object (ms)':>12} {'categórica (ms)':>16}")
+        for nome in antes_ops:
+            print(f"  {nome:<22} {antes_ops[nome] * 1000:>12.2f} {depois_ops[nome] * 1000:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
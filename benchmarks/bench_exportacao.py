@@ -0,0 +1,66 @@
+import argparse
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+from exportacao import gerar_arquivo
+
+# ── Exportação: to_excel (openpyxl) vs gerador em fluxo por formato ───
+COLUNAS = [
+    "tratamentos_nome", "categoria_material", "cultura_nome", "regional_nome", "estado_sigla",
+    "cidade_nome", "status_ensaio", "data_plantio", "resultado_prod_scha_corrigido",
+]
+
+
+def excel_legado(df):
+    """Como era o _dl_btn: DataFrame inteiro no openpyxl, a cada rerun."""
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False, engine="openpyxl")
+    return buf.getvalue()
+
+
+def _medir(fn, df):
+    """Tempo de uma geração e, numa segunda passada (o tracemalloc deixa tudo mais lento), o pico de memória em MB."""
+    inicio = time.perf_counter()
+    dados = fn(df)
+    tempo = time.perf_counter() - inicio
+    tracemalloc.start()
+    fn(df)
+    pico = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return dados, tempo, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'formato':>14} {'tempo (s)':>10} {'pico (MB)':>10} {'arquivo (MB)':>13}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+        df = df[[c for c in COLUNAS if c in df.columns]].reset_index(drop=True)
+
+        for nome, fn in (
+            ("to_excel",  excel_legado),
+            ("xlsx",      lambda d: gerar_arquivo(d, "xlsx")),
+            ("csv",       lambda d: gerar_arquivo(d, "csv")),
+            ("parquet",   lambda d: gerar_arquivo(d, "parquet")),
+        ):
+            dados, tempo, pico = _medir(fn, df)
+            print(f"{n:>10,} {nome:>14} {tempo:>10.2f} {pico:>10.1f} {len(dados) / 1e6:>13.2f}")
+            if nome == "xlsx":
+                # Mesmo conteúdo que o arquivo do to_excel
+                pd.testing.assert_frame_equal(
+                    pd.read_excel(io.BytesIO(dados)),
+                    pd.read_excel(io.BytesIO(excel_legado(df))),
+                )
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+from filtros import IndiceFiltros, aplicar_linhas, cascata, recorte_final
+
+# ── Cascata da sidebar: cópias + isin encadeados vs índice invertido ──
+# Cada seleção devolve as listas de opções de todos os níveis e o frame filtrado final.
+
+
+def cascata_legada(df, sel):
+    """Cascata como era no app.py: df_temp … df_temp5 e um segundo filtro para df_filtrado."""
+    opcoes = {}
+    df_temp = df.copy()
+    if sel["cultura"] != "Todos":
+        df_temp = df_temp[df_temp["cultura_nome"] == sel["cultura"]]
+    opcoes["safra"] = sorted(df_temp["safra_completa"].dropna().unique().tolist())
+    if sel["safra"] != "Todos":
+        df_temp = df_temp[df_temp["safra_completa"] == sel["safra"]]
+    opcoes["regional"] = sorted(df_temp["regional_nome"].dropna().unique().tolist())
+    df_temp2 = df_temp[df_temp["regional_nome"].isin(sel["regional"])] if sel["regional"] else df_temp
+    opcoes["estado"] = sorted(df_temp2["estado_nome"].dropna().unique().tolist())
+    df_temp3 = df_temp2[df_temp2["estado_nome"].isin(sel["estado"])] if sel["estado"] else df_temp2
+    opcoes["cidade"] = sorted(df_temp3["cidade_nome"].dropna().unique().tolist())
+    df_temp4 = df_temp3[df_temp3["cidade_nome"].isin(sel["cidade"])] if sel["cidade"] else df_temp3
+    opcoes["status"] = sorted(df_temp4["status_ensaio"].dropna().unique().tolist())
+    opcoes["usuario"] = sorted(df_temp4["usuario_nome"].dropna().unique().tolist())
+    df_temp5 = df_temp4[df_temp4["usuario_nome"].isin(sel["usuario"])] if sel["usuario"] else df_temp4
+    opcoes["time"] = sorted(df_temp5["usuario_time"].dropna().unique().tolist())
+
+    df_filtrado = df.copy()
+    if sel["cultura"] != "Todos":
+        df_filtrado = df_filtrado[df_filtrado["cultura_nome"] == sel["cultura"]]
+    if sel["safra"] != "Todos":
+        df_filtrado = df_filtrado[df_filtrado["safra_completa"] == sel["safra"]]
+    todos = pd.Series(True, index=df_filtrado.index)
+    df_filtrado = df_filtrado[
+        (df_filtrado["regional_nome"].isin(sel["regional"]) if sel["regional"] else todos) &
+        (df_filtrado["estado_nome"].isin(sel["estado"]) if sel["estado"] else todos) &
+        (df_filtrado["cidade_nome"].isin(sel["cidade"]) if sel["cidade"] else todos) &
+        (df_filtrado["status_ensaio"].isin(sel["status"]) if sel["status"] else todos) &
+        (df_filtrado["usuario_nome"].isin(sel["usuario"]) if sel["usuario"] else todos) &
+        (df_filtrado["usuario_time"].isin(sel["time"]) if sel["time"] else todos)
+    ]
+    return opcoes, df_filtrado
+
+
+# Nível da cascata (filtros.CASCATA) → chave da seleção nas funções deste benchmark
+NIVEIS = {
+    "cultura_nome": "cultura", "safra_completa": "safra", "regional_nome": "regional", "estado_nome": "estado",
+    "cidade_nome": "cidade", "status_ensaio": "status", "usuario_nome": "usuario", "usuario_time": "time",
+}
+
+
+def cascata_indice(df, indice, sel):
+    """Cascata do app.py atual (filtros.cascata), com a sidebar trocada por `sel`."""
+    opcoes = {}
+
+    def escolher(col, valores):
+        nivel = NIVEIS[col]
+        # A legada não guarda as opções de cultura (sempre todas)
+        if nivel != "cultura":
+            opcoes[nivel] = valores
+        if nivel in ("cultura", "safra"):
+            return [sel[nivel]] if sel[nivel] != "Todos" else []
+        return sel[nivel]
+
+    selecoes, linhas = cascata(indice, escolher)
+    return opcoes, aplicar_linhas(df, recorte_final(indice, linhas, selecoes))
+
+
+def selecoes(df, rng, quantidade):
+    """Seleções aleatórias no estilo da sidebar — de nenhum filtro até todos os níveis marcados."""
+    def alguns(col, k):
+        valores = df[col].dropna().unique().tolist()
+        return rng.choice(valores, size=min(k, len(valores)), replace=False).tolist() if k else []
+
+    yield {"cultura": "Todos", "safra": "Todos", "regional": [], "estado": [], "cidade": [],
+           "status": [], "usuario": [], "time": []}
+    for _ in range(quantidade):
+        yield {
+            "cultura":  rng.choice(["Todos", "Soja", "Milho"]),
+            "safra":    rng.choice(["Todos"] + df["safra_completa"].dropna().unique().tolist()),
+            "regional": alguns("regional_nome", rng.integers(0, 3)),
+            "estado":   alguns("estado_nome", rng.integers(0, 3)),
+            "cidade":   alguns("cidade_nome", rng.choice([0, 0, 5, 40])),
+            "status":   alguns("status_ensaio", rng.integers(0, 2)),
+            "usuario":  alguns("usuario_nome", rng.choice([0, 0, 3])),
+            "time":     alguns("usuario_time", rng.integers(0, 2)),
+        }
+
+
+def conferir(df, indice, sel):
+    opcoes_a, filtrado_a = cascata_legada(df, sel)
+    opcoes_b, filtrado_b = cascata_indice(df, indice, sel)
+    if opcoes_a != opcoes_b:
+        raise AssertionError(f"opções diferentes para {sel}")
+    if not filtrado_a.index.equals(filtrado_b.index):
+        raise AssertionError(f"linhas diferentes para {sel}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--selecoes", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'índice (ms)':>12} {'legado (ms)':>12} {'indexado (ms)':>14} {'ganho':>7}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+
+        inicio = time.perf_counter()
+        indice = IndiceFiltros(df)
+        montagem = time.perf_counter() - inicio
+
+        antes, depois = [], []
+        for sel in selecoes(df, np.random.default_rng(n), args.selecoes):
+            conferir(df, indice, sel)
+            inicio = time.perf_counter()
+            cascata_legada(df, sel)
+            antes.append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            cascata_indice(df, indice, sel)
+            depois.append(time.perf_counter() - inicio)
+
+        antes, depois = statistics.median(antes), statistics.median(depois)
+        print(f"{n:>10,} {montagem * 1000:>12.1f} {antes * 1000:>12.1f} {depois * 1000:>14.1f} {antes / depois:>6.0f}x")
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import statistics
+import time
+
+import pandas as pd
+from st_aggrid import GridOptionsBuilder
+
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+from grade import _buscar, barra_percentual, opcoes_grade, pagina_servidor
+
+# ── Grade por cidade: tabela inteira + GridOptionsBuilder a cada rerun vs página + opções em cache ───
+COLUNAS = {
+    "Com Resultado":   dict(headerClass="header-com-resultado"),
+    "Pot. Soja (ha)":  dict(headerClass="header-pot-soja", valueFormatter="value.toLocaleString('pt-BR')"),
+    "Pot. Milho (ha)": dict(headerClass="header-pot-milho", valueFormatter="value.toLocaleString('pt-BR')"),
+    "% Resultado":     dict(type=["numericColumn"], cellRenderer=barra_percentual("#009D57")),
+}
+
+
+def tabela_cidades(df):
+    """Mesmas colunas da tabela detalhada por cidade da página Áreas."""
+    grupos = df.groupby(["cidade_nome", "estado_nome"], observed=True)
+    tabela = pd.DataFrame({
+        "Áreas":           grupos.size(),
+        "Produtores":      grupos["fazenda_produtor_uuid"].nunique(),
+        "Com Resultado":   grupos["status_ensaio"].apply(lambda s: (s == "Com Resultado").sum()),
+        "Pot. Soja (ha)":  grupos["fazenda_area_plantada_soja"].sum().round(0).astype(int),
+        "Pot. Milho (ha)": grupos["fazenda_area_plantada_milho"].sum().round(0).astype(int),
+    }).reset_index().rename(columns={"cidade_nome": "Cidade", "estado_nome": "Estado"})
+    tabela["% Resultado"] = (tabela["Com Resultado"] / tabela["Áreas"] * 100).round(1)
+    return tabela.sort_values("Áreas", ascending=False).reset_index(drop=True)
+
+
+def rerun_legado(tabela):
+    """Como era: GridOptionsBuilder do zero e todas as linhas serializadas."""
+    gb = GridOptionsBuilder.from_dataframe(tabela)
+    gb.configure_default_column(resizable=True, sortable=True, filter=True)
+    for coluna, config in COLUNAS.items():
+        gb.configure_column(coluna, **config)
+    gb.build()
+    return tabela.to_json(orient="records", date_format="iso")
+
+
+def rerun_paginado(tabela, termo="", ordem=(("Cidade", True),), pagina=1):
+    """Como está no grade.py: opções em cache, busca e ordenação no servidor, uma página serializada."""
+    opcoes_grade("bench_cidades", tabela, COLUNAS)
+    visivel = pagina_servidor(_buscar(tabela, termo), list(ordem), pagina)
+    return visivel.to_json(orient="records", date_format="iso")
+
+
+def _mediana(fn, repeticoes=20):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'cidades':>8} {'payload antes (KB)':>19} {'página (KB)':>12} {'rerun antes (ms)':>17} {'paginado (ms)':>14}")
+    for n in args.tamanhos:
+        tabela = tabela_cidades(aplicar_esquema(tratar_dados(gerar_resultados(n)))[0])
+        print(
+            f"{n:>10,} {len(tabela):>8} "
+            f"{len(rerun_legado(tabela).encode()) / 1024:>19.1f} {len(rerun_paginado(tabela).encode()) / 1024:>12.1f} "
+            f"{_mediana(lambda: rerun_legado(tabela)) * 1000:>17.2f} {_mediana(lambda: rerun_paginado(tabela)) * 1000:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
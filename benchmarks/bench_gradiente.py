@@ -0,0 +1,98 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from agregacoes import estatisticas_grupos
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+
+# ── Gradiente de performance: lambdas + traces por material vs kernel + traces em lote ───
+CHAVES = ["tratamentos_nome", "categoria_material"]
+VALOR  = "resultado_prod_scha_corrigido"
+COR    = "0,157,87"
+
+
+def stats_legado(df):
+    stats = (
+        df.groupby(CHAVES, observed=True)[VALOR]
+        .agg(n="count", media="mean", std="std", minv="min", maxv="max",
+             q1=lambda x: x.quantile(0.25), q3=lambda x: x.quantile(0.75))
+        .reset_index()
+    )
+    stats["std"] = stats["std"].fillna(0)
+    return stats
+
+
+def figura_legado(df):
+    """Como era no performance.py: 3 go.Bar, 1 shape e 1 anotação por material."""
+    stats = stats_legado(df).sort_values("media", ascending=True)
+    cultivares = stats["tratamentos_nome"].tolist()
+    fig = go.Figure()
+    for _, row in stats.iterrows():
+        rgb = COR if row["categoria_material"] == "STINE" else "150,150,150"
+        y_pos = cultivares.index(row["tratamentos_nome"])
+        std_low, std_high = max(row["media"] - row["std"], row["minv"]), min(row["media"] + row["std"], row["maxv"])
+        for inicio, fim, alfa in ((row["minv"], row["maxv"], "0.12"), (std_low, std_high, "0.28"), (row["q1"], row["q3"], "0.50")):
+            fig.add_trace(go.Bar(y=[row["tratamentos_nome"]], x=[fim - inicio], base=[inicio], orientation="h",
+                                 width=0.55, marker=dict(color=f"rgba({rgb},{alfa})", line_width=0)))
+        fig.add_shape(type="line", y0=y_pos - 0.28, y1=y_pos + 0.28, x0=row["media"], x1=row["media"], xref="x", yref="y")
+        fig.add_annotation(x=row["media"], y=y_pos + 0.32, text=f"<b>{row['media']:.1f}</b> (n={int(row['n'])})", showarrow=False)
+    return fig
+
+
+def figura_lote(df):
+    """Como está no performance.py: um go.Bar por camada, shapes e anotações num update_layout."""
+    stats = estatisticas_grupos(df, CHAVES, VALOR).sort_values("media", ascending=True)
+    cultivares = stats["tratamentos_nome"].tolist()
+    rgb = np.where(stats["categoria_material"] == "STINE", COR, "150,150,150")
+    std_low  = np.maximum(stats["media"] - stats["std"], stats["minv"])
+    std_high = np.minimum(stats["media"] + stats["std"], stats["maxv"])
+    fig = go.Figure()
+    for inicio, fim, alfa in ((stats["minv"], stats["maxv"], "0.12"), (std_low, std_high, "0.28"), (stats["q1"], stats["q3"], "0.50")):
+        fig.add_trace(go.Bar(y=cultivares, x=fim - inicio, base=inicio, orientation="h",
+                             width=0.55, marker=dict(color=[f"rgba({c},{alfa})" for c in rgb], line_width=0)))
+    medias = stats["media"].tolist()
+    fig.update_layout(
+        shapes=[dict(type="line", y0=y - 0.28, y1=y + 0.28, x0=m, x1=m, xref="x", yref="y") for y, m in enumerate(medias)],
+        annotations=[dict(x=m, y=y + 0.32, text=f"<b>{m:.1f}</b> (n={n})", showarrow=False)
+                     for y, (m, n) in enumerate(zip(medias, stats["n"].astype(int)))],
+    )
+    return fig
+
+
+def _mediana(fn, df, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(df)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'materiais':>9} {'stats lambda (ms)':>18} {'kernel (ms)':>12} {'figura antes (ms)':>18} {'em lote (ms)':>13} {'traces':>9}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+        pd.testing.assert_frame_equal(stats_legado(df), estatisticas_grupos(df, CHAVES, VALOR), check_dtype=False)
+
+        antes, depois = figura_legado(df), figura_lote(df)
+        print(
+            f"{n:>10,} {len(depois.data[0].y):>9} "
+            f"{_mediana(stats_legado, df) * 1000:>18.1f} "
+            f"{_mediana(lambda d: estatisticas_grupos(d, CHAVES, VALOR), df) * 1000:>12.1f} "
+            f"{_mediana(figura_legado, df, 3) * 1000:>18.1f} {_mediana(figura_lote, df, 3) * 1000:>13.1f} "
+            f"{len(antes.data):>4} → {len(depois.data)}"
+        )
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
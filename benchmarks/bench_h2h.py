@@ -0,0 +1,113 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+from h2h import (
+    COL_MAT, EMPATE_H2H, MIN_MUNICIPIOS,
+    classificar_h2h, confronto_municipios, confrontos_municipios, montar_confrontos, preparar_base, tabela_confrontos,
+)
+
+# ── Head-to-Head: merge + loop por produto vs matriz de todos os pares ───
+
+
+def tabela_legado(medias_stine, medias_conc, produto_1):
+    """Como a aba 1 calculava a cada "▶ Rodar Análise": merge com o produto e loop por adversário."""
+    sel = medias_stine[medias_stine[COL_MAT] == produto_1][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_1"})
+    cross = medias_conc.merge(sel, on="municipio_uf", how="inner")
+    linhas = []
+    for prod2, grp in cross.groupby(COL_MAT, observed=True):
+        n = len(grp)
+        if n < MIN_MUNICIPIOS:
+            continue
+        d = grp["sc_ha_1"] - grp["sc_ha"]
+        vit = int((d > EMPATE_H2H).sum())
+        pct = round(vit / n * 100, 1)
+        s1, s2 = grp["sc_ha_1"].mean(), grp["sc_ha"].mean()
+        linhas.append({
+            "Produto 1": produto_1, "SCs/ha Prod 1": round(s1, 1),
+            "Produto 2": prod2,     "SCs/ha Prod 2": round(s2, 1),
+            "Qtd. Vitórias": vit, "N° Municípios": n,
+            "Dif. %": round((s1 / s2 - 1) * 100, 1) if s2 else None,
+            "Dif. (SC)": round(s1 - s2, 1), "% Vitórias": pct,
+            "Classe": classificar_h2h(pct)[0],
+        })
+    tabela = pd.DataFrame(linhas)
+    return tabela.sort_values("% Vitórias", ascending=False).reset_index(drop=True) if len(tabela) else tabela
+
+
+def conferir(legado, novo):
+    if legado.empty:
+        assert novo.empty
+        return
+    assert (legado[["Qtd. Vitórias", "N° Municípios", "Classe"]].to_numpy() == novo[["Qtd. Vitórias", "N° Municípios", "Classe"]].to_numpy()).all()
+    assert legado["Produto 2"].astype(str).tolist() == novo["Produto 2"].astype(str).tolist()
+    # As médias antigas eram somadas em float32; casos na meia casa (ex.: 4,05) podem arredondar 0,1 diferente
+    for col in ("SCs/ha Prod 1", "SCs/ha Prod 2", "Dif. %", "Dif. (SC)", "% Vitórias"):
+        np.testing.assert_allclose(legado[col].astype(float), novo[col].astype(float), atol=0.1 + 1e-4)
+
+
+def municipios_por_par(h2h):
+    """Detalhe por município de todos os pares, um `confronto_municipios` (o da aba 2) por vez."""
+    pares = h2h["confrontos"][h2h["confrontos"]["n"] >= MIN_MUNICIPIOS]
+    return {
+        (p1, p2): confronto_municipios(h2h["medias_stine"], h2h["medias_conc"], p1, p2)
+        for p1, p2 in pares[["produto_1", "produto_2"]].itertuples(index=False)
+    }
+
+
+def conferir_municipios(por_par, todos):
+    assert len(todos) == sum(len(loc) for loc in por_par.values())
+    for (p1, p2), grp in todos.groupby(["produto_1", "produto_2"]):
+        loc = por_par[(p1, p2)]
+        grp = grp.sort_values(["diff_sc", "municipio_uf"])[loc.columns].reset_index(drop=True)
+        pd.testing.assert_frame_equal(loc.sort_values(["diff_sc", "municipio_uf"]).reset_index(drop=True), grp,
+                                      check_dtype=False, check_categorical=False)
+
+
+def _mediana(fn, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(
+        f"{'linhas':>10} {'pares':>6} {'matriz (ms)':>12} {'1 produto antes (ms)':>21} {'consulta (ms)':>14} {'todos antes (ms)':>17} "
+        f"{'municípios por par (ms)':>24} {'num merge (ms)':>15}"
+    )
+    for n in args.tamanhos:
+        base = preparar_base(aplicar_esquema(tratar_dados(gerar_resultados(n)))[0])
+        df_cult = base[base["cultura_nome"] == "Soja"]
+        h2h = montar_confrontos(df_cult)
+        produtos = sorted(h2h["medias_stine"][COL_MAT].unique())
+        for produto in produtos:
+            conferir(tabela_legado(h2h["medias_stine"], h2h["medias_conc"], produto), tabela_confrontos(h2h["confrontos"], produto))
+        todos = lambda: confrontos_municipios(h2h["medias_stine"], h2h["medias_conc"], h2h["confrontos"])
+        conferir_municipios(municipios_por_par(h2h), todos())
+
+        um = produtos[0]
+        print(
+            f"{n:>10,} {len(h2h['confrontos']):>6} "
+            f"{_mediana(lambda: montar_confrontos(df_cult)) * 1000:>12.1f} "
+            f"{_mediana(lambda: tabela_legado(h2h['medias_stine'], h2h['medias_conc'], um)) * 1000:>21.1f} "
+            f"{_mediana(lambda: tabela_confrontos(h2h['confrontos'], um)) * 1000:>14.1f} "
+            f"{_mediana(lambda: [tabela_legado(h2h['medias_stine'], h2h['medias_conc'], p) for p in produtos], 1) * 1000:>17.1f} "
+            f"{_mediana(lambda: municipios_por_par(h2h), 1) * 1000:>24.1f} {_mediana(todos) * 1000:>15.1f}"
+        )
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
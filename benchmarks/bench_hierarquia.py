@@ -0,0 +1,103 @@
+import argparse
+import statistics
+import time
+
+from agregacoes import montar_hierarquia
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+
+# ── Drilldown regional: filtro por cidade em laço vs modelo em uma passada ──
+# O lado legado reproduz os cálculos de render_visao_hierarquica_regional antes do modelo.
+
+
+def hierarquia_legada(df, n_cidades=10):
+    regionais = []
+    for reg_nome, df_reg in df.groupby("regional_nome", sort=False, observed=True):
+        regionais.append((reg_nome, df_reg, len(df_reg)))
+    regionais.sort(key=lambda x: x[2], reverse=True)
+
+    hierarquia = []
+    for reg_nome, df_reg, qtd_reg in regionais:
+        cidades_cnt = df_reg.groupby("cidade_nome", observed=True).size().sort_values(ascending=False)
+        cidades = []
+        for cidade_nome, qtd_cid in cidades_cnt.head(n_cidades).items():
+            df_cid = df_reg[df_reg["cidade_nome"] == cidade_nome]
+            cult   = df_cid["cultura_nome"].value_counts().loc[lambda c: c > 0]
+            rc_dom = df_cid["usuario_nome"].value_counts().loc[lambda c: c > 0]
+            rc_raw = rc_dom.index[0] if len(rc_dom) > 0 else ""
+            prod_dom = df_cid[df_cid["usuario_nome"] == rc_raw]["fazenda_produtor"].value_counts()
+            cidades.append({
+                "cidade_nome":   cidade_nome,
+                "qtd":           int(qtd_cid),
+                "com_resultado": int((df_cid["status_ensaio"] == "Com Resultado").sum()),
+                "aguardando":    int((df_cid["status_ensaio"] == "Aguardando Colheita").sum()),
+                "stine":         int((df_cid["categoria_material"] == "STINE").sum()),
+                "produtores":    int(df_cid["fazenda_produtor_uuid"].nunique()),
+                "cultura":       (cult.index[0], int(cult.iloc[0])) if len(cult) else ("", 0),
+                "rc":            (rc_raw, int(rc_dom.iloc[0])) if len(rc_dom) else ("", 0),
+                "n_rcs":         len(rc_dom),
+                "produtor":      (str(prod_dom.index[0]), int(prod_dom.iloc[0])) if len(prod_dom) else ("", 0),
+            })
+        hierarquia.append({
+            "nome":           reg_nome,
+            "qtd":            qtd_reg,
+            "com_resultado":  int((df_reg["status_ensaio"] == "Com Resultado").sum()),
+            "stine":          int((df_reg["categoria_material"] == "STINE").sum()),
+            "cidades":        cidades,
+            "outras_cidades": max(len(cidades_cnt) - n_cidades, 0),
+            "outras_qtd":     int(cidades_cnt.iloc[n_cidades:].sum()),
+        })
+    return hierarquia
+
+
+def conferir(df, legada, nova):
+    """Mesmos números; onde há empate (mesma contagem) a escolha do dominante pode diferir."""
+    assert [r["nome"] for r in legada] == [r["nome"] for r in nova]
+    for a, b in zip(legada, nova):
+        for chave in ("qtd", "com_resultado", "stine", "outras_cidades", "outras_qtd"):
+            assert a[chave] == b[chave], (a["nome"], chave)
+        assert [c["qtd"] for c in a["cidades"]] == [c["qtd"] for c in b["cidades"]], a["nome"]
+
+        df_reg = df[df["regional_nome"] == a["nome"]]
+        por_cidade = {c["cidade_nome"]: c for c in b["cidades"]}
+        for ca in a["cidades"]:
+            cb = por_cidade.get(ca["cidade_nome"])
+            if cb is None:
+                continue  # empate na borda do top 10
+            for chave in ("qtd", "com_resultado", "aguardando", "stine", "produtores", "n_rcs"):
+                assert ca[chave] == cb[chave], (ca["cidade_nome"], chave)
+
+            df_cid = df_reg[df_reg["cidade_nome"] == ca["cidade_nome"]]
+            assert (df_cid["cultura_nome"] == cb["cultura"]).sum() == ca["cultura"][1], (ca["cidade_nome"], "cultura")
+            assert (df_cid["usuario_nome"] == cb["rc"]).sum() == ca["rc"][1], (ca["cidade_nome"], "rc")
+            if ca["rc"][0] == cb["rc"]:
+                assert cb["produtor_qtd"] == ca["produtor"][1], (ca["cidade_nome"], "produtor")
+
+
+def _mediana(fn, df, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(df)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'legado (ms)':>12} {'modelo (ms)':>12} {'ganho':>7}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+        conferir(df, hierarquia_legada(df), montar_hierarquia(df))
+
+        antes  = _mediana(hierarquia_legada, df)
+        depois = _mediana(montar_hierarquia, df)
+        print(f"{n:>10,} {antes * 1000:>12.1f} {depois * 1000:>12.1f} {antes / depois:>6.1f}x")
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ── Partida a frio: tempo até o primeiro KPI da página Áreas ───
+# Cada medição roda num processo novo (imports a frio), servindo os dados de um snapshot em
+# disco como numa réplica recém-subida. O cronômetro começa com o streamlit já importado,
+# como no servidor, e para quando o primeiro card de KPI é enviado.
+RAIZ      = Path(__file__).resolve().parent.parent
+PESADOS   = ("plotly.express", "st_aggrid", "supabase")   # o núcleo do plotly já vem com o streamlit
+MARCA_KPI = "font-size:36px; font-weight:800"   # estilo do valor em card() do app.py
+
+
+def preparar_snapshot(n, diretorio):
+    from benchmarks.sintetico import gerar_resultados
+    from dados import aplicar_esquema, tratar_dados
+    from snapshot import salvar_snapshot
+
+    df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+    salvar_snapshot(diretorio, df, time.time(), versao="bench", marca_dagua=None)
+
+
+def medir_filho():
+    """Roda o app uma vez neste processo e imprime os tempos em JSON."""
+    import logging
+
+    import streamlit as st
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.testing.v1 import AppTest
+
+    logging.disable(logging.WARNING)
+    marcas = {}
+    inicio = time.perf_counter()
+
+    def _marcar(corpo):
+        if "kpi" not in marcas and MARCA_KPI in str(corpo):
+            marcas["kpi"] = time.perf_counter() - inicio
+            marcas["carregados_no_kpi"] = [m for m in PESADOS if m in sys.modules]
+
+    markdown_st, markdown_dg = st.markdown, DeltaGenerator.markdown
+
+    def markdown_modulo(corpo, *args, **kwargs):
+        _marcar(corpo)
+        return markdown_st(corpo, *args, **kwargs)
+
+    def markdown_metodo(self, corpo, *args, **kwargs):
+        _marcar(corpo)
+        return markdown_dg(self, corpo, *args, **kwargs)
+
+    st.markdown, DeltaGenerator.markdown = markdown_modulo, markdown_metodo
+
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=600)
+    at.query_params["token"] = os.environ["ACCESS_TOKEN"]
+    at.run()
+    marcas["total"] = time.perf_counter() - inicio
+    marcas["carregados_no_fim"] = [m for m in PESADOS if m in sys.modules]
+    marcas["erros"] = [str(e.value) for e in at.exception]
+    print(json.dumps(marcas))
+
+
+def importar_a_frio(modulo):
+    """Segundos para importar `modulo` num processo novo."""
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=20_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        medir_filho()
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        preparar_snapshot(args.linhas, diretorio)
+        ambiente = dict(os.environ, GD_SNAPSHOT_DIR=diretorio, ACCESS_TOKEN="bench", PYTHONPATH=str(RAIZ))
+
+        medidas = []
+        for _ in range(args.repeticoes):
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_inicio", "--filho"],
+                cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+            )
+            medidas.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    if medidas[0]["erros"]:
+        sys.exit(f"o app falhou: {medidas[0]['erros']}")
+    print(f"linhas no snapshot:         {args.linhas:,}")
+    print(f"primeiro KPI (mediana, s):  {statistics.median(m['kpi'] for m in medidas):.2f}")
+    print(f"página inteira (mediana, s): {statistics.median(m['total'] for m in medidas):.2f}")
+    print(f"já importados no KPI:       {', '.join(medidas[0]['carregados_no_kpi']) or '—'}")
+    print(f"importados até o fim:       {', '.join(medidas[0]['carregados_no_fim']) or '—'}")
+    print("import a frio de cada um (s):")
+    for modulo in PESADOS:
+        print(f"  {modulo:<16} {importar_a_frio(modulo):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from agregacoes import series_semanais
+from benchmarks.sintetico import gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+
+# ── Marchas de plantio/colheita: cálculo por bloco vs series_semanais ───
+COLUNAS_DATA = ("resultado_data_plantio_dt", "resultado_data_colheita_dt")
+
+
+def semanas_legado(df, coluna):
+    """Como cada marcha calculava no performance.py: cópia filtrada, to_period e apply por ponto."""
+    d = df[df[coluna].notna()].copy()
+    total = len(d)
+    d["semana"] = d[coluna].dt.to_period("W").dt.start_time
+    semanas = d.groupby("semana").size().reset_index(name="qtd_semana").sort_values("semana")
+    semanas["acumulado"]    = semanas["qtd_semana"].cumsum()
+    semanas["pct_acum"]     = (semanas["acumulado"] / total * 100).round(1)
+    semanas["semana_label"] = semanas["semana"].dt.strftime("%d/%b").str.lstrip("0")
+
+    qtd_max, qtd_min = semanas["qtd_semana"].max(), semanas["qtd_semana"].min()
+    semanas["dot_size"] = semanas["qtd_semana"].apply(
+        lambda q: 28 if qtd_max == qtd_min else 14 + (q - qtd_min) / (qtd_max - qtd_min) * 34
+    )
+    semanas["dot_cor"] = semanas["pct_acum"].apply(
+        lambda p: "#7ED321" if p >= 90 else "#D97706" if p >= 50 else "#DC2626"
+    )
+    return semanas.reset_index(drop=True)
+
+
+def legado(df):
+    return {c: semanas_legado(df, c) for c in COLUNAS_DATA}
+
+
+def motor(df):
+    return {c: series_semanais(df, c) for c in COLUNAS_DATA}
+
+
+def safras_legado(df):
+    return {s: semanas_legado(g, COLUNAS_DATA[0]) for s, g in df.groupby("ano_safra", observed=True)}
+
+
+def safras_motor(df):
+    return series_semanais(df, COLUNAS_DATA[0], por="ano_safra")
+
+
+def conferir(df):
+    for coluna, esperado in legado(df).items():
+        pd.testing.assert_frame_equal(esperado, series_semanais(df, coluna), check_dtype=False)
+    curvas = safras_motor(df)
+    for safra, esperado in safras_legado(df).items():
+        obtido = curvas[curvas["ano_safra"] == safra].drop(columns="ano_safra").reset_index(drop=True)
+        pd.testing.assert_frame_equal(esperado, obtido, check_dtype=False)
+
+
+def _mediana(fn, df, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(df)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'marchas (ms)':>13} {'motor (ms)':>11} {'ganho':>7} {'safras (ms)':>12} {'1 passada (ms)':>15} {'ganho':>7}")
+    for n in args.tamanhos:
+        df = aplicar_esquema(tratar_dados(gerar_resultados(n)))[0]
+        conferir(df)
+
+        antes, depois = _mediana(legado, df), _mediana(motor, df)
+        s_antes, s_depois = _mediana(safras_legado, df), _mediana(safras_motor, df)
+        print(
+            f"{n:>10,} {antes * 1000:>13.1f} {depois * 1000:>11.1f} {antes / depois:>6.1f}x"
+            f" {s_antes * 1000:>12.1f} {s_depois * 1000:>15.1f} {s_antes / s_depois:>6.1f}x"
+        )
+    print("paridade OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects  # noqa: F401 — importado aqui para a etapa de geografia não medir o import
+
+from agregacoes import (
+    estatisticas_grupos, kpis_areas, montar_cubo, montar_hierarquia, perfil_faixas, series_semanais, somar,
+    tabela_cidades, tabela_rc, tabela_status,
+)
+from benchmarks.sintetico import cardinalidades_realistas, gerar_resultados
+from dados import aplicar_esquema, tratar_dados
+from filtros import IndiceFiltros, aplicar_linhas, cascata, recorte_final
+from h2h import COL_MAT, confronto_municipios, confrontos_municipios, montar_confrontos, preparar_base, tabela_confrontos
+from performance import _figura_geografia, base_resultados
+
+# ── Pipeline completo: tempo por etapa em dados sintéticos de 10k a 1M linhas ───
+# Cada etapa chama as mesmas funções que o app.py/performance.py e o resultado vai para um JSON.
+# Com --comparar, as medianas são confrontadas com um JSON de outra versão e regressões acima
+# da tolerância dão saída 1.
+RAIZ             = Path(__file__).resolve().parent.parent
+SAIDA_PADRAO     = RAIZ / "benchmarks" / "resultados"
+MINIMO_REGRESSAO = 0.005   # segundos; abaixo disso a diferença é ruído de medição
+
+
+def _mediana(fn, repeticoes):
+    """Mediana dos tempos de `fn` e o resultado da última chamada (a etapa seguinte parte dele)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def _commit():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return saida.stdout.strip()
+
+
+def _selecao(df):
+    """Seleção típica da sidebar: soja e as duas regionais com mais áreas."""
+    regionais = df["regional_nome"].value_counts().index[:2].tolist()
+    return {"cultura_nome": ["Soja"], "regional_nome": regionais}
+
+
+def _cascata(indice, selecao):
+    """A cascata do app.py com os widgets da sidebar trocados por uma seleção fixa."""
+    selecoes, linhas = cascata(indice, lambda col, opcoes: selecao.get(col, []))
+    return recorte_final(indice, linhas, selecoes)
+
+
+def _materiais(df_cult):
+    """Os três materiais STINE e os três concorrentes com mais ensaios — seleção típica do gradiente."""
+    contagem = df_cult.groupby([COL_MAT, "categoria_material"], observed=True).size().sort_values(ascending=False)
+    contagem = contagem[contagem >= 3].reset_index()
+    return [
+        m for categoria in ("STINE", "Concorrência")
+        for m in contagem.loc[contagem["categoria_material"] == categoria, COL_MAT].head(3)
+    ]
+
+
+def medir(n, repeticoes):
+    """Mediana (s) de cada etapa para `n` linhas sintéticas."""
+    cardinalidades = cardinalidades_realistas(n)
+    bruto = gerar_resultados(n, **cardinalidades)
+    etapas = {}
+
+    def etapa(nome, fn):
+        etapas[nome], resultado = _mediana(fn, repeticoes)
+        return resultado
+
+    # tratar_dados escreve no frame recebido: cada repetição parte de uma cópia do bruto
+    tratado = etapa("tratamento.tratar_dados", lambda: tratar_dados(bruto.copy()))
+    df = etapa("tratamento.aplicar_esquema", lambda: aplicar_esquema(tratado.copy())[0])
+
+    # A cascata e a máscara medem uma seleção típica; as seções abaixo usam a base inteira,
+    # que é o que a página de entrada (nada marcado) desenha e o pior caso de cada uma
+    indice = etapa("sidebar.indice", lambda: IndiceFiltros(df))
+    selecao = _selecao(df)
+    linhas = etapa("sidebar.cascata", lambda: _cascata(indice, selecao))
+    recorte = etapa("df_filtrado.mascara", lambda: aplicar_linhas(df, linhas))
+    df_f = aplicar_linhas(df, _cascata(indice, {}))
+
+    cubo = etapa("areas.cubo", lambda: montar_cubo(df_f))
+    etapa("areas.kpis", lambda: kpis_areas(cubo))
+    etapa("areas.status_cultura", lambda: (somar(cubo, ["status_ensaio"]), somar(cubo, ["cultura_nome"])))
+    etapa("areas.regional_estado", lambda: [
+        (somar(cubo, [nivel, "status_ensaio"]), tabela_status(cubo, nivel, rotulo))
+        for nivel, rotulo in (("regional_nome", "Regional"), ("estado_nome", "Estado"))
+    ])
+    etapa("areas.rc", lambda: (
+        somar(cubo, ["usuario_nome"]), somar(cubo, ["usuario_nome", "cultura_nome"]),
+        tabela_rc(cubo, "cultura_nome", ("Soja", "Milho")),
+        somar(cubo, ["usuario_nome", "categoria_material"]),
+        tabela_rc(cubo, "categoria_material", ("STINE", "Concorrência")),
+    ))
+    etapa("areas.cidades", lambda: (somar(cubo, ["cidade_nome"]), tabela_cidades(cubo)))
+    etapa("areas.hierarquia", lambda: montar_hierarquia(df_f))
+    etapa("areas.faixas", lambda: perfil_faixas(df_f))
+
+    etapa("performance.marcha_plantio", lambda: series_semanais(df_f, "resultado_data_plantio_dt"))
+    etapa("performance.marcha_colheita", lambda: series_semanais(df_f, "resultado_data_colheita_dt"))
+    # Soja é a cultura que o seletor do gradiente abre marcada
+    df_res = etapa("performance.base", lambda: base_resultados(df_f))
+    df_cult = df_res[df_res["cultura_nome"] == "Soja"]
+    mats_sel = _materiais(df_cult)
+    df_plot = df_cult[df_cult[COL_MAT].isin(mats_sel)]
+    etapa("performance.gradiente", lambda: estatisticas_grupos(df_plot, [COL_MAT, "categoria_material"], "resultado_prod_scha_corrigido"))
+    etapa("performance.geografia", lambda: _figura_geografia(df_plot, mats_sel, "estado_nome", COL_MAT))
+
+    base = etapa("h2h.base", lambda: preparar_base(df_f))
+    h2h = etapa("h2h.confrontos", lambda: montar_confrontos(base[base["cultura_nome"] == "Soja"]))
+    confrontos = h2h["confrontos"]
+    if len(confrontos):
+        par = confrontos.sort_values("n", ascending=False, kind="stable").iloc[0]
+        etapa("h2h.tabela", lambda: tabela_confrontos(confrontos, par["produto_1"]))
+        etapa("h2h.municipios", lambda: confronto_municipios(h2h["medias_stine"], h2h["medias_conc"], par["produto_1"], par["produto_2"]))
+        etapa("h2h.todos_municipios", lambda: confrontos_municipios(h2h["medias_stine"], h2h["medias_conc"], confrontos))
+
+    return {"cardinalidades": cardinalidades, "linhas_recorte": len(recorte), "etapas": etapas}
+
+
+def comparar(atual, anterior, tolerancia):
+    """Imprime a variação de cada etapa contra `anterior`; devolve as etapas que pioraram além da tolerância."""
+    regressoes = []
+    print(f"\ncomparação com {anterior.get('commit') or '?'} (tolerância {tolerancia:.0%})")
+    print(f"{'linhas':>10}  {'etapa':<30} {'antes (ms)':>11} {'agora (ms)':>11} {'variação':>9}")
+    for n, medidas in atual["tamanhos"].items():
+        antes = anterior.get("tamanhos", {}).get(n, {}).get("etapas", {})
+        for nome, segundos in medidas["etapas"].items():
+            if nome not in antes:
+                continue
+            variacao = segundos / antes[nome] - 1 if antes[nome] else 0.0
+            pior = variacao > tolerancia and segundos - antes[nome] > MINIMO_REGRESSAO
+            if pior:
+                regressoes.append((n, nome))
+            print(
+                f"{int(n):>10,}  {nome:<30} {antes[nome] * 1000:>11.2f} {segundos * 1000:>11.2f} "
+                f"{variacao:>+9.0%}{'  ← regressão' if pior else ''}"
+            )
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", type=Path, help="JSON de resultados (padrão: benchmarks/resultados/pipeline-<commit>.json)")
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora relativa aceita antes de acusar regressão")
+    args = parser.parse_args()
+
+    commit = _commit()
+    resultado = {
+        "commit":     commit,
+        "data":       datetime.now().isoformat(timespec="seconds"),
+        "python":     platform.python_version(),
+        "pandas":     pd.__version__,
+        "numpy":      np.__version__,
+        "repeticoes": args.repeticoes,
+        "tamanhos":   {},
+    }
+    for n in args.tamanhos:
+        medidas = medir(n, args.repeticoes)
+        resultado["tamanhos"][str(n)] = medidas
+        print(f"\n{n:,} linhas ({medidas['linhas_recorte']:,} no recorte da sidebar) — mediana de {args.repeticoes}")
+        for nome, segundos in medidas["etapas"].items():
+            print(f"  {nome:<30} {segundos * 1000:>10.2f} ms")
+
+    sufixo = commit or datetime.now().strftime("%Y%m%d%H%M%S")
+    saida = args.saida or SAIDA_PADRAO / f"pipeline-{sufixo}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"\nresultados em {saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultado, json.loads(args.comparar.read_text()), args.tolerancia)
+        if regressoes:
+            sys.exit(f"{len(regressoes)} etapa(s) acima da tolerância")
+
+
+if __name__ == "__main__":
+    main()
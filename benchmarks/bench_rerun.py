@@ -0,0 +1,58 @@
+import argparse
+import logging
+import pickle
+import statistics
+import time
+
+import streamlit as st
+
+from benchmarks.sintetico import gerar_resultados
+from dados import tratar_dados
+
+# ── Latência por rerun: tratar_dados a cada rerun vs frame memoizado por versão ──
+# "antes": st.cache_data desserializa o frame bruto e tratar_dados roda de novo.
+# "depois": st.cache_resource devolve o frame tratado da versão atual, sem cópia.
+
+
+def _mediana(fn, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def medir(n, repeticoes):
+    bruto = gerar_resultados(n)
+    serializado = pickle.dumps(bruto)
+    antes = _mediana(lambda: tratar_dados(pickle.loads(serializado)), repeticoes)
+
+    tratado = tratar_dados(bruto.copy())
+
+    @st.cache_resource
+    def dados_tratados(versao):
+        return tratado
+
+    dados_tratados("v1")
+    depois = _mediana(lambda: dados_tratados("v1"), max(repeticoes, 20))
+    return antes, depois
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    # Fora do `streamlit run` o cache avisa que não há runtime — irrelevante aqui
+    logging.disable(logging.WARNING)
+
+    print(f"{'linhas':>10} {'antes (s)':>12} {'depois (ms)':>12} {'ganho':>10}")
+    for n in args.tamanhos:
+        antes, depois = medir(n, args.repeticoes)
+        print(f"{n:>10,} {antes:>12.3f} {depois * 1000:>12.3f} {antes / depois:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# ── Gerador de linhas sintéticas da view ─────────────────
+ESTADOS = ["PR", "SC", "RS", "SP", "MS", "MT", "GO", "MG", "BA", "TO"]
+
+
+def _uuids(rng, n):
+    hexas = (f"{a:016x}{b:016x}" for a, b in rng.integers(0, 2**63, size=(n, 2), dtype=np.int64))
+    return [f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}" for h in hexas]
+
+
+def _datas_iso(datas):
+    return pd.Series(datas).dt.strftime("%Y-%m-%d").where(pd.notna(datas), None)
+
+
+def cardinalidades_realistas(n):
+    """Cardinalidades que crescem com a base, como na view real: cidades e RCs saturam,
+    produtores acompanham o volume e bases maiores cobrem mais safras."""
+    return dict(
+        n_cidades    = min(2_500, round(8 * n ** 0.5)),
+        n_rcs        = min(400, 30 + n // 2_500),
+        n_times      = min(40, 4 + n // 25_000),
+        n_materiais  = min(200, 40 + n // 5_000),
+        n_safras     = 3 + (n >= 100_000) + (n >= 1_000_000),
+        concentracao = 0.8,
+    )
+
+
+def _sortear(rng, n, k, concentracao):
+    """`n` índices em range(k): uniforme, ou com peso 1/posição**concentracao (poucas cidades e
+    materiais concentram a maior parte dos ensaios)."""
+    if not concentracao:
+        return rng.integers(0, k, n)
+    pesos = 1.0 / np.arange(1, k + 1) ** concentracao
+    return rng.permutation(k)[rng.choice(k, size=n, p=pesos / pesos.sum())]
+
+
+def gerar_resultados(n, seed=42, n_cidades=600, n_rcs=120, n_times=12, n_materiais=80, n_safras=3, concentracao=0.0):
+    """DataFrame bruto no formato de view_gd_resultados_dashboard, com hierarquia consistente.
+
+    Produtor → cidade → estado → regional e RC → time; materiais com ~30% STINE. Os padrões
+    reproduzem a base usada pelos benchmarks; `cardinalidades_realistas(n)` escala com `n`.
+    """
+    rng = np.random.default_rng(seed)
+
+    n_produtores = max(n // 6, 1)
+
+    cidade_estado   = rng.integers(0, len(ESTADOS), n_cidades)
+    estado_regional = np.arange(len(ESTADOS)) % 8
+    rc_time         = rng.integers(0, n_times, n_rcs)
+    mat_stine       = rng.random(n_materiais) < 0.3
+    mat_cultura     = rng.integers(0, 2, n_materiais)
+
+    prod_cidade = _sortear(rng, n_produtores, n_cidades, concentracao)
+    prod_rc     = rng.integers(0, n_rcs, n_produtores)
+    prod_soja   = np.round(rng.lognormal(5, 1.4, n_produtores))
+    prod_milho  = np.round(rng.lognormal(4.5, 1.5, n_produtores))
+    prod_soja[rng.random(n_produtores) < 0.05]  = np.nan
+    prod_milho[rng.random(n_produtores) < 0.15] = np.nan
+
+    produtor = rng.integers(0, n_produtores, n)
+    material = _sortear(rng, n, n_materiais, concentracao)
+    cidade   = prod_cidade[produtor]
+    estado   = cidade_estado[cidade]
+    rc       = prod_rc[produtor]
+
+    # Plantio de set/(2025 - n_safras) a mar/2025 (com 3 safras: set/2022), colheita 110–150 dias depois
+    inicio  = np.datetime64(f"{2025 - n_safras}-09-01")
+    plantio = inicio + rng.integers(0, 940 + 365 * (n_safras - 3), n).astype("timedelta64[D]")
+    colheita = plantio + rng.integers(110, 150, n).astype("timedelta64[D]")
+    sem_plantio  = rng.random(n) < 0.06
+    sem_colheita = sem_plantio | (rng.random(n) < 0.30)
+    plantio  = np.where(sem_plantio,  np.datetime64("NaT"), plantio)
+    colheita = np.where(sem_colheita, np.datetime64("NaT"), colheita)
+
+    prod = np.round(rng.normal(np.where(mat_cultura[material] == 0, 65, 160), 12), 2)
+    prod = np.where(sem_colheita | (rng.random(n) < 0.08), np.nan, prod)
+    prod = np.where(rng.random(n) < 0.02, 0.0, prod)
+
+    modificado = pd.Timestamp("2025-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 86400 * 120, n), unit="s")
+
+    return pd.DataFrame({
+        "resultado_uuid":                  _uuids(rng, n),
+        "resultado_data_plantio":          _datas_iso(plantio),
+        "resultado_data_colheita":         _datas_iso(colheita),
+        "resultado_epoca":                 np.where(rng.random(n) < 0.7, "Safra", "Safrinha"),
+        "resultado_prod_scha":             prod,
+        "resultado_prod_scha_corrigido":   prod,
+        "resultado_area_ha":               np.round(rng.uniform(0.5, 5, n), 2),
+        "resultado_umidade_colheita":      np.round(rng.uniform(11, 24, n), 1),
+        "resultado_peso_mil_graos":        np.round(rng.uniform(120, 380, n), 1),
+        "resultado_porcentagem_avariados": np.round(rng.uniform(0, 6, n), 1),
+        "tratamentos_nome":                np.array([f"MATERIAL {i:02d}" for i in range(n_materiais)])[material],
+        "tratamentos_is_stine":            np.where(mat_stine[material], 1.0, 0.0),
+        "cultura_nome":                    np.where(mat_cultura[material] == 0, "Soja", "Milho"),
+        "fazenda_produtor":                np.array([f"Produtor {i}" for i in range(n_produtores)])[produtor],
+        "fazenda_produtor_uuid":           np.array([f"p-{i}" for i in range(n_produtores)])[produtor],
+        "fazenda_area_plantada_soja":      prod_soja[produtor],
+        "fazenda_area_plantada_milho":     prod_milho[produtor],
+        "regional_nome":                   np.array([f"Regional {i + 1}" for i in range(8)])[estado_regional[estado]],
+        "estado_nome":                     np.array(ESTADOS)[estado],
+        "cidade_nome":                     np.array([f"Cidade {i:03d}" for i in range(n_cidades)])[cidade],
+        "usuario_nome":                    np.array([f"RC {i:03d}" for i in range(n_rcs)])[rc],
+        "usuario_time":                    np.array([f"Time {i + 1}" for i in range(n_times)])[rc_time[rc]],
+        "resultado_updated_at":            modificado.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+    })
@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ── Cache LRU compartilhado ──────────────────────────────
+# Resultados de recortes (linhas filtradas e agregados de cada seção) reaproveitados
+# entre sessões. Limitado pelo total estimado de bytes, não só pelo número de itens.
+LIMITE_BYTES = 256 * 2**20
+LIMITE_ITENS = 2048
+TRABALHADORES = 2   # threads de fundo para cálculos pedidos com `em_segundo_plano`
+
+_AUSENTE = object()
+
+
+def tamanho_estimado(valor):
+    """Bytes aproximados de um valor guardado no cache."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(k) + tamanho_estimado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """LRU thread-safe limitado por bytes e por quantidade de itens.
+
+    Itens guardados com `ttl` (segundos) expiram e são recalculados na próxima consulta.
+    Os valores são compartilhados entre sessões — quem lê não deve alterá-los.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_BYTES, limite_itens=LIMITE_ITENS):
+        self.limite_bytes = limite_bytes
+        self.limite_itens = limite_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+        self._pendentes = {}
+        self._executor = None
+
+    def _consultar(self, chave):
+        """Valor vigente de `chave`, ou _AUSENTE. Chamar com o lock."""
+        if chave in self._itens:
+            valor, tamanho, expira = self._itens[chave]
+            if expira is None or time.monotonic() < expira:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return valor
+            del self._itens[chave]
+            self.bytes -= tamanho
+            self.expirados += 1
+        self.misses += 1
+        return _AUSENTE
+
+    def obter(self, chave, calcular, ttl=None):
+        """Devolve o valor de `chave`, calculando e guardando na primeira vez (ou depois de expirar)."""
+        with self._lock:
+            valor = self._consultar(chave)
+        if valor is not _AUSENTE:
+            return valor
+
+        # Calcula fora do lock — duas sessões no mesmo recorte podem calcular em dobro, sem travar as demais
+        valor = calcular()
+        self.guardar(chave, valor, ttl)
+        return valor
+
+    def em_segundo_plano(self, chave, calcular, ttl=None):
+        """Future com o valor de `chave`; se não estiver no cache, calcula numa thread de fundo.
+
+        Pedidos da mesma chave enquanto o cálculo roda (de qualquer sessão) recebem o mesmo Future.
+        `calcular` roda fora do script do Streamlit — não pode chamar `st.*`.
+        """
+        with self._lock:
+            if chave in self._pendentes:
+                return self._pendentes[chave]
+            valor = self._consultar(chave)
+            if valor is _AUSENTE:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(TRABALHADORES, thread_name_prefix="cache-recortes")
+                futuro = self._executor.submit(calcular)
+                self._pendentes[chave] = futuro
+
+        if valor is not _AUSENTE:
+            futuro = Future()
+            futuro.set_result(valor)
+            return futuro
+
+        def _concluir(f):
+            # Guarda antes de sair dos pendentes, para ninguém cair num miss entre os dois passos
+            if f.exception() is None:
+                self.guardar(chave, f.result(), ttl)
+            with self._lock:
+                self._pendentes.pop(chave, None)
+
+        futuro.add_done_callback(_concluir)
+        return futuro
+
+    def guardar(self, chave, valor, ttl=None):
+        tamanho = tamanho_estimado(valor)
+        expira = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            if tamanho > self.limite_bytes:
+                return
+            self._itens[chave] = (valor, tamanho, expira)
+            self.bytes += tamanho
+            while self.bytes > self.limite_bytes or len(self._itens) > self.limite_itens:
+                _, (_, liberado, _) = self._itens.popitem(last=False)
+                self.bytes -= liberado
+                self.evictions += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens":     len(self._itens),
+                "bytes":     self.bytes,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+                "expirados": self.expirados,
+                "taxa_hit":  self.hits / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,486 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import snapshot
+
+# ── View de resultados ───────────────────────────────────
+VIEW_RESULTADOS  = "view_gd_resultados_dashboard"
+CHAVE_RESULTADOS = "resultado_uuid"
+# Timestamp de modificação usado como marca d'água da sincronização incremental
+COLUNA_MODIFICACAO = "resultado_updated_at"
+
+# ── Manifesto de colunas ─────────────────────────────────
+# Única lista de colunas lidas da view. As opcionais só entram na projeção
+# se existirem na view — o código que as usa já testa "col in df.columns".
+COLUNAS_OBRIGATORIAS = (
+    "resultado_uuid",
+    "resultado_data_plantio",
+    "resultado_data_colheita",
+    "resultado_epoca",
+    "resultado_prod_scha",
+    "resultado_prod_scha_corrigido",
+    "resultado_area_ha",
+    "resultado_umidade_colheita",
+    "resultado_peso_mil_graos",
+    "resultado_porcentagem_avariados",
+    "tratamentos_nome",
+    "tratamentos_is_stine",
+    "cultura_nome",
+    "fazenda_produtor",
+    "fazenda_produtor_uuid",
+    "fazenda_area_plantada_soja",
+    "fazenda_area_plantada_milho",
+    "regional_nome",
+    "estado_nome",
+    "cidade_nome",
+    "usuario_nome",
+    "usuario_time",
+)
+COLUNAS_OPCIONAIS = (
+    "estado_sigla",
+    "irrigacao",
+    "fazenda_textura_solo",
+    "fazenda_fertilidade_solo",
+    "fazenda_nivel_investimento",
+    "fazenda_altitude",
+    COLUNA_MODIFICACAO,
+)
+MANIFESTO_COLUNAS = COLUNAS_OBRIGATORIAS + COLUNAS_OPCIONAIS
+
+
+def validar_manifesto(consumidores, derivadas=()):
+    """Confere se toda coluna lida pelos consumidores vem do manifesto ou é derivada no tratamento."""
+    conhecidas = set(MANIFESTO_COLUNAS) | set(derivadas)
+    faltando = {
+        nome: sorted(set(colunas) - conhecidas)
+        for nome, colunas in consumidores.items()
+        if set(colunas) - conhecidas
+    }
+    if faltando:
+        detalhe = "; ".join(f"{nome}: {', '.join(cols)}" for nome, cols in faltando.items())
+        raise ValueError(f"Colunas fora do manifesto — {detalhe}")
+
+
+def montar_projecao(client):
+    """Lista de colunas para o select, a partir do manifesto e das colunas que a view realmente expõe."""
+    amostra = client.table(VIEW_RESULTADOS).select("*").limit(1).execute().data
+    if not amostra:
+        return ",".join(COLUNAS_OBRIGATORIAS)
+
+    disponiveis = set(amostra[0])
+    ausentes = [c for c in COLUNAS_OBRIGATORIAS if c not in disponiveis]
+    if ausentes:
+        raise ValueError(f"{VIEW_RESULTADOS} não expõe as colunas: {', '.join(ausentes)}")
+    return ",".join(c for c in MANIFESTO_COLUNAS if c in disponiveis)
+
+
+# ── Busca paginada ───────────────────────────────────────
+# Igual ao max-rows padrão do PostgREST no Supabase
+TAMANHO_PAGINA = 1000
+MAX_WORKERS    = 8
+
+
+def _faixas_uuid():
+    """Divide o espaço de UUIDs em 16 faixas contíguas pelo primeiro dígito hex."""
+    limites = [c + "0000000-0000-0000-0000-000000000000" for c in "0123456789abcdef"]
+    return list(zip(limites, limites[1:] + [None]))
+
+
+def _paginar_offset(montar, colunas, tamanho_pagina):
+    """Pagina por offset a consulta criada por `montar()` — para linhas que a chave não separa.
+
+    Offset só é estável com ordem total: ordena por todas as colunas da projeção (linhas que
+    empatam em todas são iguais e tanto faz qual vem antes). Com "*" fica a ordem do servidor.
+    """
+    linhas = []
+    while True:
+        inicio = len(linhas)
+        consulta = montar()
+        if colunas != "*":
+            for coluna in colunas.split(","):
+                consulta = consulta.order(coluna)
+        pagina = consulta.range(inicio, inicio + tamanho_pagina - 1).execute().data
+        if not pagina:
+            break
+        linhas.extend(pagina)
+    return linhas
+
+
+def _buscar_faixa(client, colunas, inicio, fim, tamanho_pagina, alterado_desde=None):
+    """Keyset pagination dentro de uma faixa — ordena pela chave e avança a partir da última linha lida.
+
+    A chave não precisa ser única na view: as linhas do fim da página com a mesma chave da última
+    podem ter sido cortadas, então ficam de fora e a página seguinte começa nelas (gte). Uma página
+    mais curta que a maior já recebida é o fim da faixa. Linhas com a chave NULL não entram em faixa
+    nenhuma; ver `_buscar_sem_chave`.
+    """
+    def consulta():
+        q = (
+            client.table(VIEW_RESULTADOS)
+            .select(colunas)
+            .not_.is_(CHAVE_RESULTADOS, "null")
+        )
+        if fim is not None:
+            q = q.lt(CHAVE_RESULTADOS, fim)
+        if alterado_desde is not None:
+            q = q.gte(COLUNA_MODIFICACAO, alterado_desde)
+        return q
+
+    linhas = []
+    ultimo, depois_de_ultimo = inicio, False
+    cheia = 0
+    while True:
+        q = consulta().order(CHAVE_RESULTADOS).limit(tamanho_pagina)
+        if ultimo is not None:
+            q = q.gt(CHAVE_RESULTADOS, ultimo) if depois_de_ultimo else q.gte(CHAVE_RESULTADOS, ultimo)
+        pagina = q.execute().data
+        # Página curta só encerra a faixa se for menor que outra já recebida: pode ser o teto de max-rows
+        cheia = max(cheia, len(pagina))
+        if not pagina or len(pagina) < cheia:
+            linhas.extend(pagina)
+            break
+
+        ultimo = pagina[-1][CHAVE_RESULTADOS]
+        corte = len(pagina)
+        while corte and pagina[corte - 1][CHAVE_RESULTADOS] == ultimo:
+            corte -= 1
+        if corte:
+            linhas.extend(pagina[:corte])
+            depois_de_ultimo = False
+        else:
+            # A página inteira é uma chave só, talvez com mais linhas que uma página
+            linhas.extend(_paginar_offset(lambda: consulta().eq(CHAVE_RESULTADOS, ultimo), colunas, tamanho_pagina))
+            depois_de_ultimo = True
+    return linhas
+
+
+def _buscar_sem_chave(client, colunas, tamanho_pagina):
+    """Linhas com `resultado_uuid` NULL, que nenhuma faixa de UUID alcança.
+
+    Sem chave não há keyset: pagina por offset. São poucas (em geral nenhuma), então cabem numa página.
+    """
+    return _paginar_offset(
+        lambda: client.table(VIEW_RESULTADOS).select(colunas).is_(CHAVE_RESULTADOS, "null"),
+        colunas, tamanho_pagina,
+    )
+
+
+def buscar_resultados(client, colunas="*", tamanho_pagina=TAMANHO_PAGINA, max_workers=MAX_WORKERS):
+    """Carrega a view inteira em faixas de UUID paralelas, sem truncar no limite de linhas do servidor."""
+    faixas = _faixas_uuid()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partes = list(pool.map(
+            lambda faixa: _buscar_faixa(client, colunas, faixa[0], faixa[1], tamanho_pagina),
+            faixas
+        ))
+    partes.append(_buscar_sem_chave(client, colunas, tamanho_pagina))
+    return pd.DataFrame([linha for parte in partes for linha in parte])
+
+
+def buscar_alteracoes(client, colunas, alterado_desde, tamanho_pagina=TAMANHO_PAGINA):
+    """Linhas modificadas a partir da marca d'água — volume pequeno, então uma única faixa basta.
+
+    Linhas sem chave não têm como ser casadas com as já carregadas: só mudam na carga completa.
+    """
+    return pd.DataFrame(_buscar_faixa(client, colunas, None, None, tamanho_pagina, alterado_desde))
+
+
+# ── Tratamento ───────────────────────────────────────────
+# Colunas lidas e criadas por tratar_dados — conferidas contra o manifesto em dados.py
+COLUNAS_TRATAMENTO = (
+    "resultado_data_plantio", "resultado_data_colheita", "resultado_epoca",
+    "resultado_prod_scha", "resultado_prod_scha_corrigido", "resultado_area_ha",
+    "resultado_umidade_colheita", "resultado_peso_mil_graos", "resultado_porcentagem_avariados",
+    "tratamentos_is_stine", "fazenda_produtor", "cultura_nome",
+    "fazenda_area_plantada_soja", "fazenda_area_plantada_milho",
+)
+COLUNAS_DERIVADAS = (
+    "resultado_data_plantio_dt", "resultado_data_colheita_dt", "plantio_fmt", "colheita_fmt",
+    "status_ensaio", "categoria_material", "pct_stine_produtor", "classificacao_produtor",
+    "faixa_area_milho", "faixa_area_soja", "ano_safra", "safra_completa",
+)
+
+# Grupo usado pela classificação do produtor: alterar uma linha muda o grupo todo
+GRUPO_PRODUTOR = ["fazenda_produtor", "cultura_nome"]
+CLASSES_PRODUTOR = (
+    "100% Concorrência", "Maioria Conc (<30%)", "Misto (30-70%)",
+    "Maioria STINE (>70%)", "100% STINE",
+)
+
+STATUS_ENSAIO = ("Com Resultado", "Aguardando Colheita", "Não Definido")
+SEM_DATA      = "Sem data"
+# Faixas de área plantada da fazenda (perfil de potencial do produtor), em ha
+LIMITES_FAIXAS_AREA = (0, 50, 200, 500, 2500, float("inf"))
+FAIXAS_AREA         = ("Até 50 ha", "50 a 200 ha", "200 a 500 ha", "500 a 2.500 ha", "Acima de 2.500 ha")
+
+
+def _status_ensaio(df):
+    # Datas pela string bruta (não pela convertida): data inválida ainda conta como preenchida
+    plantio  = df["resultado_data_plantio"].notna().to_numpy()
+    colheita = df["resultado_data_colheita"].notna().to_numpy()
+    prod     = pd.to_numeric(df["resultado_prod_scha_corrigido"], errors="coerce").gt(0).fillna(False).to_numpy(bool)
+
+    return np.select(
+        [plantio & colheita & prod, plantio & ~prod],
+        STATUS_ENSAIO[:2],
+        default=STATUS_ENSAIO[2]
+    )
+
+
+def _ano_safra(datas):
+    """Safra de julho a junho: plantio em out/2023 → "2023/24". Sem data de plantio → "Sem data"."""
+    safra = datas.dt.year - (datas.dt.month < 7)
+    # Poucas safras distintas: formata cada uma uma vez e espalha pelo frame
+    rotulos = {s: f"{s}/{str(s + 1)[-2:]}" for s in safra.dropna().astype(int).unique()}
+    return safra.map(rotulos).fillna(SEM_DATA).astype(object)
+
+
+def _safra_completa(epoca, ano_safra):
+    sem_data = ano_safra == SEM_DATA
+    return (epoca + " " + ano_safra).where(~sem_data, SEM_DATA)
+
+
+def _classificar_produtor(pct):
+    """Faixa de % STINE → classe, como categórica. Produtor sem grupo (pct NaN) fica sem classe."""
+    codigos = np.select(
+        [pct >= 1.0, pct > 0.7, pct >= 0.3, pct > 0, pct == 0],
+        [4, 3, 2, 1, 0],
+        default=-1
+    )
+    return pd.Categorical.from_codes(codigos, categories=CLASSES_PRODUTOR)
+
+
+def tratar_dados(df):
+    df["resultado_data_plantio_dt"]  = pd.to_datetime(df["resultado_data_plantio"],  errors="coerce")
+    df["resultado_data_colheita_dt"] = pd.to_datetime(df["resultado_data_colheita"], errors="coerce")
+
+    df["plantio_fmt"]  = df["resultado_data_plantio_dt"].dt.strftime("%d/%m/%Y")
+    df["colheita_fmt"] = df["resultado_data_colheita_dt"].dt.strftime("%d/%m/%Y")
+
+    metricas = [
+        "resultado_prod_scha",
+        "resultado_prod_scha_corrigido",
+        "resultado_area_ha",
+        "resultado_umidade_colheita",
+        "resultado_peso_mil_graos",
+        "resultado_porcentagem_avariados"
+    ]
+    for col in metricas:
+        df[col] = pd.to_numeric(df[col], errors="coerce").replace(0, np.nan)
+
+    df["status_ensaio"] = _status_ensaio(df)
+
+    df["categoria_material"] = df["tratamentos_is_stine"].map({
+        1.0: "STINE",
+        0.0: "Concorrência"
+    }).fillna("Concorrência")
+
+    # Média do indicador STINE por produtor/cultura, devolvida já alinhada às linhas — sem merge
+    df["pct_stine_produtor"] = (
+        df["tratamentos_is_stine"].eq(1.0)
+        .groupby([df[c] for c in GRUPO_PRODUTOR], observed=True)
+        .transform("mean")
+    )
+    df["classificacao_produtor"] = _classificar_produtor(df["pct_stine_produtor"].to_numpy())
+
+    df["faixa_area_milho"] = pd.cut(
+        df["fazenda_area_plantada_milho"],
+        bins=LIMITES_FAIXAS_AREA, labels=FAIXAS_AREA, right=True, include_lowest=True
+    )
+
+    df["faixa_area_soja"] = pd.cut(
+        df["fazenda_area_plantada_soja"],
+        bins=LIMITES_FAIXAS_AREA, labels=FAIXAS_AREA, right=True, include_lowest=True
+    )
+
+    df["ano_safra"]      = _ano_safra(df["resultado_data_plantio_dt"])
+    df["safra_completa"] = _safra_completa(df["resultado_epoca"], df["ano_safra"])
+
+    return df
+
+
+# ── Esquema ──────────────────────────────────────────────
+# Dimensões de filtro e agregação repetidas em toda linha viram categóricas:
+# isin e groupby passam a trabalhar sobre os códigos inteiros.
+COLUNAS_CATEGORICAS = (
+    "regional_nome", "estado_nome", "cidade_nome", "usuario_nome", "usuario_time",
+    "status_ensaio", "categoria_material", "tratamentos_nome", "cultura_nome", "safra_completa",
+)
+# Ordem fixa onde o domínio é conhecido; nas demais, ordem alfabética dos valores presentes
+ORDEM_CATEGORIAS = {
+    "status_ensaio":      STATUS_ENSAIO,
+    "categoria_material": ("STINE", "Concorrência"),
+}
+# Métricas por ensaio cabem em float32. Áreas da fazenda ficam em float64: são somadas na base toda.
+METRICAS_COMPACTAS = (
+    "resultado_prod_scha", "resultado_prod_scha_corrigido", "resultado_area_ha",
+    "resultado_umidade_colheita", "resultado_peso_mil_graos", "resultado_porcentagem_avariados",
+    "tratamentos_is_stine", "pct_stine_produtor",
+)
+
+
+def aplicar_esquema(df):
+    """Converte dimensões em categóricas e compacta métricas. Devolve (frame, bytes antes, bytes depois)."""
+    antes = int(df.memory_usage(deep=True).sum())
+
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            categorias = ORDEM_CATEGORIAS.get(col) or sorted(df[col].dropna().unique())
+            df[col] = pd.Categorical(df[col], categories=categorias)
+
+    for col in METRICAS_COMPACTAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+
+    return df, antes, int(df.memory_usage(deep=True).sum())
+
+
+# ── Sincronização incremental ────────────────────────────
+
+
+class SincronizadorResultados:
+    """Guarda o último frame tratado da view e o atualiza só com as linhas alteradas desde a marca d'água.
+
+    Sem a coluna de modificação na view, cada sincronização vira uma carga completa.
+    Exclusões não aparecem no delta, por isso a carga completa é refeita a cada
+    `recarga_completa_a_cada` segundos.
+
+    Com `diretorio_snapshot`, cada sincronização grava o frame em Parquet e qualquer
+    processo que encontre um snapshot mais novo que o seu passa a servir dele.
+    """
+
+    def __init__(self, criar_client, diretorio_snapshot=None, recarga_completa_a_cada=6 * 3600):
+        self._criar_client = criar_client
+        self._lock = threading.Lock()
+        self.diretorio_snapshot = diretorio_snapshot
+        self.recarga_completa_a_cada = recarga_completa_a_cada
+        self.df = None
+        self.projecao = None
+        self.marca_dagua = None
+        self.versao = None
+        self.memoria = None
+        self.gerado_em = 0.0
+        self.ultima_carga_completa = 0.0
+
+    def sincronizar(self, ttl=0, forcar=False):
+        """Devolve (versão, frame tratado). O frame é compartilhado — trate como somente leitura."""
+        with self._lock:
+            self._adotar_snapshot()
+            if not forcar and self.df is not None and time.time() - self.gerado_em < ttl:
+                return self.versao, self.df
+
+            client = self._criar_client()
+            vencida = time.time() - self.ultima_carga_completa > self.recarga_completa_a_cada
+            if self.df is None or self.marca_dagua is None or vencida:
+                self._carga_completa(client)
+                mudou = True
+            else:
+                mudou = self._aplicar_delta(client)
+            self.gerado_em = time.time()
+            # Delta vazio: o snapshot em disco já tem este frame
+            if mudou:
+                self._salvar_snapshot()
+            return self.versao, self.df
+
+    def _adotar_snapshot(self):
+        """Assume o snapshot em disco quando outro processo (ou um restart) sincronizou depois deste."""
+        if self.diretorio_snapshot is None:
+            return
+        meta = snapshot.ler_metadados(self.diretorio_snapshot)
+        if meta is None or meta["gerado_em"] <= self.gerado_em:
+            return
+        df = snapshot.carregar_snapshot(self.diretorio_snapshot, meta)
+        if df is None or not set(COLUNAS_DERIVADAS) <= set(df.columns):
+            return
+        self.df                    = df
+        self.gerado_em             = meta["gerado_em"]
+        self.projecao              = meta.get("projecao")
+        self.marca_dagua           = meta.get("marca_dagua")
+        self.versao                = meta.get("versao")
+        self.memoria               = meta.get("memoria")
+        self.ultima_carga_completa = meta.get("ultima_carga_completa", 0.0)
+
+    def _salvar_snapshot(self):
+        if self.diretorio_snapshot is None:
+            return
+        try:
+            snapshot.salvar_snapshot(
+                self.diretorio_snapshot, self.df, self.gerado_em,
+                projecao=self.projecao,
+                marca_dagua=self.marca_dagua,
+                versao=self.versao,
+                memoria=self.memoria,
+                ultima_carga_completa=self.ultima_carga_completa,
+            )
+        except OSError:
+            # Disco somente leitura ou cheio — segue servindo da memória
+            pass
+
+    def _carga_completa(self, client):
+        anterior = self.df
+        self.projecao = montar_projecao(client)
+        self._adotar_frame(tratar_dados(buscar_resultados(client, self.projecao)))
+        self.marca_dagua = self._marca(self.df)
+        self.ultima_carga_completa = time.time()
+        # Recarga periódica que trouxe o mesmo frame mantém a versão e os caches derivados dela
+        if anterior is None or not self.df.equals(anterior):
+            self.versao = self._nova_versao()
+
+    def _aplicar_delta(self, client):
+        """Aplica as linhas alteradas desde a marca d'água; devolve True se o frame mudou."""
+        alteradas = self._sem_repetidas(buscar_alteracoes(client, self.projecao, self.marca_dagua))
+        if alteradas.empty:
+            return False
+
+        # Produtores afetados — tanto os valores antigos quanto os novos das linhas alteradas
+        ja_existentes = self.df[CHAVE_RESULTADOS].isin(alteradas[CHAVE_RESULTADOS])
+        grupos = pd.MultiIndex.from_frame(
+            pd.concat([self.df.loc[ja_existentes, GRUPO_PRODUTOR], alteradas[GRUPO_PRODUTOR]])
+        )
+        afetadas = pd.MultiIndex.from_frame(self.df[GRUPO_PRODUTOR]).isin(grupos) | ja_existentes
+
+        # Reaplica o tratamento só nas linhas dos produtores afetados
+        mantidas_do_grupo = self.df[afetadas & ~ja_existentes].drop(columns=list(COLUNAS_DERIVADAS))
+        retratadas = tratar_dados(pd.concat([mantidas_do_grupo, alteradas], ignore_index=True))
+
+        # Categorias do delta podem diferir das do frame — o concat volta a object e o esquema é reaplicado
+        self._adotar_frame(pd.concat([self.df[~afetadas], retratadas], ignore_index=True))
+        self.marca_dagua = self._marca(self.df)
+        self.versao = self._nova_versao()
+        return True
+
+    def _sem_repetidas(self, alteradas):
+        """Descarta as linhas que o frame já tem com o mesmo `resultado_updated_at`.
+
+        A marca d'água é inclusiva (gte, para não perder linha gravada no mesmo instante da última
+        lida), então as linhas com exatamente esse timestamp voltam em toda consulta.
+        """
+        if alteradas.empty:
+            return alteradas
+        carregadas = self.df.drop_duplicates(CHAVE_RESULTADOS)
+        anterior = pd.Series(
+            pd.to_datetime(carregadas[COLUNA_MODIFICACAO], errors="coerce", utc=True).to_numpy(),
+            index=carregadas[CHAVE_RESULTADOS].astype(object),
+        )
+        atual = pd.to_datetime(alteradas[COLUNA_MODIFICACAO], errors="coerce", utc=True)
+        conhecida = alteradas[CHAVE_RESULTADOS].astype(object).map(anterior)
+        return alteradas[conhecida.isna() | (atual != conhecida)].reset_index(drop=True)
+
+    def _adotar_frame(self, df):
+        self.df, antes, depois = aplicar_esquema(df)
+        # Bytes em memória antes/depois do esquema compacto
+        self.memoria = {"antes": antes, "depois": depois}
+
+    def _nova_versao(self):
+        # Muda só quando o frame muda — delta vazio mantém a versão e os caches derivados dela
+        return f"{len(self.df)}@{time.time():.3f}"
+
+    @staticmethod
+    def _marca(df):
+        if COLUNA_MODIFICACAO not in df.columns:
+            return None
+        maior = pd.to_datetime(df[COLUNA_MODIFICACAO], errors="coerce", utc=True).max()
+        return None if pd.isna(maior) else maior.isoformat()
@@ -0,0 +1,179 @@
+import io
+from collections import namedtuple
+
+import streamlit as st
+
+# ── Exportação sob demanda ───────────────────────────────
+# Nada é gerado enquanto ninguém pede: o arquivo só é montado depois de "Preparar arquivo",
+# e os bytes ficam no cache de recortes por (versão, filtros, tabela, formato).
+Formato = namedtuple("Formato", "rotulo extensao mime")
+
+FORMATOS = {
+    "xlsx":    Formato("Excel",   "xlsx",    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv":     Formato("CSV",     "csv",     "text/csv"),
+    "parquet": Formato("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+TTL_EXPORTACAO     = 30 * 60   # segundos que os bytes de um arquivo ficam no cache compartilhado
+LINHAS_BLOCO       = 10_000    # linhas convertidas por vez ao escrever o XLSX
+INTERVALO_CONSULTA = 1         # segundos entre consultas a uma exportação em segundo plano
+
+
+def _sem_colunas_internas(df):
+    """Remove colunas internas do AgGrid (::auto_unique_id::, _selectedRowNodeInfo, etc.)."""
+    colunas = df.columns.astype(str)
+    return df.loc[:, ~colunas.str.startswith("::") & ~colunas.str.startswith("_")]
+
+
+def _nome_aba(nome, usados):
+    """Nome de aba válido no Excel: sem []:*?/\\, até 31 caracteres e sem repetir."""
+    base = "".join("_" if c in "[]:*?/\\" else c for c in str(nome)).strip("'") or "Planilha"
+    nome, i = base[:31], 1
+    while nome.lower() in usados:
+        i += 1
+        sufixo = f" ({i})"
+        nome = base[:31 - len(sufixo)] + sufixo
+    usados.add(nome.lower())
+    return nome
+
+
+def _linhas(df):
+    """Linhas como tuplas de valores Python (NaN → vazio), em blocos para não copiar o frame inteiro."""
+    for ini in range(0, len(df), LINHAS_BLOCO):
+        bloco = df.iloc[ini:ini + LINHAS_BLOCO].astype(object)
+        yield from bloco.where(bloco.notna(), None).itertuples(index=False, name=None)
+
+
+def _xlsx_xlsxwriter(abas, buf):
+    import xlsxwriter
+
+    # constant_memory: cada linha vai para o disco assim que a próxima começa — memória fixa por aba
+    livro = xlsxwriter.Workbook(buf, {
+        "constant_memory":     True,
+        "in_memory":           False,
+        "default_date_format": "dd/mm/yyyy",
+        "nan_inf_to_errors":   True,
+    })
+    negrito = livro.add_format({"bold": True})
+    usados = set()
+    for nome, df in abas.items():
+        aba = livro.add_worksheet(_nome_aba(nome, usados))
+        aba.write_row(0, 0, [str(c) for c in df.columns], negrito)
+        for i, linha in enumerate(_linhas(df), start=1):
+            aba.write_row(i, 0, linha)
+    livro.close()
+
+
+def _xlsx_openpyxl(abas, buf):
+    from openpyxl import Workbook
+
+    # write_only também escreve em fluxo, linha a linha
+    livro = Workbook(write_only=True)
+    usados = set()
+    for nome, df in abas.items():
+        aba = livro.create_sheet(_nome_aba(nome, usados))
+        aba.append([str(c) for c in df.columns])
+        for linha in _linhas(df):
+            aba.append(linha)
+    livro.save(buf)
+
+
+def gerar_arquivo(tabela, formato):
+    """Bytes de `tabela` (DataFrame, ou {nome da aba: DataFrame} no XLSX) no `formato` pedido."""
+    abas = tabela if isinstance(tabela, dict) else {"Planilha": tabela}
+    abas = {nome: _sem_colunas_internas(df) for nome, df in abas.items()}
+    buf = io.BytesIO()
+
+    if formato == "xlsx":
+        try:
+            _xlsx_xlsxwriter(abas, buf)
+        except ImportError:
+            _xlsx_openpyxl(abas, buf)
+    elif len(abas) > 1:
+        raise ValueError(f"{FORMATOS[formato].rotulo} não tem abas — exporte em Excel")
+    elif formato == "csv":
+        # Padrão do Excel em pt-BR: ";" entre colunas, vírgula decimal e BOM para os acentos
+        next(iter(abas.values())).to_csv(buf, sep=";", decimal=",", index=False, encoding="utf-8-sig")
+    elif formato == "parquet":
+        next(iter(abas.values())).to_parquet(buf, index=False, compression="zstd")
+    else:
+        raise ValueError(f"formato desconhecido: {formato}")
+    return buf.getvalue()
+
+
+def _prontos(recorte):
+    """Pedidos de exportação desta sessão no recorte atual; os de outros recortes são esquecidos."""
+    prontos = st.session_state.setdefault("exportacoes_prontas", set())
+    for pedido in [p for p in prontos if p[0] != recorte]:
+        prontos.discard(pedido)
+    return prontos
+
+
+def botao_exportar(agregado, recorte, chave, calcular, nome_arquivo, rotulo="⬇️ Exportar", formatos=tuple(FORMATOS)):
+    """Popover de exportação: escolhe o formato, prepara sob demanda e oferece o download.
+
+    `calcular` devolve a tabela (ou as abas) e só roda quando alguém pede o arquivo; os bytes
+    ficam no cache compartilhado, então quem pedir o mesmo arquivo depois só baixa.
+    `recorte` é a chave (versão, filtros) que o `agregado` usa: trocar filtros ou versão dos dados
+    volta a exigir "Preparar arquivo", senão o arquivo do recorte novo seria gerado a cada rerun.
+    """
+    prontos = _prontos(recorte)
+    with st.popover(rotulo):
+        formato = st.radio(
+            "Formato", formatos,
+            format_func=lambda f: FORMATOS[f].rotulo,
+            horizontal=True, key=f"{chave}__formato",
+        )
+        pedido = (recorte, chave, formato)
+        if pedido not in prontos and st.button("Preparar arquivo", key=f"{chave}__preparar", use_container_width=True):
+            prontos.add(pedido)
+
+        if pedido in prontos:
+            with st.spinner("Gerando arquivo..."):
+                dados = agregado(f"exportacao:{chave}:{formato}", lambda: gerar_arquivo(calcular(), formato), ttl=TTL_EXPORTACAO)
+            st.download_button(
+                f"⬇️ Baixar {FORMATOS[formato].rotulo}", data=dados,
+                file_name=f"{nome_arquivo}.{FORMATOS[formato].extensao}",
+                mime=FORMATOS[formato].mime,
+                key=f"{chave}__baixar__{formato}",
+                use_container_width=True,
+            )
+
+
+@st.fragment(run_every=INTERVALO_CONSULTA)
+def _aguardar(futuro):
+    """Consulta a geração em segundo plano; quando termina, reroda a página para mostrar o download."""
+    if futuro.done():
+        st.rerun()
+    st.caption("⏳ Gerando a planilha em segundo plano — pode continuar usando o painel.")
+
+
+def botao_exportar_segundo_plano(agregado, recorte, chave, calcular, nome_arquivo, rotulo="⬇️ Exportar"):
+    """Exportação em Excel gerada numa thread de fundo, para tabelas/planilhas que demoram.
+
+    `calcular` roda fora do script do Streamlit (não pode chamar `st.*`). O Future é compartilhado:
+    outra sessão que pedir o mesmo arquivo enquanto ele é gerado só espera pelo mesmo trabalho.
+    Como em `botao_exportar`, o pedido vale só para o `recorte` em que o botão foi clicado.
+    """
+    prontos = _prontos(recorte)
+    pedido = (recorte, chave, "xlsx")
+    if pedido not in prontos:
+        if not st.button(rotulo, key=f"{chave}__preparar"):
+            return
+        prontos.add(pedido)
+
+    futuro = agregado(
+        f"exportacao:{chave}:xlsx", lambda: gerar_arquivo(calcular(), "xlsx"),
+        ttl=TTL_EXPORTACAO, segundo_plano=True,
+    )
+    if not futuro.done():
+        _aguardar(futuro)
+    elif futuro.exception() is not None:
+        prontos.discard(pedido)
+        st.error(f"❌ Falha ao gerar a planilha: {futuro.exception()}")
+    else:
+        st.download_button(
+            f"⬇️ Baixar {FORMATOS['xlsx'].rotulo}", data=futuro.result(),
+            file_name=f"{nome_arquivo}.{FORMATOS['xlsx'].extensao}",
+            mime=FORMATOS["xlsx"].mime,
+            key=f"{chave}__baixar__xlsx",
+        )
@@ -0,0 +1,106 @@
+import numpy as np
+
+# ── Índice invertido dos filtros da sidebar ──────────────
+# Para cada dimensão, os ids de linha (posições) de cada valor, em ordem crescente.
+# Um conjunto de linhas é um array ordenado de posições; None significa "todas as linhas".
+DIMENSOES_FILTRO = (
+    "cultura_nome", "safra_completa", "regional_nome", "estado_nome",
+    "cidade_nome", "status_ensaio", "usuario_nome", "usuario_time",
+)
+
+
+class IndiceFiltros:
+    """Construído uma vez por versão dos dados; as consultas custam proporcional às linhas selecionadas."""
+
+    def __init__(self, df, dimensoes=DIMENSOES_FILTRO):
+        self.n_linhas = len(df)
+        self._categorias = {}
+        self._codigos    = {}
+        self._postings   = {}
+        self._presentes  = {}
+
+        for col in dimensoes:
+            cat = df[col].astype("category").cat
+            # Código 0 reservado para valor ausente — as categorias começam em 1
+            codigos = (cat.codes.to_numpy() + 1).astype(np.int32)
+            contagem = np.bincount(codigos, minlength=len(cat.categories) + 1)
+            ordem = np.argsort(codigos, kind="stable").astype(np.int32)
+
+            self._categorias[col] = cat.categories
+            self._codigos[col]    = codigos
+            self._postings[col]   = np.split(ordem, np.cumsum(contagem)[:-1])
+            self._presentes[col]  = contagem > 0
+
+    def _codigos_de(self, col, valores):
+        posicoes = self._categorias[col].get_indexer(list(valores))
+        return posicoes[posicoes >= 0] + 1
+
+    def filtrar(self, linhas, col, valores):
+        """Restringe `linhas` às que têm `col` em `valores`. Sem valores, devolve `linhas` como está."""
+        if not valores:
+            return linhas
+        codigos = self._codigos_de(col, valores)
+
+        if linhas is None:
+            # Seleção que não existe mais (ex.: valor guardado na sessão que sumiu numa sincronização)
+            if len(codigos) == 0:
+                return np.empty(0, dtype=np.int32)
+            if len(codigos) == 1:
+                return self._postings[col][codigos[0]]
+            return np.sort(np.concatenate([self._postings[col][c] for c in codigos]))
+
+        aceitos = np.zeros(len(self._postings[col]), dtype=bool)
+        aceitos[codigos] = True
+        return linhas[aceitos[self._codigos[col][linhas]]]
+
+    def opcoes(self, col, linhas=None):
+        """Valores de `col` presentes em `linhas`, em ordem alfabética, sem ausentes."""
+        if linhas is None:
+            presentes = self._presentes[col]
+        else:
+            presentes = np.bincount(self._codigos[col][linhas], minlength=len(self._postings[col])) > 0
+        return sorted(self._categorias[col][np.flatnonzero(presentes[1:])].tolist())
+
+
+# Níveis da sidebar, na ordem da cascata: cada nível lista as opções das linhas que sobraram
+# dos anteriores. Status e time não restringem as opções de outros níveis; entram só no recorte final.
+CASCATA = (
+    ("cultura_nome", True), ("safra_completa", True), ("regional_nome", True), ("estado_nome", True),
+    ("cidade_nome", True), ("status_ensaio", False), ("usuario_nome", True), ("usuario_time", False),
+)
+
+
+def cascata(indice, escolher):
+    """Percorre os níveis de CASCATA; `escolher(coluna, opcoes)` devolve os valores marcados (lista).
+
+    Devolve ({coluna: valores marcados}, linhas) — `linhas` ainda sem os níveis que só entram
+    no recorte final; ver `recorte_final`.
+    """
+    selecoes, linhas = {}, None
+    for col, restringe in CASCATA:
+        selecoes[col] = escolher(col, indice.opcoes(col, linhas))
+        if restringe:
+            linhas = indice.filtrar(linhas, col, selecoes[col])
+    return selecoes, linhas
+
+
+def recorte_final(indice, linhas, selecoes):
+    """Aplica a `linhas` da cascata os níveis que não restringem os outros (status e time)."""
+    for col, restringe in CASCATA:
+        if not restringe:
+            linhas = indice.filtrar(linhas, col, selecoes.get(col, []))
+    return linhas
+
+
+def aplicar_linhas(df, linhas):
+    """Frame com as linhas selecionadas; sem filtro devolve o próprio frame compartilhado."""
+    return df if linhas is None else df.take(linhas)
+
+
+def chave_selecao(selecoes):
+    """Forma canônica de {coluna: valores}: dimensões sem filtro somem e os valores ficam ordenados."""
+    return tuple(
+        (col, tuple(sorted(map(str, valores))))
+        for col, valores in sorted(selecoes.items())
+        if valores
+    )
@@ -0,0 +1,170 @@
+import copy
+import functools
+import json
+import math
+import threading
+
+import pandas as pd
+import streamlit as st
+
+# ── Grades AgGrid ────────────────────────────────────────
+# Tabelas pequenas vão inteiras para o navegador e o AgGrid ordena e filtra lá. Acima de
+# LIMITE_CLIENTE linhas a busca, a ordenação e a paginação rodam no servidor e só a página
+# visível é serializada. As gridOptions são montadas uma vez por (tabela, esquema).
+# O componente só lê as gridOptions ao montar e só troca as linhas em reruns com reload_data:
+# a key muda com o esquema e o modo, e as linhas novas vão sempre com reload_data=True.
+# O st_aggrid só é importado quando a primeira grade é desenhada.
+LIMITE_CLIENTE = 100   # linhas até as quais a tabela inteira vai para o navegador
+LINHAS_PAGINA  = 50    # linhas por página no modo servidor
+
+_opcoes = {}
+_opcoes_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def barra_percentual(cor, opacidade=0.25):
+    """cellRenderer de percentual: barra de fundo proporcional ao valor e o número com uma casa."""
+    from st_aggrid import JsCode
+
+    return JsCode(f"""
+        class BarraPercentual {{
+            init(params) {{
+                this.eGui = document.createElement('div');
+                this.eGui.style.cssText = 'position:relative; width:100%; height:100%; display:flex; align-items:center;';
+                var pct = params.value || 0;
+                var bar = document.createElement('div');
+                bar.style.cssText = 'position:absolute; left:0; top:15%; height:70%; width:' + pct + '%; background:{cor}; opacity:{opacidade}; border-radius:2px;';
+                var label = document.createElement('span');
+                label.style.cssText = 'position:relative; z-index:1; font-weight:600; font-size:12px; padding-left:6px;';
+                label.innerText = pct.toFixed(1) + '%';
+                this.eGui.appendChild(bar);
+                this.eGui.appendChild(label);
+            }}
+            getGui() {{ return this.eGui; }}
+        }}
+    """)
+
+
+def _esquema(nome, tabela):
+    return nome, tuple(zip(tabela.columns, tabela.dtypes.astype(str)))
+
+
+def opcoes_grade(nome, tabela, colunas=None):
+    """gridOptions de `tabela`, montadas uma vez por (nome, colunas e dtypes).
+
+    O AgGrid troca os JsCode por texto dentro do dict que recebe — quem usa recebe uma cópia.
+    """
+    chave = _esquema(nome, tabela)
+    with _opcoes_lock:
+        opcoes = _opcoes.get(chave)
+    if opcoes is None:
+        from st_aggrid import GridOptionsBuilder
+
+        gb = GridOptionsBuilder.from_dataframe(tabela)
+        gb.configure_default_column(resizable=True, sortable=True, filter=True)
+        for coluna, config in (colunas or {}).items():
+            if coluna in tabela.columns:
+                gb.configure_column(coluna, **config)
+        opcoes = gb.build()
+        with _opcoes_lock:
+            _opcoes[chave] = opcoes
+    return copy.deepcopy(opcoes)
+
+
+def _buscar(tabela, termo):
+    """Linhas em que alguma coluna de texto contém `termo` (sem diferenciar maiúsculas)."""
+    if not termo:
+        return tabela
+    textos = [c for c in tabela.columns if not pd.api.types.is_numeric_dtype(tabela[c])]
+    achou = pd.Series(False, index=tabela.index)
+    for coluna in textos:
+        achou |= tabela[coluna].astype(str).str.contains(termo, case=False, regex=False, na=False)
+    return tabela[achou]
+
+
+def pagina_servidor(filtrada, ordem, pagina):
+    """Página `pagina` de `filtrada` ordenada por `ordem`, uma lista de (coluna, crescente)."""
+    if ordem:
+        colunas, crescente = zip(*ordem)
+        filtrada = filtrada.sort_values(list(colunas), ascending=list(crescente), kind="stable")
+    inicio = (pagina - 1) * LINHAS_PAGINA
+    return filtrada.iloc[inicio:inicio + LINHAS_PAGINA]
+
+
+def _ordem_cabecalho(valor):
+    """(coluna, crescente) das colunas ordenadas no cabeçalho, lidas do valor cru do componente AgGrid.
+
+    None enquanto a grade não devolveu nada (acabou de montar).
+    """
+    if not valor:
+        return None
+    if isinstance(valor, str):
+        valor = json.loads(valor)
+    ordenadas = sorted((c for c in valor["colState"] if c.get("sort")), key=lambda c: c.get("sortIndex") or 0)
+    return [(c["colId"], c["sort"] == "asc") for c in ordenadas]
+
+
+def _primeira_pagina(chave_pagina):
+    st.session_state[chave_pagina] = 1
+
+
+@st.fragment
+def grade(tabela, nome, colunas=None, altura=320, custom_css=None):
+    """AgGrid num fragment: ordenar, buscar ou paginar reroda só a grade, não a página inteira.
+
+    `colunas` mapeia nome da coluna → argumentos de `configure_column` (ignorado se a coluna faltar).
+    """
+    from st_aggrid import AgGrid, GridUpdateMode
+
+    opcoes = opcoes_grade(nome, tabela, colunas)
+    argumentos = dict(
+        fit_columns_on_grid_load=True, height=altura, reload_data=True,
+        allow_unsafe_jscode=True, theme="alpine", custom_css=custom_css,
+    )
+    servidor = len(tabela) > LIMITE_CLIENTE
+    chave = f"{nome}__{hash((_esquema(nome, tabela), servidor)):x}"
+    if not servidor:
+        # Ordenar e filtrar acontecem no navegador; nada do retorno é usado, então não há rerun
+        AgGrid(tabela, gridOptions=opcoes, key=chave, update_mode=GridUpdateMode.NO_UPDATE, **argumentos)
+        return
+
+    # Modo servidor: o navegador só tem a página atual. O clique no cabeçalho reroda o fragment
+    # com o estado das colunas como valor do componente e a tabela inteira é reordenada aqui; o
+    # filtro por coluna só enxergaria a página, então fica desligado e a busca faz esse papel.
+    opcoes["defaultColDef"]["filter"] = False
+    chave_ordem = f"{nome}__ordem"
+    chave_pagina = f"{nome}__pagina"
+    ordem = [(c, crescente) for c, crescente in st.session_state.get(chave_ordem, []) if c in tabela.columns]
+    cabecalho = _ordem_cabecalho(st.session_state.get(chave))
+    if cabecalho is not None and cabecalho != ordem:
+        ordem = st.session_state[chave_ordem] = cabecalho
+        st.session_state[chave_pagina] = 1
+    # Se a grade remontar, a seta do cabeçalho volta com a ordem que está valendo
+    prioridade = {coluna: (i, crescente) for i, (coluna, crescente) in enumerate(ordem)}
+    for definicao in opcoes["columnDefs"]:
+        if definicao["field"] in prioridade:
+            i, crescente = prioridade[definicao["field"]]
+            definicao.update(sort="asc" if crescente else "desc", sortIndex=i)
+
+    # Buscar volta para a primeira página
+    col_busca, col_pag = st.columns([6, 1.2])
+    with col_busca:
+        termo = st.text_input(
+            "🔎 Buscar", key=f"{nome}__busca", placeholder="Texto em qualquer coluna",
+            on_change=_primeira_pagina, args=(chave_pagina,),
+        )
+
+    filtrada = _buscar(tabela, termo.strip())
+    paginas = max(1, math.ceil(len(filtrada) / LINHAS_PAGINA))
+    if st.session_state.get(chave_pagina, 1) > paginas:
+        st.session_state[chave_pagina] = paginas
+    with col_pag:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+
+    AgGrid(pagina_servidor(filtrada, ordem, pagina), gridOptions=opcoes, key=chave, update_mode=GridUpdateMode.SORTING_CHANGED, **argumentos)
+    inicio = (pagina - 1) * LINHAS_PAGINA
+    st.caption(
+        f"{min(inicio + 1, len(filtrada))}–{min(inicio + LINHAS_PAGINA, len(filtrada))} de {len(filtrada)} linhas"
+        f" · página {pagina} de {paginas}"
+        f" · o cabeçalho ordena a tabela inteira; acima de {LIMITE_CLIENTE} linhas o filtro por coluna dá lugar à busca"
+    )
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+# ── Head-to-Head: todos os confrontos STINE × concorrência ──
+# A média de sc/ha por (material, município) vira uma matriz por categoria; vitórias, empates,
+# n e médias de cada par saem de operações entre as matrizes, não de um merge por produto.
+COL_MAT        = "tratamentos_nome"
+EMPATE_H2H     = 1.0   # diferença de até ±1 sc/ha não conta como vitória nem derrota
+MIN_MUNICIPIOS = 3     # municípios compartilhados para o confronto aparecer
+CELULAS_BLOCO  = 4_000_000   # limite de células (STINE × concorrentes × municípios) por bloco
+TTL_RESULTADOS = 30 * 60     # segundos que um resultado de "▶ Rodar Análise" fica no cache compartilhado
+
+COLUNAS_TABELA = (
+    "Produto 1", "SCs/ha Prod 1", "Produto 2", "SCs/ha Prod 2", "Qtd. Vitórias",
+    "N° Municípios", "Dif. %", "Dif. (SC)", "% Vitórias", "Classe",
+)
+
+
+def classificar_h2h(pct):
+    """Classe e cor de fundo pelo % de vitórias."""
+    if pd.isna(pct):  return "—",               "#F3F4F6"
+    if pct <= 45:     return "Restrito",         "#FF0000"
+    elif pct <= 55:   return "Competitivo",      "#FFFF00"
+    elif pct <= 75:   return "Superior",         "#87CEFF"
+    else:             return "Alta Performance", "#90EE90"
+
+
+def preparar_base(df):
+    """Ensaios com resultado e a chave `municipio_uf` ("Cidade — UF")."""
+    base = df[
+        (df["status_ensaio"] == "Com Resultado") &
+        (df["resultado_prod_scha_corrigido"].notna())
+    ].copy()
+    est_col = "estado_sigla" if "estado_sigla" in base.columns else "estado_nome"
+    base["municipio_uf"] = (
+        base["cidade_nome"].astype(object).fillna("").str.strip()
+        + " — "
+        + base[est_col].astype(object).fillna("").str.strip()
+    )
+    return base
+
+
+def _medias(df):
+    """Média de sc/ha por (material, município)."""
+    return (
+        df.groupby([COL_MAT, "municipio_uf"], as_index=False, observed=True)
+        ["resultado_prod_scha_corrigido"].mean()
+        .rename(columns={"resultado_prod_scha_corrigido": "sc_ha"})
+    )
+
+
+def _matriz(medias, municipios):
+    """Materiais (na ordem do groupby) e matriz material × município, NaN onde não foi avaliado."""
+    linhas, materiais = pd.factorize(medias[COL_MAT])
+    matriz = np.full((len(materiais), len(municipios)), np.nan)
+    matriz[linhas, municipios.get_indexer(medias["municipio_uf"])] = medias["sc_ha"].to_numpy(dtype=float)
+    return list(materiais), matriz
+
+
+def montar_confrontos(df_cult):
+    """Médias por categoria e todos os pares STINE × concorrente com ao menos um município em comum.
+
+    `df_cult` é a base de `preparar_base` já restrita a uma cultura. O resultado é compartilhado
+    entre sessões pelo cache de recortes — quem lê não deve alterá-lo.
+    """
+    medias_stine = _medias(df_cult[df_cult["categoria_material"] == "STINE"])
+    medias_conc  = _medias(df_cult[df_cult["categoria_material"] == "Concorrência"])
+
+    municipios = pd.Index(pd.concat([medias_stine["municipio_uf"], medias_conc["municipio_uf"]]).unique())
+    stine, A = _matriz(medias_stine, municipios)
+    conc,  B = _matriz(medias_conc, municipios)
+
+    # Blocos de linhas STINE para limitar a memória do cubo STINE × concorrentes × municípios
+    bloco = max(1, CELULAS_BLOCO // max(1, B.size))
+    partes = []
+    for ini in range(0, len(stine), bloco):
+        a = A[ini:ini + bloco, None, :]
+        dif = a - B[None, :, :]                      # NaN onde algum dos dois não foi avaliado
+        comum = ~np.isnan(dif)
+        partes.append((
+            comum.sum(axis=2),
+            (dif > EMPATE_H2H).sum(axis=2),
+            (np.abs(dif) <= EMPATE_H2H).sum(axis=2),
+            np.where(comum, a, 0).sum(axis=2),
+            np.where(comum, B[None, :, :], 0).sum(axis=2),
+        ))
+
+    if partes:
+        n, vit, emp, soma_1, soma_2 = (np.concatenate(p) for p in zip(*partes))
+    else:
+        n = vit = emp = soma_1 = soma_2 = np.zeros((0, len(conc)))
+
+    i, j = np.nonzero(n)
+    n = n[i, j]
+    confrontos = pd.DataFrame({
+        "produto_1": np.asarray(stine, dtype=object)[i],
+        "produto_2": np.asarray(conc, dtype=object)[j],
+        "n":         n,
+        "vitorias":  vit[i, j],
+        "empates":   emp[i, j],
+        "sc_ha_1":   soma_1[i, j] / n,
+        "sc_ha_2":   soma_2[i, j] / n,
+    })
+    confrontos["pct_vitorias"] = confrontos["vitorias"] / n * 100
+    confrontos["dif_sc"]       = confrontos["sc_ha_1"] - confrontos["sc_ha_2"]
+    confrontos["dif_pct"]      = (confrontos["sc_ha_1"] / confrontos["sc_ha_2"].replace(0, np.nan) - 1) * 100
+
+    return {"medias_stine": medias_stine, "medias_conc": medias_conc, "confrontos": confrontos}
+
+
+def tabela_confrontos(confrontos, produto_1=None, minimo=MIN_MUNICIPIOS):
+    """Tabela de classificação (colunas da aba H2H) do `produto_1` — ou ranking de todos os pares."""
+    pares = confrontos[confrontos["n"] >= minimo]
+    if produto_1 is not None:
+        pares = pares[pares["produto_1"] == produto_1]
+
+    pct = pares["pct_vitorias"].round(1)
+    tabela = pd.DataFrame({
+        "Produto 1":     pares["produto_1"],
+        "SCs/ha Prod 1": pares["sc_ha_1"].round(1),
+        "Produto 2":     pares["produto_2"],
+        "SCs/ha Prod 2": pares["sc_ha_2"].round(1),
+        "Qtd. Vitórias": pares["vitorias"].astype(int),
+        "N° Municípios": pares["n"].astype(int),
+        "Dif. %":        pares["dif_pct"].round(1),
+        "Dif. (SC)":     pares["dif_sc"].round(1),
+        "% Vitórias":    pct,
+        "Classe":        [classificar_h2h(p)[0] for p in pct],
+    }, columns=list(COLUNAS_TABELA))
+    if tabela.empty:
+        return tabela
+    return tabela.sort_values("% Vitórias", ascending=False).reset_index(drop=True)
+
+
+def _comparar(loc):
+    """Diferença de sc/ha e resultado (Vitória / Empate / Derrota) de cada município."""
+    loc["diff_sc"]   = loc["sc_ha_1"] - loc["sc_ha_2"]
+    loc["resultado"] = np.select(
+        [loc["diff_sc"] > EMPATE_H2H, loc["diff_sc"].abs() <= EMPATE_H2H],
+        ["Vitória", "Empate"],
+        default="Derrota",
+    )
+    return loc
+
+
+def confronto_municipios(medias_stine, medias_conc, produto_1, produto_2):
+    """Municípios avaliados pelos dois produtos, com a diferença de sc/ha e o resultado de cada um."""
+    d1 = medias_stine[medias_stine[COL_MAT] == produto_1][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_1"})
+    d2 = medias_conc[medias_conc[COL_MAT] == produto_2][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_2"})
+    loc = _comparar(d1.merge(d2, on="municipio_uf", how="inner"))
+    return loc.sort_values("diff_sc").reset_index(drop=True)
+
+
+def confrontos_municipios(medias_stine, medias_conc, confrontos, minimo=MIN_MUNICIPIOS):
+    """`confronto_municipios` de todos os pares com ao menos `minimo` municípios em comum, num merge só."""
+    pares = confrontos.loc[confrontos["n"] >= minimo, ["produto_1", "produto_2"]]
+    d1 = medias_stine.rename(columns={COL_MAT: "produto_1", "sc_ha": "sc_ha_1"})
+    d2 = medias_conc.rename(columns={COL_MAT: "produto_2", "sc_ha": "sc_ha_2"})
+    d1 = d1[d1["produto_1"].isin(pares["produto_1"])].astype({"produto_1": object})
+    d2 = d2[d2["produto_2"].isin(pares["produto_2"])].astype({"produto_2": object})
+    loc = _comparar(
+        d1.merge(d2, on="municipio_uf", how="inner")
+          .merge(pares, on=["produto_1", "produto_2"], how="inner")
+    )
+    return loc.sort_values(["produto_1", "produto_2", "diff_sc"], kind="stable").reset_index(drop=True)
+
+
+def abas_confrontos(h2h):
+    """Abas da planilha com todos os confrontos: o ranking e, por produto STINE, o detalhe por município."""
+    abas = {"Ranking": tabela_confrontos(h2h["confrontos"])}
+    loc = confrontos_municipios(h2h["medias_stine"], h2h["medias_conc"], h2h["confrontos"])
+    detalhe = pd.DataFrame({
+        "Produto 2":         loc["produto_2"],
+        "Município":         loc["municipio_uf"],
+        "SCs/ha Prod 1":     loc["sc_ha_1"].round(1),
+        "SCs/ha Prod 2":     loc["sc_ha_2"].round(1),
+        "Diferença (sc/ha)": loc["diff_sc"].round(1),
+        "Resultado":         loc["resultado"],
+    })
+    for produto_1, linhas in detalhe.groupby(loc["produto_1"], sort=True):
+        abas[produto_1] = linhas.reset_index(drop=True)
+    return abas
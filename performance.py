@@ -1,9 +1,28 @@
+import zlib
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-
 
-def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, COR_MILHO, filtro_ativo, sel_cultura, render_visao_hierarquica_regional):
+from agregacoes import estatisticas_grupos, series_semanais
+from exportacao import botao_exportar, botao_exportar_segundo_plano
+from h2h import (
+    COL_MAT, MIN_MUNICIPIOS, TTL_RESULTADOS,
+    abas_confrontos, confronto_municipios, montar_confrontos, preparar_base, tabela_confrontos,
+)
+
+# Colunas lidas por render_performance — conferidas contra o manifesto em dados.py
+COLUNAS_PERFORMANCE = (
+    "resultado_uuid", "fazenda_produtor_uuid", "cultura_nome", "tratamentos_nome",
+    "resultado_prod_scha_corrigido", "fazenda_area_plantada_soja", "fazenda_area_plantada_milho",
+    "regional_nome", "estado_nome", "estado_sigla", "cidade_nome",
+    "irrigacao", "fazenda_textura_solo", "fazenda_fertilidade_solo",
+    "fazenda_nivel_investimento", "fazenda_altitude",
+    "status_ensaio", "categoria_material", "ano_safra",
+    "resultado_data_plantio_dt", "resultado_data_colheita_dt",
+)
+
+def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, COR_MILHO, filtro_ativo, sel_cultura, render_visao_hierarquica_regional, agregado, chave_recorte):
 
     # ── KPIs ─────────────────────────────────────────────────
     total_areas    = df_filtrado["resultado_uuid"].nunique()
@@ -120,38 +139,56 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
             "#7C3AED"
         ), unsafe_allow_html=True)
 
-    # ════════════════════════════════════════════════════════
-    # MARCHA DE PLANTIO
-    # ════════════════════════════════════════════════════════
-
-    st.markdown("""
+    # Cada seção é um fragment: interagir com um widget dela reroda só a própria seção
+    _marcha(df_filtrado, card, agregado, "plantio")
+    _marcha(df_filtrado, card, agregado, "colheita")
+    _performance_materiais(df_filtrado, agregado)
+    _head_to_head(df_filtrado, sel_cultura, agregado, chave_recorte)
+
+
+# ════════════════════════════════════════════════════════
+# MARCHAS DE PLANTIO E COLHEITA
+# ════════════════════════════════════════════════════════
+# O que muda entre as duas marchas; o cálculo das semanas é o mesmo (series_semanais)
+ETAPAS_MARCHA = {
+    "plantio": dict(
+        coluna="resultado_data_plantio_dt",
+        nome="Plantio", de="de plantio", feitas="plantadas",
+        cor="#005FAE", cor_linha="rgba(0,95,174,0.3)",
+        quase_completo="plantio quase completo",
+    ),
+    "colheita": dict(
+        coluna="resultado_data_colheita_dt",
+        nome="Colheita", de="de colheita", feitas="colhidas",
+        cor="#009D57", cor_linha="rgba(0,157,87,0.3)",
+        quase_completo="colheita quase completa",
+    ),
+}
+
+
+@st.fragment
+def _marcha(df_filtrado, card, agregado, etapa):
+    """Avanço semanal do plantio ou da colheita."""
+    import plotly.graph_objects as go
+
+    cfg = ETAPAS_MARCHA[etapa]
+
+    st.markdown(f"""
         <div style="margin: 32px 0 12px 0;">
-            <p style="margin: 0 0 4px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Avanço de Plantio</p>
-            <div style="margin:0 0 8px 0; font-size:26px; font-weight:800; color:#1a1a1a; line-height:1.2;">Marcha de Plantio</div>
-            <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Evolução semanal do percentual acumulado de áreas plantadas. O tamanho de cada ponto representa a quantidade de áreas plantadas naquela semana.</p>
+            <p style="margin: 0 0 4px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Avanço de {cfg["nome"]}</p>
+            <div style="margin:0 0 8px 0; font-size:26px; font-weight:800; color:#1a1a1a; line-height:1.2;">Marcha de {cfg["nome"]}</div>
+            <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Evolução semanal do percentual acumulado de áreas {cfg["feitas"]}. O tamanho de cada ponto representa a quantidade de áreas {cfg["feitas"]} naquela semana.</p>
         </div>
     """, unsafe_allow_html=True)
 
-    # ── Filtra apenas áreas com data de plantio preenchida ───
-    df_plantio = df_filtrado[df_filtrado["resultado_data_plantio_dt"].notna()].copy()
+    # ── Semanas das áreas com data preenchida (cache de recortes) ───
+    semanas = agregado(f"semanas:{cfg['coluna']}", lambda: series_semanais(df_filtrado, cfg["coluna"]))
 
-    if len(df_plantio) == 0:
-        st.info("Nenhuma área com data de plantio registrada para os filtros selecionados.")
+    if len(semanas) == 0:
+        st.info(f"Nenhuma área com data {cfg['de']} registrada para os filtros selecionados.")
     else:
         try:
-            total_com_data = len(df_plantio)
-
-            # Agrupa por semana
-            df_plantio["semana"] = df_plantio["resultado_data_plantio_dt"].dt.to_period("W").dt.start_time
-            semanas = (
-                df_plantio.groupby("semana")
-                .size()
-                .reset_index(name="qtd_semana")
-                .sort_values("semana")
-            )
-            semanas["acumulado"]    = semanas["qtd_semana"].cumsum()
-            semanas["pct_acum"]     = (semanas["acumulado"] / total_com_data * 100).round(1)
-            semanas["semana_label"] = semanas["semana"].dt.strftime("%d/%b").str.lstrip("0")
+            total_com_data = int(semanas["acumulado"].iloc[-1])
 
             fig = go.Figure()
 
@@ -205,30 +242,12 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
                 x=semanas["semana"],
                 y=semanas["pct_acum"],
                 mode="lines",
-                line=dict(color="rgba(0,95,174,0.3)", width=2),
+                line=dict(color=cfg["cor_linha"], width=2),
                 showlegend=False,
                 hoverinfo="skip"
             ))
 
-            # ── Dots com tamanho proporcional ─────────────────
-            qtd_max = semanas["qtd_semana"].max()
-            qtd_min = semanas["qtd_semana"].min()
-
-            def escala_dot(q):
-                if qtd_max == qtd_min:
-                    return 28
-                return 14 + (q - qtd_min) / (qtd_max - qtd_min) * 34
-
-            def cor_dot(pct):
-                if pct >= 90:
-                    return "#7ED321"
-                elif pct >= 50:
-                    return "#D97706"
-                return "#DC2626"
-
-            semanas["dot_size"] = semanas["qtd_semana"].apply(escala_dot)
-            semanas["dot_cor"]  = semanas["pct_acum"].apply(cor_dot)
-
+            # ── Dots com tamanho e cor já calculados por semana ──
             fig.add_trace(go.Scatter(
                 x=semanas["semana"],
                 y=semanas["pct_acum"],
@@ -239,13 +258,13 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
                     opacity=0.85,
                     line=dict(color="white", width=2)
                 ),
-                text=semanas["pct_acum"].apply(lambda v: f"{v}%"),
+                text=semanas["pct_acum"].map(lambda v: f"{v}%"),
                 textposition="top center",
                 textfont=dict(size=11, color="black"),
                 customdata=semanas[["qtd_semana", "acumulado", "semana_label"]],
                 hovertemplate=(
                     "<b>Semana de %{customdata[2]}</b><br>"
-                    "%{customdata[0]} áreas plantadas<br>"
+                    f"%{{customdata[0]}} áreas {cfg['feitas']}<br>"
                     "Acumulado: %{customdata[1]} áreas (%{y}%)<extra></extra>"
                 ),
                 showlegend=False
@@ -284,199 +303,38 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
 
             col_r1, col_r2, col_r3, col_r4 = st.columns(4)
             with col_r1:
-                st.markdown(card("Áreas com data de plantio", f"{total_com_data:,}".replace(",", "."), "registradas no período", "#005FAE"), unsafe_allow_html=True)
+                st.markdown(card(f"Áreas com data {cfg['de']}", f"{total_com_data:,}".replace(",", "."), "registradas no período", cfg["cor"]), unsafe_allow_html=True)
             with col_r2:
-                st.markdown(card("Semanas de plantio", f"{semanas_tot}", "semanas com atividade", "#7C3AED"), unsafe_allow_html=True)
+                st.markdown(card(f"Semanas {cfg['de']}", f"{semanas_tot}", "semanas com atividade", "#7C3AED"), unsafe_allow_html=True)
             with col_r3:
-                st.markdown(card("50% atingido na semana de", semana_50, "metade das áreas plantadas", "#D97706"), unsafe_allow_html=True)
+                st.markdown(card("50% atingido na semana de", semana_50, f"metade das áreas {cfg['feitas']}", "#D97706"), unsafe_allow_html=True)
             with col_r4:
                 cor_90 = "#7ED321" if semana_90 != "Em andamento" else "#DC2626"
-                st.markdown(card("90% atingido na semana de", semana_90, "plantio quase completo", cor_90), unsafe_allow_html=True)
+                st.markdown(card("90% atingido na semana de", semana_90, cfg["quase_completo"], cor_90), unsafe_allow_html=True)
 
         except Exception as e:
-            st.error(f"Erro ao gerar gráfico de marcha de plantio: {e}")
+            st.error(f"Erro ao gerar gráfico de marcha {cfg['de']}: {e}")
             import traceback
             st.code(traceback.format_exc())
 
-    # ════════════════════════════════════════════════════════
-    # MARCHA DE COLHEITA
-    # ════════════════════════════════════════════════════════
-
-    st.markdown("""
-        <div style="margin: 32px 0 12px 0;">
-            <p style="margin: 0 0 4px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Avanço de Colheita</p>
-            <div style="margin:0 0 8px 0; font-size:26px; font-weight:800; color:#1a1a1a; line-height:1.2;">Marcha de Colheita</div>
-            <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Evolução semanal do percentual acumulado de áreas colhidas. O tamanho de cada ponto representa a quantidade de áreas colhidas naquela semana.</p>
-        </div>
-    """, unsafe_allow_html=True)
-
-    df_colheita = df_filtrado[df_filtrado["resultado_data_colheita_dt"].notna()].copy()
-
-    if len(df_colheita) == 0:
-        st.info("Nenhuma área com data de colheita registrada para os filtros selecionados.")
-    else:
-        try:
-            total_com_colheita = len(df_colheita)
-
-            df_colheita["semana"] = df_colheita["resultado_data_colheita_dt"].dt.to_period("W").dt.start_time
-            semanas_c = (
-                df_colheita.groupby("semana")
-                .size()
-                .reset_index(name="qtd_semana")
-                .sort_values("semana")
-            )
-            semanas_c["acumulado"]    = semanas_c["qtd_semana"].cumsum()
-            semanas_c["pct_acum"]     = (semanas_c["acumulado"] / total_com_colheita * 100).round(1)
-            semanas_c["semana_label"] = semanas_c["semana"].dt.strftime("%d/%b").str.lstrip("0")
-
-            fig_c = go.Figure()
-
-            # ── Sombreados de zona ────────────────────────────
-            fig_c.add_shape(type="rect",
-                xref="paper", yref="y",
-                x0=0, x1=1, y0=0, y1=50,
-                fillcolor="rgba(220,38,38,0.07)",
-                line_width=0, layer="below"
-            )
-            fig_c.add_shape(type="rect",
-                xref="paper", yref="y",
-                x0=0, x1=1, y0=50, y1=90,
-                fillcolor="rgba(217,119,6,0.07)",
-                line_width=0, layer="below"
-            )
-            fig_c.add_shape(type="rect",
-                xref="paper", yref="y",
-                x0=0, x1=1, y0=90, y1=100,
-                fillcolor="rgba(126,211,33,0.10)",
-                line_width=0, layer="below"
-            )
-
-            # Linhas de referência
-            fig_c.add_shape(type="line",
-                xref="paper", yref="y",
-                x0=0, x1=1, y0=50, y1=50,
-                line=dict(color="rgba(217,119,6,0.5)", width=1.5, dash="dot"),
-                layer="below"
-            )
-            fig_c.add_shape(type="line",
-                xref="paper", yref="y",
-                x0=0, x1=1, y0=90, y1=90,
-                line=dict(color="rgba(126,211,33,0.6)", width=1.5, dash="dot"),
-                layer="below"
-            )
-
-            # Anotações das zonas
-            fig_c.add_annotation(x=1, xref="paper", y=25, yref="y",
-                text="<b>Início</b>", showarrow=False,
-                xanchor="left", font=dict(size=11, color="rgba(220,38,38,0.5)"), xshift=8)
-            fig_c.add_annotation(x=1, xref="paper", y=70, yref="y",
-                text="<b>Progresso</b>", showarrow=False,
-                xanchor="left", font=dict(size=11, color="rgba(217,119,6,0.6)"), xshift=8)
-            fig_c.add_annotation(x=1, xref="paper", y=95, yref="y",
-                text="<b>Fim</b>", showarrow=False,
-                xanchor="left", font=dict(size=11, color="rgba(100,180,50,0.8)"), xshift=8)
-
-            # Linha conectando os pontos
-            fig_c.add_trace(go.Scatter(
-                x=semanas_c["semana"],
-                y=semanas_c["pct_acum"],
-                mode="lines",
-                line=dict(color="rgba(0,157,87,0.3)", width=2),
-                showlegend=False,
-                hoverinfo="skip"
-            ))
-
-            # Dots com tamanho proporcional
-            qtd_max_c = semanas_c["qtd_semana"].max()
-            qtd_min_c = semanas_c["qtd_semana"].min()
-
-            def escala_dot_c(q):
-                if qtd_max_c == qtd_min_c:
-                    return 28
-                return 14 + (q - qtd_min_c) / (qtd_max_c - qtd_min_c) * 34
-
-            def cor_dot_c(pct):
-                if pct >= 90:
-                    return "#7ED321"
-                elif pct >= 50:
-                    return "#D97706"
-                return "#DC2626"
-
-            semanas_c["dot_size"] = semanas_c["qtd_semana"].apply(escala_dot_c)
-            semanas_c["dot_cor"]  = semanas_c["pct_acum"].apply(cor_dot_c)
-
-            fig_c.add_trace(go.Scatter(
-                x=semanas_c["semana"],
-                y=semanas_c["pct_acum"],
-                mode="markers+text",
-                marker=dict(
-                    size=semanas_c["dot_size"],
-                    color=semanas_c["dot_cor"],
-                    opacity=0.85,
-                    line=dict(color="white", width=2)
-                ),
-                text=semanas_c["pct_acum"].apply(lambda v: f"{v}%"),
-                textposition="top center",
-                textfont=dict(size=11, color="black"),
-                customdata=semanas_c[["qtd_semana", "acumulado", "semana_label"]],
-                hovertemplate=(
-                    "<b>Semana de %{customdata[2]}</b><br>"
-                    "%{customdata[0]} áreas colhidas<br>"
-                    "Acumulado: %{customdata[1]} áreas (%{y}%)<extra></extra>"
-                ),
-                showlegend=False
-            ))
-
-            fig_c.update_layout(
-                height=420,
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=20, r=80, t=40, b=60),
-                xaxis=dict(
-                    title="",
-                    tickformat="%d/%b",
-                    tickfont=dict(color="black", size=11),
-                    showgrid=False,
-                    zeroline=False,
-                ),
-                yaxis=dict(
-                    title="% acumulado",
-                    range=[-5, 112],
-                    ticksuffix="%",
-                    tickvals=[0, 20, 40, 60, 80, 100],
-                    tickfont=dict(color="black", size=11),
-                    showgrid=True,
-                    gridcolor="rgba(0,0,0,0.05)",
-                    zeroline=False,
-                ),
-            )
-
-            st.plotly_chart(fig_c, use_container_width=True)
-
-            # Resumo rápido
-            semana_50_c   = semanas_c[semanas_c["pct_acum"] >= 50]["semana_label"].iloc[0] if (semanas_c["pct_acum"] >= 50).any() else "—"
-            semana_90_c   = semanas_c[semanas_c["pct_acum"] >= 90]["semana_label"].iloc[0] if (semanas_c["pct_acum"] >= 90).any() else "Em andamento"
-            semanas_tot_c = len(semanas_c)
 
-            col_c1, col_c2, col_c3, col_c4 = st.columns(4)
-            with col_c1:
-                st.markdown(card("Áreas com data de colheita", f"{total_com_colheita:,}".replace(",", "."), "registradas no período", "#009D57"), unsafe_allow_html=True)
-            with col_c2:
-                st.markdown(card("Semanas de colheita", f"{semanas_tot_c}", "semanas com atividade", "#7C3AED"), unsafe_allow_html=True)
-            with col_c3:
-                st.markdown(card("50% atingido na semana de", semana_50_c, "metade das áreas colhidas", "#D97706"), unsafe_allow_html=True)
-            with col_c4:
-                cor_90_c = "#7ED321" if semana_90_c != "Em andamento" else "#DC2626"
-                st.markdown(card("90% atingido na semana de", semana_90_c, "colheita quase completa", cor_90_c), unsafe_allow_html=True)
+# ════════════════════════════════════════════════════════
+# GRADIENT CHART — PERFORMANCE DOS MATERIAIS
+# ════════════════════════════════════════════════════════
+def base_resultados(df_filtrado):
+    """Ensaios com resultado e produtividade corrigida numérica — base do gradiente e da geografia."""
+    df_res = df_filtrado[
+        (df_filtrado["status_ensaio"] == "Com Resultado") &
+        (df_filtrado["resultado_prod_scha_corrigido"].notna())
+    ].copy()
+    df_res["resultado_prod_scha_corrigido"] = pd.to_numeric(df_res["resultado_prod_scha_corrigido"], errors="coerce")
+    return df_res[df_res["resultado_prod_scha_corrigido"].notna()]
 
-        except Exception as e:
-            st.error(f"Erro ao gerar gráfico de marcha de colheita: {e}")
-            import traceback
-            st.code(traceback.format_exc())
 
-    # ════════════════════════════════════════════════════════
-    # GRADIENT CHART — PERFORMANCE DOS MATERIAIS
-    # ════════════════════════════════════════════════════════
+@st.fragment
+def _performance_materiais(df_filtrado, agregado):
+    """Gradiente de produtividade por material, com a análise geográfica aninhada."""
+    import plotly.graph_objects as go
 
     st.markdown("""
         <div style="margin: 32px 0 12px 0;">
@@ -494,12 +352,7 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
     """, unsafe_allow_html=True)
 
     # ── Base com resultado ────────────────────────────────────
-    df_res = df_filtrado[
-        (df_filtrado["status_ensaio"] == "Com Resultado") &
-        (df_filtrado["resultado_prod_scha_corrigido"].notna())
-    ].copy()
-    df_res["resultado_prod_scha_corrigido"] = pd.to_numeric(df_res["resultado_prod_scha_corrigido"], errors="coerce")
-    df_res = df_res[df_res["resultado_prod_scha_corrigido"].notna()]
+    df_res = base_resultados(df_filtrado)
     col_mat = "tratamentos_nome" if "tratamentos_nome" in df_res.columns else None
 
     if col_mat is None or len(df_res) == 0:
@@ -521,7 +374,7 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
         cor_cultura = "0,157,87" if cultura_sel == "Soja" else "0,95,174"
 
         # Materiais com mínimo 3 ensaios
-        contagem = df_cult.groupby(col_mat).size()
+        contagem = df_cult.groupby(col_mat, observed=True).size()
         mats_validos = contagem[contagem >= 3].index.tolist()
 
         df_cult_val = df_cult[df_cult[col_mat].isin(mats_validos)]
@@ -627,6 +480,7 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
         # ── Gráfico só aparece com ao menos 1 STINE ──────────
         # Aplica filtros adicionais — df_env já tem irrigação, textura, fertilidade e investimento aplicados
         df_plot_base = df_env.copy()
+        filtros_ambiente = (tuple(irrig_sel), tuple(textura_sel), tuple(fertil_sel), tuple(invest_sel), alt_sel)
         if alt_sel is not None and "fazenda_altitude" in df_plot_base.columns:
             df_plot_base = df_plot_base[
                 (df_plot_base["fazenda_altitude"] >= alt_sel[0]) &
@@ -690,82 +544,58 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
             df_plot = df_plot_base[df_plot_base[col_mat].isin(mats_sel)]
 
             # Estatísticas por material
-            stats = (
-                df_plot.groupby([col_mat, "categoria_material"])["resultado_prod_scha_corrigido"]
-                .agg(
-                    n="count",
-                    media="mean",
-                    std="std",
-                    minv="min",
-                    maxv="max",
-                    q1=lambda x: x.quantile(0.25),
-                    q3=lambda x: x.quantile(0.75),
-                )
-                .reset_index()
-            )
-            stats["std"] = stats["std"].fillna(0)
+            stats = estatisticas_grupos(df_plot, [col_mat, "categoria_material"], "resultado_prod_scha_corrigido")
             stats = stats.sort_values("media", ascending=True)
             cultivares = stats[col_mat].tolist()
 
+            # ── Camadas em lote: um trace por camada, qualquer que seja o nº de materiais ──
+            rgb      = np.where(stats["categoria_material"] == "STINE", cor_cultura, "150,150,150")
+            std_low  = np.maximum(stats["media"] - stats["std"], stats["minv"])
+            std_high = np.minimum(stats["media"] + stats["std"], stats["maxv"])
+            camadas = (
+                (stats["minv"], stats["maxv"], "0.12"),   # Camada 1: min → max
+                (std_low,       std_high,      "0.28"),   # Camada 2: média ± desvio
+                (stats["q1"],   stats["q3"],   "0.50"),   # Camada 3: Q1 → Q3
+            )
+
             fig = go.Figure()
 
-            for idx, row in stats.iterrows():
-                nome     = row[col_mat]
-                media    = row["media"]
-                std      = row["std"]
-                minv     = row["minv"]
-                maxv     = row["maxv"]
-                q1       = row["q1"]
-                q3       = row["q3"]
-                is_stine = row["categoria_material"] == "STINE"
-                rgb      = cor_cultura if is_stine else "150,150,150"
-                y_pos    = cultivares.index(nome)
-
-                std_low  = max(media - std, minv)
-                std_high = min(media + std, maxv)
-
-                # Camada 1: min → max
-                fig.add_trace(go.Bar(
-                    y=[nome], x=[maxv - minv], base=[minv],
-                    orientation="h",
-                    width=0.55, showlegend=False, hoverinfo="skip",
-                    marker=dict(color=f"rgba({rgb},0.12)", line_width=0)
-                ))
-                # Camada 2: média ± desvio
+            for inicio, fim, alfa in camadas:
                 fig.add_trace(go.Bar(
-                    y=[nome], x=[std_high - std_low], base=[std_low],
+                    y=cultivares, x=fim - inicio, base=inicio,
                     orientation="h",
                     width=0.55, showlegend=False, hoverinfo="skip",
-                    marker=dict(color=f"rgba({rgb},0.28)", line_width=0)
+                    marker=dict(color=[f"rgba({c},{alfa})" for c in rgb], line_width=0)
                 ))
-                # Camada 3: Q1 → Q3
-                fig.add_trace(go.Bar(
-                    y=[nome], x=[q3 - q1], base=[q1],
-                    orientation="h",
-                    width=0.55, showlegend=False, hoverinfo="skip",
-                    marker=dict(color=f"rgba({rgb},0.50)", line_width=0)
-                ))
-                # Linha da média (vertical no eixo horizontal)
-                fig.add_shape(
-                    type="line",
-                    y0=y_pos - 0.28, y1=y_pos + 0.28,
-                    x0=media, x1=media,
-                    xref="x", yref="y",
-                    line=dict(color="#1a1a1a", width=2.5),
-                    layer="above"
-                )
-                # Rótulo da média
-                n_ensaios = int(row["n"])
-                fig.add_annotation(
-                    x=media, y=y_pos + 0.32,
-                    text=f"<b>{media:.1f}</b> (n={n_ensaios})",
-                    showarrow=False,
-                    font=dict(size=13, color="#1a1a1a"),
-                    xanchor="center",
-                    yanchor="bottom",
-                    bgcolor="rgba(255,255,255,0.75)",
-                    borderpad=2,
-                )
+
+            # Linha da média (vertical no eixo horizontal) e rótulo, montados de uma vez no layout
+            medias = stats["media"].tolist()
+            fig.update_layout(
+                shapes=[
+                    dict(
+                        type="line",
+                        y0=y_pos - 0.28, y1=y_pos + 0.28,
+                        x0=media, x1=media,
+                        xref="x", yref="y",
+                        line=dict(color="#1a1a1a", width=2.5),
+                        layer="above"
+                    )
+                    for y_pos, media in enumerate(medias)
+                ],
+                annotations=[
+                    dict(
+                        x=media, y=y_pos + 0.32,
+                        text=f"<b>{media:.1f}</b> (n={n_ensaios})",
+                        showarrow=False,
+                        font=dict(size=13, color="#1a1a1a"),
+                        xanchor="center",
+                        yanchor="bottom",
+                        bgcolor="rgba(255,255,255,0.75)",
+                        borderpad=2,
+                    )
+                    for y_pos, (media, n_ensaios) in enumerate(zip(medias, stats["n"].astype(int)))
+                ],
+            )
 
             # Hover
             fig.add_trace(go.Scatter(
@@ -814,185 +644,218 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
             # ════════════════════════════════════════════════
             # PERFORMANCE POR GEOGRAFIA
             # ════════════════════════════════════════════════
-            st.markdown("""
-                <div style="margin: 32px 0 12px 0;">
-                    <p style="margin: 0 0 4px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Análise Geográfica</p>
-                    <div style="margin:0 0 8px 0; font-size:26px; font-weight:800; color:#1a1a1a; line-height:1.2;">Performance por Região</div>
-                    <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Cada ponto representa um ensaio individual. A <strong>barra vertical</strong> indica a média por região. Identifique onde cada cultivar performa melhor e como os resultados se distribuem.</p>
-                </div>
-            """, unsafe_allow_html=True)
+            # Fragment aninhado: trocar "Agrupar por" reroda só este bloco, não o gradiente acima
+            @st.fragment
+            def _performance_geografia():
+                st.markdown("""
+                    <div style="margin: 32px 0 12px 0;">
+                        <p style="margin: 0 0 4px 0; font-size: 11px; font-weight: 700; color: #1a1a1a; letter-spacing: 2px; text-transform: uppercase;">Análise Geográfica</p>
+                        <div style="margin:0 0 8px 0; font-size:26px; font-weight:800; color:#1a1a1a; line-height:1.2;">Performance por Região</div>
+                        <p style="margin: 0; font-size: 14px; color: #666; line-height: 1.6; max-width: 860px;">Cada ponto representa um ensaio individual. A <strong>barra vertical</strong> indica a média por região. Identifique onde cada cultivar performa melhor e como os resultados se distribuem.</p>
+                    </div>
+                """, unsafe_allow_html=True)
 
-            col_geo1, col_geo2 = st.columns([1, 4])
-            with col_geo1:
-                geo_nivel = st.selectbox(
-                    "Agrupar por",
-                    options=["Regional", "Estado", "Cidade"],
-                    key="grad_geo_nivel"
-                )
+                col_geo1, col_geo2 = st.columns([1, 4])
+                with col_geo1:
+                    geo_nivel = st.selectbox(
+                        "Agrupar por",
+                        options=["Regional", "Estado", "Cidade"],
+                        key="grad_geo_nivel"
+                    )
 
-            col_geo = {"Regional": "regional_nome", "Estado": "estado_nome", "Cidade": "cidade_nome"}[geo_nivel]
+                col_geo = {"Regional": "regional_nome", "Estado": "estado_nome", "Cidade": "cidade_nome"}[geo_nivel]
 
-            # Pontos individuais
-            df_geo_raw = df_plot[df_plot[col_mat].isin(mats_sel)].copy()
-            df_geo_raw = df_geo_raw[[col_geo, col_mat, "categoria_material", "resultado_prod_scha_corrigido"]].dropna()
+                # Figura memoizada por versão dos dados e filtros globais (chave do recorte) + cultura, ambiente, materiais e nível
+                chave_geo = (cultura_sel, filtros_ambiente, tuple(mats_sel), geo_nivel)
+                fig_geo = agregado(f"geo:{chave_geo}", lambda: _figura_geografia(df_plot, mats_sel, col_geo, col_mat))
 
-            # Estatísticas para ordenação e marcador de média
-            df_geo_stats = df_geo_raw.groupby([col_geo, col_mat, "categoria_material"])["resultado_prod_scha_corrigido"] \
-                .agg(n="count", media="mean").reset_index()
-            df_geo_stats = df_geo_stats[df_geo_stats["n"] >= 2]
+                if fig_geo is None:
+                    st.info("Sem dados suficientes para análise geográfica com os filtros selecionados.")
+                else:
+                    st.markdown("""
+                        <div style="display:flex; gap:24px; align-items:center; margin: 4px 0 16px 0; flex-wrap:wrap;">
+                            <span style="font-size:12px; font-weight:700; color:#555; text-transform:uppercase; letter-spacing:1px;">Como ler:</span>
+                            <div style="display:flex; align-items:center; gap:8px;">
+                                <div style="width:10px; height:10px; border-radius:50%; background:rgba(0,100,80,0.45); flex-shrink:0;"></div>
+                                <span style="font-size:12px; color:#333;">Ensaio individual</span>
+                            </div>
+                            <div style="display:flex; align-items:center; gap:8px;">
+                                <div style="width:3px; height:16px; background:rgba(0,100,80,1); border-radius:1px; flex-shrink:0;"></div>
+                                <span style="font-size:12px; color:#333;">Média do material na região</span>
+                            </div>
+                        </div>
+                    """, unsafe_allow_html=True)
 
-            # Filtra pontos individuais para pares região+material com ao menos 2 ensaios
-            pares_validos = set(zip(df_geo_stats[col_geo], df_geo_stats[col_mat]))
-            df_geo_raw = df_geo_raw[
-                df_geo_raw.apply(lambda r: (r[col_geo], r[col_mat]) in pares_validos, axis=1)
-            ]
+                    st.plotly_chart(fig_geo, use_container_width=True)
 
-            if len(df_geo_raw) == 0:
-                st.info("Sem dados suficientes para análise geográfica com os filtros selecionados.")
-            else:
-                stine_geo = df_geo_stats[df_geo_stats["categoria_material"] == "STINE"] \
-                    .groupby(col_geo)["media"].mean().sort_values(ascending=True)
-                ordem_geo = stine_geo.index.tolist()
-
-                outras = [r for r in df_geo_raw[col_geo].unique() if r not in ordem_geo]
-                ordem_geo = outras + ordem_geo
-
-                # Paleta de cores — STINE tons quentes, concorrência tons frios/neutros
-                paleta_stine = ["#009D57", "#7ED321", "#00C49A", "#5DB85C", "#A8D500"]
-                paleta_conc  = ["#4A90D9", "#7B5EA7", "#D97706", "#DC2626", "#0891B2", "#BE185D", "#92400E"]
-
-                idx_stine = 0
-                idx_conc  = 0
-                cor_por_mat = {}
-                for mat in mats_sel:
-                    cat = df_geo_stats[df_geo_stats[col_mat] == mat]["categoria_material"].iloc[0] \
-                        if len(df_geo_stats[df_geo_stats[col_mat] == mat]) > 0 else "Concorrência"
-                    if cat == "STINE":
-                        cor_por_mat[mat] = paleta_stine[idx_stine % len(paleta_stine)]
-                        idx_stine += 1
-                    else:
-                        cor_por_mat[mat] = paleta_conc[idx_conc % len(paleta_conc)]
-                        idx_conc += 1
+            _performance_geografia()
 
-                import numpy as np
 
-                st.markdown("""
-                    <div style="display:flex; gap:24px; align-items:center; margin: 4px 0 16px 0; flex-wrap:wrap;">
-                        <span style="font-size:12px; font-weight:700; color:#555; text-transform:uppercase; letter-spacing:1px;">Como ler:</span>
-                        <div style="display:flex; align-items:center; gap:8px;">
-                            <div style="width:10px; height:10px; border-radius:50%; background:rgba(0,100,80,0.45); flex-shrink:0;"></div>
-                            <span style="font-size:12px; color:#333;">Ensaio individual</span>
-                        </div>
-                        <div style="display:flex; align-items:center; gap:8px;">
-                            <div style="width:3px; height:16px; background:rgba(0,100,80,1); border-radius:1px; flex-shrink:0;"></div>
-                            <span style="font-size:12px; color:#333;">Média do material na região</span>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
+# ── Gráfico geográfico (memoizado no cache de recortes) ──
+# Paleta de cores — STINE tons quentes, concorrência tons frios/neutros
+PALETA_GEO_STINE = ["#009D57", "#7ED321", "#00C49A", "#5DB85C", "#A8D500"]
+PALETA_GEO_CONC  = ["#4A90D9", "#7B5EA7", "#D97706", "#DC2626", "#0891B2", "#BE185D", "#92400E"]
 
-                fig_geo = go.Figure()
-
-                n_mats = len(mats_sel)
-                for i, mat in enumerate(mats_sel):
-                    df_mat_raw = df_geo_raw[df_geo_raw[col_mat] == mat]
-                    if len(df_mat_raw) == 0:
-                        continue
-                    is_stine = (df_mat_raw["categoria_material"].iloc[0] == "STINE")
-                    cor = cor_por_mat[mat]
-                    offset = (i - (n_mats - 1) / 2) * 0.22
-
-                    # Média e n geral do material (para legenda)
-                    media_geral  = df_mat_raw["resultado_prod_scha_corrigido"].mean()
-                    n_geral      = len(df_mat_raw)
-                    nome_legenda = f"{mat}  —  {media_geral:.1f} sc/ha (n={n_geral})"
-
-                    # Jitter vertical
-                    rng = np.random.default_rng(seed=hash(mat) % (2**32))
-                    y_vals = []
-                    for r in df_mat_raw[col_geo]:
-                        base = ordem_geo.index(r) + offset if r in ordem_geo else offset
-                        y_vals.append(base + rng.uniform(-0.15, 0.15))
-
-                    # Pontos individuais com rótulo
-                    fig_geo.add_trace(go.Scatter(
-                        x=df_mat_raw["resultado_prod_scha_corrigido"],
-                        y=y_vals,
-                        mode="markers+text",
-                        name=nome_legenda,
-                        legendgroup=mat,
-                        showlegend=True,
-                        marker=dict(
-                            size=11,
-                            color=cor,
-                            opacity=0.8,
-                            symbol="circle" if is_stine else "diamond",
-                            line=dict(color="white", width=1)
-                        ),
-                        text=df_mat_raw["resultado_prod_scha_corrigido"].apply(lambda v: f"  {v:.1f}"),
-                        textposition="middle right",
-                        textfont=dict(size=11, color="rgba(0,0,0,0.85)"),
-                        customdata=df_mat_raw[[col_geo, "resultado_prod_scha_corrigido"]].values,
-                        hovertemplate=(
-                            f"<b>{mat}</b><br>"
-                            "%{customdata[0]}<br>"
-                            "Resultado: <b>%{customdata[1]:.1f} sc/ha</b><extra></extra>"
-                        )
-                    ))
-
-                    # Linha vertical "|" marcando a média por região
-                    df_mat_stats = df_geo_stats[df_geo_stats[col_mat] == mat]
-                    for _, srow in df_mat_stats.iterrows():
-                        regiao = srow[col_geo]
-                        if regiao not in ordem_geo:
-                            continue
-                        y_mean = ordem_geo.index(regiao) + offset
-                        fig_geo.add_shape(
-                            type="line",
-                            x0=srow["media"], x1=srow["media"],
-                            y0=y_mean - 0.22, y1=y_mean + 0.22,
-                            xref="x", yref="y",
-                            line=dict(color=cor, width=3),
-                            layer="above"
-                        )
 
-                fig_geo.update_layout(
-                    height=max(380, len(ordem_geo) * 44 + 100),
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    margin=dict(l=20, r=80, t=10, b=40),
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom", y=1.02,
-                        font=dict(color="black", size=11)
-                    ),
-                    xaxis=dict(
-                        title=dict(text="<b>sc/ha</b>", font=dict(color="black", size=14)),
-                        tickfont=dict(color="black", size=13, family="Arial Black"),
-                        tickcolor="black",
-                        showgrid=True,
-                        gridcolor="rgba(0,0,0,0.06)",
-                        zeroline=False,
-                    ),
-                    yaxis=dict(
-                        tickfont=dict(color="black", size=13, family="Arial Black"),
-                        tickcolor="black",
-                        showgrid=True,
-                        gridcolor="rgba(0,0,0,0.08)",
-                        zeroline=False,
-                        tickmode="array",
-                        tickvals=list(range(len(ordem_geo))),
-                        ticktext=ordem_geo,
-                        range=[-0.6, len(ordem_geo) - 0.4],
-                    ),
-                    font=dict(color="black"),
-                )
-                st.plotly_chart(fig_geo, use_container_width=True)
+def _jitter_estavel(chave, n, amplitude=0.15):
+    """`n` deslocamentos uniformes em ±amplitude com semente derivada do conteúdo de `chave`.
+
+    `hash()` de str muda a cada processo; o crc32 dá o mesmo layout em toda réplica e restart.
+    """
+    rng = np.random.default_rng(seed=zlib.crc32(str(chave).encode("utf-8")))
+    return rng.uniform(-amplitude, amplitude, size=n)
+
+
+def _figura_geografia(df_plot, mats_sel, col_geo, col_mat):
+    """Figura (dict do plotly) de pontos por região com a média de cada material; None sem pares com n ≥ 2."""
+    import plotly.graph_objects as go
+
+    # Pontos individuais
+    df_geo_raw = df_plot[df_plot[col_mat].isin(mats_sel)]
+    df_geo_raw = df_geo_raw[[col_geo, col_mat, "categoria_material", "resultado_prod_scha_corrigido"]].dropna()
+
+    # Estatísticas para ordenação e marcador de média
+    df_geo_stats = df_geo_raw.groupby([col_geo, col_mat, "categoria_material"], observed=True)["resultado_prod_scha_corrigido"] \
+        .agg(n="count", media="mean").reset_index()
+    df_geo_stats = df_geo_stats[df_geo_stats["n"] >= 2]
+
+    # Filtra pontos individuais para pares região+material com ao menos 2 ensaios (semi-join pelo tamanho do grupo)
+    n_par = df_geo_raw.groupby([col_geo, col_mat], observed=True)[col_mat].transform("size")
+    df_geo_raw = df_geo_raw[n_par >= 2]
+
+    if len(df_geo_raw) == 0:
+        return None
+
+    stine_geo = df_geo_stats[df_geo_stats["categoria_material"] == "STINE"] \
+        .groupby(col_geo, observed=True)["media"].mean().sort_values(ascending=True)
+    ordem_geo = stine_geo.index.tolist()
+
+    outras = [r for r in df_geo_raw[col_geo].unique() if r not in ordem_geo]
+    ordem_geo = outras + ordem_geo
+    posicao_geo = pd.Index(ordem_geo)
 
+    # Índice por material: pontos, médias por região e categoria, montados uma vez
+    raw_por_mat   = dict(tuple(df_geo_raw.groupby(col_mat, observed=True)))
+    stats_por_mat = dict(tuple(df_geo_stats.groupby(col_mat, observed=True)))
+    cat_por_mat   = df_geo_stats.drop_duplicates(col_mat).set_index(col_mat)["categoria_material"].to_dict()
 
-    # ════════════════════════════════════════════════════════
-    # HEAD-TO-HEAD POR MUNICÍPIO
-    # ════════════════════════════════════════════════════════
+    idx_stine = 0
+    idx_conc  = 0
+    cor_por_mat = {}
+    for mat in mats_sel:
+        cat = cat_por_mat.get(mat, "Concorrência")
+        if cat == "STINE":
+            cor_por_mat[mat] = PALETA_GEO_STINE[idx_stine % len(PALETA_GEO_STINE)]
+            idx_stine += 1
+        else:
+            cor_por_mat[mat] = PALETA_GEO_CONC[idx_conc % len(PALETA_GEO_CONC)]
+            idx_conc += 1
+
+    fig_geo = go.Figure()
+    medias_regiao = []
+
+    n_mats = len(mats_sel)
+    for i, mat in enumerate(mats_sel):
+        df_mat_raw = raw_por_mat.get(mat)
+        if df_mat_raw is None:
+            continue
+        is_stine = (df_mat_raw["categoria_material"].iloc[0] == "STINE")
+        cor = cor_por_mat[mat]
+        offset = (i - (n_mats - 1) / 2) * 0.22
+
+        # Média e n geral do material (para legenda)
+        media_geral  = df_mat_raw["resultado_prod_scha_corrigido"].mean()
+        n_geral      = len(df_mat_raw)
+        nome_legenda = f"{mat}  —  {media_geral:.1f} sc/ha (n={n_geral})"
+
+        # Jitter vertical: posição da região + deslocamento do material + ruído estável, tudo em arrays
+        base   = np.maximum(posicao_geo.get_indexer(df_mat_raw[col_geo]), 0) + offset
+        y_vals = base + _jitter_estavel(mat, n_geral)
+
+        # Pontos individuais com rótulo
+        fig_geo.add_trace(go.Scatter(
+            x=df_mat_raw["resultado_prod_scha_corrigido"],
+            y=y_vals,
+            mode="markers+text",
+            name=nome_legenda,
+            legendgroup=mat,
+            showlegend=True,
+            marker=dict(
+                size=11,
+                color=cor,
+                opacity=0.8,
+                symbol="circle" if is_stine else "diamond",
+                line=dict(color="white", width=1)
+            ),
+            text=df_mat_raw["resultado_prod_scha_corrigido"].map(lambda v: f"  {v:.1f}"),
+            textposition="middle right",
+            textfont=dict(size=11, color="rgba(0,0,0,0.85)"),
+            customdata=df_mat_raw[[col_geo, "resultado_prod_scha_corrigido"]].values,
+            hovertemplate=(
+                f"<b>{mat}</b><br>"
+                "%{customdata[0]}<br>"
+                "Resultado: <b>%{customdata[1]:.1f} sc/ha</b><extra></extra>"
+            )
+        ))
+
+        # Linha vertical "|" marcando a média por região
+        df_mat_stats = stats_por_mat[mat]
+        y_mean = posicao_geo.get_indexer(df_mat_stats[col_geo])
+        for media, y_pos in zip(df_mat_stats["media"], y_mean):
+            if y_pos < 0:
+                continue
+            medias_regiao.append(dict(
+                type="line",
+                x0=media, x1=media,
+                y0=y_pos + offset - 0.22, y1=y_pos + offset + 0.22,
+                xref="x", yref="y",
+                line=dict(color=cor, width=3),
+                layer="above"
+            ))
+
+    fig_geo.update_layout(
+        shapes=medias_regiao,
+        height=max(380, len(ordem_geo) * 44 + 100),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=20, r=80, t=10, b=40),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom", y=1.02,
+            font=dict(color="black", size=11)
+        ),
+        xaxis=dict(
+            title=dict(text="<b>sc/ha</b>", font=dict(color="black", size=14)),
+            tickfont=dict(color="black", size=13, family="Arial Black"),
+            tickcolor="black",
+            showgrid=True,
+            gridcolor="rgba(0,0,0,0.06)",
+            zeroline=False,
+        ),
+        yaxis=dict(
+            tickfont=dict(color="black", size=13, family="Arial Black"),
+            tickcolor="black",
+            showgrid=True,
+            gridcolor="rgba(0,0,0,0.08)",
+            zeroline=False,
+            tickmode="array",
+            tickvals=list(range(len(ordem_geo))),
+            ticktext=ordem_geo,
+            range=[-0.6, len(ordem_geo) - 0.4],
+        ),
+        font=dict(color="black"),
+    )
+    return fig_geo.to_dict()
+
+
+# ════════════════════════════════════════════════════════
+# HEAD-TO-HEAD POR MUNICÍPIO
+# ════════════════════════════════════════════════════════
+@st.fragment
+def _head_to_head(df_filtrado, sel_cultura, agregado, chave_recorte):
+    """Confrontos STINE × concorrência por município."""
     import numpy as _np
+    import plotly.graph_objects as go
     from st_aggrid import (
         AgGrid as _AgGrid,
         GridOptionsBuilder as _GB,
@@ -1001,19 +864,11 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
     )
 
     # ── Constantes ──────────────────────────────────────────────────────────────
-    _EMPATE_H2H  = 1.0
     _COR_VIT     = "#27AE60"
     _COR_EMP     = "#FFFF00"
     _COR_DER     = "#FF0000"
     _COR_EMP_CRD = "#D4A800"
 
-    def _classificar_h2h(pct):
-        if pd.isna(pct):  return "—",               "#F3F4F6"
-        if pct <= 45:     return "Restrito",         "#FF0000"
-        elif pct <= 55:   return "Competitivo",      "#FFFF00"
-        elif pct <= 75:   return "Superior",         "#87CEFF"
-        else:             return "Alta Performance", "#90EE90"
-
     def _ag_h2h(df_in: pd.DataFrame, height: int = 480):
         """AgGrid com coluna Classe colorida — idêntico ao modelo H2H."""
         _cjs = _Js("""
@@ -1069,21 +924,6 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
             use_container_width=True,
         )
 
-    def _dl_btn(df_out, fname, key):
-        """Download Excel via openpyxl."""
-        import io as _io
-        # Remove colunas internas do AgGrid (::auto_unique_id::, _selectedRowNodeInfo, etc.)
-        df_out = df_out.loc[:, ~df_out.columns.str.startswith("::") & ~df_out.columns.str.startswith("_")].copy()
-        _buf = _io.BytesIO()
-        df_out.to_excel(_buf, index=False, engine="openpyxl")
-        _buf.seek(0)
-        st.download_button(
-            "⬇️ Exportar Excel", data=_buf.read(),
-            file_name=fname + ".xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key=key,
-        )
-
     # ── Título da seção ─────────────────────────────────────────────────────────
     st.markdown("""
         <div style="margin:48px 0 20px 0;border-top:2px solid #E5E7EB;padding-top:32px;">
@@ -1099,24 +939,13 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
         </div>
     """, unsafe_allow_html=True)
 
-    # ── Preparar base ────────────────────────────────────────────────────────────
-    _COL_MAT = "tratamentos_nome"
-    _df_base = df_filtrado[
-        (df_filtrado["status_ensaio"] == "Com Resultado") &
-        (df_filtrado["resultado_prod_scha_corrigido"].notna())
-    ].copy()
+    # ── Preparar base (com municipio_uf) — compartilhada pelo cache de recortes ──
+    _COL_MAT = COL_MAT
+    _df_base = agregado("h2h_base", lambda: preparar_base(df_filtrado))
 
     if _COL_MAT not in _df_base.columns or _df_base.empty:
         st.info("ℹ️ Sem dados de resultado para a análise Head-to-Head.")
     else:
-        # municipio_uf
-        _est_col = "estado_sigla" if "estado_sigla" in _df_base.columns else "estado_nome"
-        _df_base["municipio_uf"] = (
-            _df_base["cidade_nome"].fillna("").str.strip()
-            + " — "
-            + _df_base[_est_col].fillna("").str.strip()
-        )
-
         # Filtro de cultura
         _col_cf, _ = st.columns([2, 5])
         with _col_cf:
@@ -1127,22 +956,12 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
                 key="h2h_gd_cultura",
             )
 
-        _df_cult = _df_base[_df_base["cultura_nome"] == _cult].copy()
-
-        # Pools por categoria
-        _df_p1_raw = _df_cult[_df_cult["categoria_material"] == "STINE"]
-        _df_p2_raw = _df_cult[_df_cult["categoria_material"] == "Concorrência"]
-
-        # Médias por (material, municipio_uf)
-        def _agg(df_in):
-            return (
-                df_in.groupby([_COL_MAT, "municipio_uf"], as_index=False)
-                ["resultado_prod_scha_corrigido"].mean()
-                .rename(columns={"resultado_prod_scha_corrigido": "sc_ha"})
-            )
+        _df_cult = _df_base[_df_base["cultura_nome"] == _cult]
 
-        _df_p1_agg = _agg(_df_p1_raw)
-        _df_p2_agg = _agg(_df_p2_raw)
+        # Médias por (material, municipio_uf) e todos os confrontos da cultura, uma vez por versão e filtros
+        _h2h = agregado(f"h2h:{_cult}", lambda: montar_confrontos(_df_cult))
+        _df_p1_agg = _h2h["medias_stine"]
+        _df_p2_agg = _h2h["medias_conc"]
 
         _cultivares_p1 = sorted(_df_p1_agg[_COL_MAT].dropna().unique())
 
@@ -1191,49 +1010,16 @@ def render_performance(df_filtrado, card, cores_mix, cores_cultura, COR_SOJA, CO
                     st.markdown("<div style='height:28px'></div>", unsafe_allow_html=True)
                     _btn_t1 = st.button("▶ Rodar Análise", type="primary", key="btn_h2h_t1", use_container_width=True)
 
-                _key_t1 = f"h2h_t1__{_p1_t1}__{_cult}"
+                # A sessão guarda só as chaves já rodadas; o resultado fica no cache compartilhado (com TTL)
+                _rodados = st.session_state.setdefault("h2h_rodados", set())
+                _key_t1 = f"h2h_t1:{_cult}:{_p1_t1}"
 
                 if _btn_t1:
-                    with st.spinner("Calculando confrontos..."):
-                        _p1_sel = _df_p1_agg[_df_p1_agg[_COL_MAT] == _p1_t1][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_1"})
-                        _cross  = _df_p2_agg.merge(_p1_sel, on="municipio_uf", how="inner")
-
-                        _MIN_COMP = 3
-                        _rows_t1 = []
-                        for _prod2, _grp in _cross.groupby(_COL_MAT):
-                            _n   = len(_grp)
-                            if _n < _MIN_COMP:
-                                continue
-                            _d   = _grp["sc_ha_1"] - _grp["sc_ha"]
-                            _vit = int((_d > _EMPATE_H2H).sum())
-                            _emp = int((_d.abs() <= _EMPATE_H2H).sum())
-                            _pct = round(_vit / _n * 100, 1) if _n > 0 else _np.nan
-                            _s1  = _grp["sc_ha_1"].mean()
-                            _s2  = _grp["sc_ha"].mean()
-                            _dsc = round(_s1 - _s2, 1) if not (_np.isnan(_s1) or _np.isnan(_s2)) else None
-                            _dpt = round(((_s1 / _s2) - 1) * 100, 1) if _s2 and not _np.isnan(_s2) else None
-                            _cls, _cor = _classificar_h2h(_pct)
-                            _rows_t1.append({
-                                "Produto 1":     _p1_t1,
-                                "SCs/ha Prod 1": round(_s1, 1),
-                                "Produto 2":     _prod2,
-                                "SCs/ha Prod 2": round(_s2, 1),
-                                "Qtd. Vitórias": _vit,
-                                "N° Municípios": _n,
-                                "Dif. %":        _dpt,
-                                "Dif. (SC)":     _dsc,
-                                "% Vitórias":    _pct,
-                                "Classe":        _cls,
-                                "_cor":          _cor,
-                            })
-
-                        _df_t1 = pd.DataFrame(_rows_t1)
-                        if not _df_t1.empty:
-                            _df_t1 = _df_t1.sort_values("% Vitórias", ascending=False).reset_index(drop=True)
-                        st.session_state[_key_t1] = _df_t1
-
-                if _key_t1 in st.session_state:
-                    _df_t1 = st.session_state[_key_t1]
+                    _rodados.add(_key_t1)
+
+                if _key_t1 in _rodados:
+                    # Consulta à matriz de confrontos já montada para a cultura
+                    _df_t1 = agregado(_key_t1, lambda: tabela_confrontos(_h2h["confrontos"], _p1_t1), ttl=TTL_RESULTADOS)
                     if _df_t1.empty:
                         st.info("ℹ️ Nenhum confronto encontrado — o cultivar não compartilha municípios com os adversários disponíveis.")
                     else:
@@ -1319,14 +1105,27 @@ A comparação usa a **média de sc/ha por município** — se houver mais de um
                         st.markdown("<div style='height:14px'></div>", unsafe_allow_html=True)
 
                         # AgGrid
-                        _df_show_t1 = _df_t1.drop(columns=["_cor"], errors="ignore")
-                        _ag_h2h(_df_show_t1, height=min(680, int((36 + 32 * len(_df_show_t1) + 20) * 1.3)))
+                        _ag_h2h(_df_t1, height=min(680, int((36 + 32 * len(_df_t1) + 20) * 1.3)))
 
-                        _dl_btn(_df_show_t1, f"h2h_{_p1_t1}_{_cult}", "dl_h2h_t1")
+                        botao_exportar(agregado, chave_recorte, f"dl_h2h_t1:{_cult}:{_p1_t1}", lambda: _df_t1, f"h2h_{_p1_t1}_{_cult}")
 
                 else:
                     st.info("👆 Selecione o Produto 1 e clique em **▶ Rodar Análise** para calcular.")
 
+                # Ranking de todos os confrontos STINE × concorrência da cultura (mín. de municípios em comum),
+                # montado só quando alguém pede o arquivo
+                if (_h2h["confrontos"]["n"] >= MIN_MUNICIPIOS).any():
+                    botao_exportar(
+                        agregado, chave_recorte, f"dl_h2h_ranking:{_cult}", lambda: tabela_confrontos(_h2h["confrontos"]),
+                        f"h2h_ranking_{_cult}", rotulo="⬇️ Exportar ranking completo",
+                    )
+                    # Planilha com o ranking e, por produto STINE, o detalhe por município de cada confronto
+                    # (o que a aba 2 mostra par a par) — gerada em segundo plano
+                    botao_exportar_segundo_plano(
+                        agregado, chave_recorte, f"dl_h2h_todos:{_cult}", lambda: abas_confrontos(_h2h),
+                        f"h2h_confrontos_{_cult}", rotulo="📦 Exportar todos os confrontos (Excel)",
+                    )
+
             # ════════════════════════════════════════════════
             # TAB 2 — Análise por Município
             # ════════════════════════════════════════════════
@@ -1352,7 +1151,7 @@ A comparação usa a **média de sc/ha por município** — se houver mais de um
                 # Só adversários com >= 3 municípios em comum
                 _adv_counts = (
                     _df_p2_agg[_df_p2_agg["municipio_uf"].isin(_munic_p1_t2)]
-                    .groupby(_COL_MAT)["municipio_uf"].count()
+                    .groupby(_COL_MAT, observed=True)["municipio_uf"].count()
                 )
                 _adv_disp_t2 = sorted(_adv_counts[_adv_counts >= 3].index.tolist())
 
@@ -1367,25 +1166,17 @@ A comparação usa a **média de sc/ha por município** — se houver mais de um
                     st.markdown("<div style='height:28px'></div>", unsafe_allow_html=True)
                     _btn_t2 = st.button("▶ Rodar Análise", type="primary", key="btn_h2h_t2", use_container_width=True)
 
-                _key_t2 = f"h2h_t2__{_p1_t2}__{_p2_t2}__{_cult}"
+                _key_t2 = f"h2h_t2:{_cult}:{_p1_t2}:{_p2_t2}"
 
                 if _btn_t2 and _p2_t2:
-                    with st.spinner("Calculando..."):
-                        _d1_loc = _df_p1_agg[_df_p1_agg[_COL_MAT] == _p1_t2][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_1"})
-                        _d2_loc = _df_p2_agg[_df_p2_agg[_COL_MAT] == _p2_t2][["municipio_uf", "sc_ha"]].rename(columns={"sc_ha": "sc_ha_2"})
-                        _df_loc = _d1_loc.merge(_d2_loc, on="municipio_uf", how="inner").copy()
-                        _df_loc["sc_ha_1"] = pd.to_numeric(_df_loc["sc_ha_1"], errors="coerce")
-                        _df_loc["sc_ha_2"] = pd.to_numeric(_df_loc["sc_ha_2"], errors="coerce")
-                        _df_loc["diff_sc"]   = _df_loc["sc_ha_1"] - _df_loc["sc_ha_2"]
-                        _df_loc["resultado"] = _df_loc["diff_sc"].apply(
-                            lambda x: "Vitória" if x > _EMPATE_H2H
-                            else ("Empate" if abs(x) <= _EMPATE_H2H else "Derrota")
-                        )
-                        _df_loc = _df_loc.sort_values("diff_sc").reset_index(drop=True)
-                        st.session_state[_key_t2] = _df_loc
-
-                if _key_t2 in st.session_state and _p2_t2:
-                    _df_loc = st.session_state[_key_t2].copy()
+                    _rodados.add(_key_t2)
+
+                if _key_t2 in _rodados and _p2_t2:
+                    _df_loc = agregado(
+                        _key_t2,
+                        lambda: confronto_municipios(_df_p1_agg, _df_p2_agg, _p1_t2, _p2_t2),
+                        ttl=TTL_RESULTADOS,
+                    ).copy()
                     for _nc in ["sc_ha_1", "sc_ha_2", "diff_sc"]:
                         if _nc in _df_loc.columns:
                             _df_loc[_nc] = pd.to_numeric(_df_loc[_nc], errors="coerce")
@@ -1655,7 +1446,10 @@ A comparação usa a **média de sc/ha por município** — se houver mais de um
                                 "Resultado",
                             ]
                             st.dataframe(_df_exp, hide_index=True, use_container_width=True)
-                            _dl_btn(_df_exp, f"h2h_municipio_{_p1_t2}_vs_{_p2_t2}", "dl_h2h_t2")
+                            botao_exportar(
+                                agregado, chave_recorte, f"dl_h2h_t2:{_cult}:{_p1_t2}:{_p2_t2}", lambda: _df_exp,
+                                f"h2h_municipio_{_p1_t2}_vs_{_p2_t2}",
+                            )
 
                 else:
                     st.info("👆 Selecione os dois cultivares e clique em **▶ Rodar Análise** para calcular.")
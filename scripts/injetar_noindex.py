@@ -0,0 +1,40 @@
+"""Injeta <meta name="robots" content="noindex, nofollow"> no index.html do Streamlit instalado.
+
+Roda no deploy, depois do `pip install -r requirements.txt`, a partir da raiz do repositório:
+
+    python -m scripts.injetar_noindex
+
+Sem etapa de build (Streamlit Community Cloud), GD_NOINDEX_RUNTIME=1 faz o app.py chamar
+`injetar_noindex()` uma vez por processo.
+
+Idempotente — se a tag já estiver lá, não reescreve o arquivo.
+"""
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+META_ROBOTS = '<meta name="robots" content="noindex, nofollow">'
+
+
+def index_streamlit():
+    """index.html servido pelo Streamlit instalado."""
+    return Path(st.__file__).parent / "static" / "index.html"
+
+
+def injetar_noindex(index_path=None):
+    """Garante a meta robots no `index.html`; devolve True se o arquivo foi alterado."""
+    index_path = Path(index_path or index_streamlit())
+    html = index_path.read_text()
+    if 'name="robots"' in html:
+        return False
+    index_path.write_text(html.replace("<head>", "<head>" + META_ROBOTS, 1))
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        alterado = injetar_noindex(sys.argv[1] if len(sys.argv) > 1 else None)
+    except OSError as erro:
+        sys.exit(f"Não foi possível injetar o noindex: {erro}")
+    print("noindex injetado" if alterado else "noindex já presente")
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ── Snapshot em disco ────────────────────────────────────
+# Frame tratado em Parquet + sidecar JSON com os metadados da carga.
+# Compartilhado entre processos e réplicas que apontam para o mesmo diretório.
+ARQUIVO_DADOS = "resultados.parquet"
+ARQUIVO_META  = "resultados.json"
+
+
+def _hash_esquema(schema):
+    texto = schema.remove_metadata().to_string()
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _gravar_atomico(destino, escrever):
+    """Escreve num temporário ao lado e troca com os.replace — leitores nunca veem arquivo pela metade."""
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    escrever(tmp)
+    os.replace(tmp, destino)
+
+
+def salvar_snapshot(diretorio, df, gerado_em, **extras):
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    _gravar_atomico(
+        diretorio / ARQUIVO_DADOS,
+        lambda tmp: pq.write_table(tabela, tmp, compression="zstd")
+    )
+
+    meta = {
+        "gerado_em":    gerado_em,
+        "linhas":       tabela.num_rows,
+        "hash_esquema": _hash_esquema(tabela.schema),
+        **extras,
+    }
+    _gravar_atomico(
+        diretorio / ARQUIVO_META,
+        lambda tmp: tmp.write_text(json.dumps(meta, ensure_ascii=False))
+    )
+
+
+def ler_metadados(diretorio):
+    try:
+        return json.loads((Path(diretorio) / ARQUIVO_META).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def carregar_snapshot(diretorio, meta):
+    """Lê o Parquet conferindo linhas e esquema contra o sidecar; None se não baterem."""
+    try:
+        arquivo = pq.ParquetFile(Path(diretorio) / ARQUIVO_DADOS)
+        if (arquivo.metadata.num_rows != meta["linhas"]
+                or _hash_esquema(arquivo.schema_arrow) != meta["hash_esquema"]):
+            return None
+        return arquivo.read().to_pandas()
+    except (OSError, KeyError, pa.ArrowException):
+        return None